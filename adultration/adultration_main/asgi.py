@@ -2,6 +2,8 @@
 ASGI config for adultration_main project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections go to the continuous-scan session
+(api/scan_session.py), the only WebSocket endpoint.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'adultration_main.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from api.scan_session import SCAN_SESSION_PATH, scan_session  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] != 'websocket':
+        return await django_application(scope, receive, send)
+    if scope['path'] == SCAN_SESSION_PATH:
+        return await scan_session(scope, receive, send)
+    # Unknown path: refuse the handshake (HTTP 403)
+    await receive()
+    await send({'type': 'websocket.close'})
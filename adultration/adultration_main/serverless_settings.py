@@ -0,0 +1,44 @@
+"""
+Django settings for the Vercel serverless entry point (api1/index.py).
+
+Every cold start imports and initialises whatever is listed here, so apps and
+middleware the API does not use in a function deployment are dropped: the
+admin, sessions, messages and the staff-only profiling hook (which depends on
+session authentication).
+"""
+
+from .settings import *
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if app not in (
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+    )
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in (
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'api.profiling.ProfilingMiddleware',
+    )
+]
+
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+    if processor not in (
+        'django.contrib.auth.context_processors.auth',
+        'django.contrib.messages.context_processors.messages',
+    )
+]
+
+# Without sessions, API keys are the only credentials DRF can check
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': ['api.auth.ApiKeyAuthentication'],
+    'UNAUTHENTICATED_USER': None,
+}
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +57,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.ratelimit.RateLimitHeadersMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,6 +95,28 @@ DATABASES = {
 }
 
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.auth.ApiKeyAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'api.auth.ApiKeyRequired',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.ratelimit.TokenBucketThrottle',
+    ],
+    # Proxies in front of the app, so the client IP is read from the right
+    # X-Forwarded-For entry (unset: the whole header is used)
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.getenv('NUM_PROXIES') else None,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -131,11 +156,96 @@ STATICFILES_DIRS = [
     BASE_DIR / 'frontend' / 'static',
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Minifies the frontend's JS/CSS, then fingerprints and precompresses everything
+STATICFILES_STORAGE = 'frontend.storage.MinifiedManifestStaticFilesStorage'
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads above this size are spooled to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+# Working size of the image pipeline; the browser compresses to the same target
+IMAGE_TARGET_MAX_SIDE = 1600
+IMAGE_JPEG_QUALITY = 85
+
+# Chunked, resumable image uploads (see api/uploads.py). Workers on one node
+# share this directory, so a chunk can land on any of them.
+RESUMABLE_UPLOAD_DIR = os.getenv('RESUMABLE_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'foodguard-uploads'))
+RESUMABLE_UPLOAD_EXPIRY = 60 * 60
+
+# Upstream services; overridden by the load-test harness to point at local stand-ins
+OPENFOODFACTS_BASE_URL = os.getenv('OPENFOODFACTS_BASE_URL', 'https://world.openfoodfacts.net')
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT', '')
+
+# Files kept by each node for its own workers: the cache, rate-limit counters
+# and profiles. Created private to the server's user (mode 0700); keep it out
+# of world-writable directories such as /tmp.
+STATE_DIR = os.getenv('STATE_DIR', os.path.join(BASE_DIR, 'var'))
+
+# One cache for all the worker processes of a node: a memory-mapped SQLite
+# file (see api/cache.py), so each product is fetched and stored once
+CACHES = {
+    'default': {
+        'BACKEND': 'api.cache.SQLiteCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(STATE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_SIZE': int(os.getenv('CACHE_MAX_SIZE', 64 * 1024 * 1024)),
+        },
+    }
+}
+
+# How long OpenFoodFacts lookups stay cached (seconds); misses expire sooner
+OPENFOODFACTS_CACHE_TIMEOUT = 6 * 60 * 60
+OPENFOODFACTS_NOT_FOUND_CACHE_TIMEOUT = 10 * 60
+
+# Scan history (api.scan_log): events are written in batches of this many,
+# or at least this often (seconds); beyond MAX_PENDING unwritten events new
+# ones are dropped
+SCAN_EVENT_FLUSH_SIZE = 100
+SCAN_EVENT_FLUSH_INTERVAL = 5.0
+SCAN_EVENT_MAX_PENDING = 10000
+
+# Rate limits (api/ratelimit.py). Buckets are shared by the workers of a host
+# through this file. API keys carry their own limits; clients without one
+# are limited per IP, in requests per minute and per UTC day.
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', os.path.join(STATE_DIR, 'ratelimit.sqlite3'))
+ANONYMOUS_RATE_LIMITS = {
+    'barcode': int(os.getenv('ANONYMOUS_BARCODE_RATE', 60)),
+    'image': int(os.getenv('ANONYMOUS_IMAGE_RATE', 6)),
+}
+ANONYMOUS_DAILY_QUOTAS = {'image': int(os.getenv('ANONYMOUS_IMAGE_DAILY_QUOTA', 100))}
+# Resumable-upload chunk requests per minute, for every client; a 10 MB
+# image is 40 chunks
+UPLOAD_CHUNK_RATE_LIMIT = int(os.getenv('UPLOAD_CHUNK_RATE_LIMIT', 300))
+# Refuse API requests without a key. The bundled frontend calls the API
+# from the browser without one, so only enable this for API-only deployments.
+API_KEY_REQUIRED = os.getenv('API_KEY_REQUIRED', 'False').lower() == 'true'
+
+# Continuous-scan WebSocket sessions (api/scan_session.py): lookups run at
+# most MAX_IN_FLIGHT at a time per session, with at most MAX_PENDING
+# accepted and unanswered; idle sessions are closed after IDLE_TIMEOUT seconds
+SCAN_SESSION_MAX_IN_FLIGHT = 4
+SCAN_SESSION_MAX_PENDING = 32
+SCAN_SESSION_IDLE_TIMEOUT = 5 * 60
+
+# Analytics endpoints are cached this long (seconds); schedule
+# `manage.py rollup_scans` at about the same interval
+ANALYTICS_CACHE_TIMEOUT = 5 * 60
+# Rollups skip scan events written less than this long ago (seconds), so that
+# concurrent batches have committed; keep it above the longest event write
+# plus the clock skew between hosts
+SCAN_ROLLUP_SETTLE_TIME = 60
+
+# /metrics is readable by staff and by scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>" (unset: staff only)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# On-demand request profiling (see api/profiling.py)
+PROFILE_STORE_DIR = os.getenv('PROFILE_STORE_DIR', os.path.join(STATE_DIR, 'profiles'))
+PROFILE_STORE_MAX_REPORTS = 50
+PROFILE_SAMPLE_INTERVAL = 0.001
+
 # Proxy/SSL handling for platforms like Railway
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 USE_X_FORWARDED_HOST = True
@@ -1,13 +1,14 @@
 import os
 import json
 from dotenv import load_dotenv
-import google.generativeai as genai
+from django.conf import settings
+from .metrics import track_stage, record_upstream_status
 
 class LLM:
-    def analyze_food_image(self, image_file):
+    def analyze_food_image(self, image_bytes, mime_type="image/jpeg"):
         """Analyze a food image and return text analysis using Gemini.
 
-        The input is a Django InMemoryUploadedFile or TemporaryUploadedFile.
+        The input is the already preprocessed (downscaled, re-encoded) image.
         We pass the binary bytes to Gemini as an image part and request a
         concise adulteration-focused analysis.
         """
@@ -21,11 +22,19 @@ class LLM:
             )
 
         try:
-            genai.configure(api_key=api_key)
+            # Imported on first use: the SDK pulls in grpc/protobuf and would
+            # otherwise dominate cold starts of routes that never call Gemini
+            import google.generativeai as genai
 
-            # Read image bytes
-            image_bytes = image_file.read()
-            image_file.seek(0)
+            if settings.GEMINI_API_ENDPOINT:
+                # Non-default endpoint (e.g. the load-test stand-in) over plain REST
+                genai.configure(
+                    api_key=api_key,
+                    transport="rest",
+                    client_options={"api_endpoint": settings.GEMINI_API_ENDPOINT},
+                )
+            else:
+                genai.configure(api_key=api_key)
 
             model = genai.GenerativeModel("gemini-2.5-flash")
             prompt = (
@@ -50,79 +59,93 @@ class LLM:
                 "Always keep it concise, factual, and safe."
             )
 
-            response = model.generate_content([
-                {"text": prompt},
-                {
-                    "inline_data": {
-                        "mime_type": image_file.content_type or "image/jpeg",
-                        "data": image_bytes,
-                    }
-                },
-            ])
-
-            # Extract text from response
-            if hasattr(response, "text") and response.text:
-                response_text = response.text
-            else:
-                try:
-                    response_text = response.candidates[0].content.parts[0].text  # type: ignore[attr-defined]
-                except Exception:
-                    response_text = ""
-
-            if not response_text:
-                return "Unable to extract analysis text from the AI response."
-
-            # Try to parse strict JSON first
-            cleaned = response_text.strip()
-            if cleaned.startswith("```)" ):
-                # Very defensive: handle unusual codefence mishaps
-                cleaned = cleaned.strip('`')
-            if cleaned.startswith("``"):
-                # Remove markdown fences if present
-                try:
-                    fence = cleaned.split("\n", 1)[0]
-                    cleaned = cleaned[len(fence):].strip()
-                    if cleaned.endswith("```"):
-                        cleaned = cleaned[: -3].strip()
-                except Exception:
-                    pass
-
             try:
-                data = json.loads(cleaned)
-                # Build standardized sectioned text the frontend can parse into cards
-                summary = data.get("summary") or ""
-                risk = data.get("riskLevel") or ""
-                key_findings = data.get("keyFindings") or []
-                indicators = data.get("indicators") or []
-                recs = data.get("recommendations") or []
-                tests = data.get("homeTests") or []
-
-                sectioned = []
-                if summary:
-                    sectioned.append(f"Summary:\n{summary}")
-                if risk:
-                    sectioned.append(f"Risk Level: {risk}")
-                if key_findings:
-                    sectioned.append("Key Findings:\n" + "\n".join(f"- {it}" for it in key_findings))
-                if indicators:
-                    sectioned.append("Adulteration Indicators:\n" + "\n".join(f"- {it}" for it in indicators))
-                if recs:
-                    sectioned.append("Recommendations:\n" + "\n".join(f"- {it}" for it in recs))
-                if tests:
-                    sectioned.append("Home Tests:\n" + "\n".join(f"- {it}" for it in tests))
+                with track_stage("gemini_request"):
+                    response = model.generate_content([
+                        {"text": prompt},
+                        {
+                            "inline_data": {
+                                "mime_type": mime_type,
+                                "data": image_bytes,
+                            }
+                        },
+                    ])
+            except Exception as e:
+                # google.api_core errors carry the HTTP status as .code
+                record_upstream_status("gemini", getattr(e, "code", None) or "error")
+                raise
+            record_upstream_status("gemini", 200)
 
-                formatted = "\n\n".join(sectioned).strip()
-                return formatted or response_text
-            except Exception:
-                # If not JSON, return text (already instructed to be sectioned)
-                return response_text
+            with track_stage("gemini_response"):
+                return self.format_analysis(response)
         except Exception as e:
             return (
                 "AI analysis failed due to a connection or configuration issue. "
                 f"Details: {str(e)}. Please try again later."
             )
 
+    def format_analysis(self, response):
+        """Turn a Gemini response into the sectioned text the frontend renders"""
+        # Extract text from response
+        if hasattr(response, "text") and response.text:
+            response_text = response.text
+        else:
+            try:
+                response_text = response.candidates[0].content.parts[0].text  # type: ignore[attr-defined]
+            except Exception:
+                response_text = ""
+
+        if not response_text:
+            return "Unable to extract analysis text from the AI response."
+
+        # Try to parse strict JSON first
+        cleaned = response_text.strip()
+        if cleaned.startswith("```)" ):
+            # Very defensive: handle unusual codefence mishaps
+            cleaned = cleaned.strip('`')
+        if cleaned.startswith("``"):
+            # Remove markdown fences if present
+            try:
+                fence = cleaned.split("\n", 1)[0]
+                cleaned = cleaned[len(fence):].strip()
+                if cleaned.endswith("```"):
+                    cleaned = cleaned[: -3].strip()
+            except Exception:
+                pass
+
+        try:
+            data = json.loads(cleaned)
+            # Build standardized sectioned text the frontend can parse into cards
+            summary = data.get("summary") or ""
+            risk = data.get("riskLevel") or ""
+            key_findings = data.get("keyFindings") or []
+            indicators = data.get("indicators") or []
+            recs = data.get("recommendations") or []
+            tests = data.get("homeTests") or []
+
+            sectioned = []
+            if summary:
+                sectioned.append(f"Summary:\n{summary}")
+            if risk:
+                sectioned.append(f"Risk Level: {risk}")
+            if key_findings:
+                sectioned.append("Key Findings:\n" + "\n".join(f"- {it}" for it in key_findings))
+            if indicators:
+                sectioned.append("Adulteration Indicators:\n" + "\n".join(f"- {it}" for it in indicators))
+            if recs:
+                sectioned.append("Recommendations:\n" + "\n".join(f"- {it}" for it in recs))
+            if tests:
+                sectioned.append("Home Tests:\n" + "\n".join(f"- {it}" for it in tests))
+
+            formatted = "\n\n".join(sectioned).strip()
+            return formatted or response_text
+        except Exception:
+            # If not JSON, return text (already instructed to be sectioned)
+            return response_text
+
     def Gemini(self,image):
+        import google.generativeai as genai
+
         load_dotenv()
         genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
         model = genai.GenerativeModel("gemini-2.5-flash")
@@ -1,3 +1,25 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
+from .models import ApiKey, ScanEvent
 
+
+@admin.register(ScanEvent)
+class ScanEventAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "barcode", "source", "status", "risk_level", "cache_status", "latency_ms")
+    list_filter = ("source", "status", "risk_level", "cache_status")
+    search_fields = ("barcode",)
+    date_hierarchy = "created_at"
+
+
+@admin.register(ApiKey)
+class ApiKeyAdmin(admin.ModelAdmin):
+    list_display = ("name", "prefix", "is_active", "barcode_rate", "image_rate", "image_daily_quota", "created_at")
+    list_filter = ("is_active",)
+    search_fields = ("name", "prefix")
+    readonly_fields = ("prefix", "created_at")
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            raw_key = obj.set_new_key()
+            messages.warning(request, f"API key for {obj.name}: {raw_key} (copy it now, it will not be shown again)")
+        super().save_model(request, obj, form, change)
@@ -0,0 +1,207 @@
+"""
+Scan analytics: incremental rollups of ScanEvents and the dashboard queries
+served from them.
+
+rollup_scan_events() folds the events recorded since its last run into
+hourly and daily ScanRollup / ProductScanRollup rows, keyed by a watermark
+on the event id. Events are ordered by id, not by when the scan happened,
+so a batch that reaches the database late is still counted, in the bucket
+of its scan time. Run it periodically (manage.py rollup_scans); the
+dashboard endpoints only ever read the rollups.
+
+Workers write their batches concurrently, so ids do not become visible in
+order: a batch can commit after a later one. Passing over ids that are not
+visible yet would drop them for good, so a run stops short of the first
+event written less than SCAN_ROLLUP_SETTLE_TIME ago. Each event is counted
+once, provided no write transaction stays open that long.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .metrics import track_stage
+from .models import ProductScanRollup, RollupPeriod, RollupWatermark, ScanEvent, ScanRollup
+
+WATERMARK = "scan_events"
+
+BUCKET_FUNCTIONS = {
+    RollupPeriod.HOUR: TruncHour,
+    RollupPeriod.DAY: TruncDay,
+}
+BUCKET_SIZES = {
+    RollupPeriod.HOUR: timedelta(hours=1),
+    RollupPeriod.DAY: timedelta(days=1),
+}
+
+RISK_LEVELS = ("High", "Medium", "Low")
+
+
+def rollup_scan_events(batch_size=10000):
+    """Fold up to batch_size new events into the rollups.
+
+    Returns the number of events processed; the watermark and the rollups
+    are updated in one transaction, so an interrupted run is simply redone.
+    Events written in the last SCAN_ROLLUP_SETTLE_TIME seconds, and any after
+    them, are left for a later run.
+    """
+    settled_before = timezone.now() - timedelta(seconds=settings.SCAN_ROLLUP_SETTLE_TIME)
+    with transaction.atomic(), track_stage("scan_rollup"):
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        pending = ScanEvent.objects.filter(id__gt=watermark.last_event_id).order_by("id")
+        # An earlier id may still be uncommitted until the writes around it settle
+        unsettled = pending.filter(recorded_at__gte=settled_before).values_list("id", flat=True).first()
+        if unsettled is not None:
+            pending = pending.filter(id__lt=unsettled)
+        ids = pending.values_list("id", flat=True)
+        last_id = ids[batch_size - 1:batch_size].first() or ids.aggregate(last=Max("id"))["last"]
+        if last_id is None:
+            return 0
+
+        events = ScanEvent.objects.filter(id__gt=watermark.last_event_id, id__lte=last_id).order_by()
+        for period, trunc in BUCKET_FUNCTIONS.items():
+            bucketed = events.annotate(bucket=trunc("created_at"))
+
+            groups = bucketed.values("bucket", "category", "country", "risk_level").annotate(
+                scans=Count("id"),
+                flagged_scans=Count("id", filter=Q(adulteration_flags__gt=0)),
+                flags=Sum("adulteration_flags"),
+            )
+            merge_rollup(ScanRollup, period, groups, counters=("scans", "flagged_scans", "flags"))
+
+            products = (
+                bucketed.filter(status="success").exclude(barcode="")
+                .values("bucket", "barcode")
+                .annotate(scans=Count("id"), name=Max("product_name"))
+            )
+            merge_rollup(ProductScanRollup, period, products, counters=("scans",), labels={"product_name": "name"})
+
+        processed = events.count()
+        watermark.last_event_id = last_id
+        watermark.save(update_fields=["last_event_id", "updated_at"])
+    return processed
+
+
+def merge_rollup(model, period, groups, counters, labels=None):
+    """Add each group's counters onto the rollup row with the same key.
+
+    groups come from a values().annotate() query: every value that is not
+    a counter or a label is part of the key. labels maps rollup fields to
+    group values that replace the stored ones when not empty.
+    """
+    labels = labels or {}
+    groups = list(groups)
+    if not groups:
+        return
+    key_fields = [name for name in groups[0] if name not in counters and name not in labels.values()]
+
+    existing = {
+        tuple(getattr(row, name) for name in key_fields): row
+        for row in model.objects.filter(period=period, bucket__in={group["bucket"] for group in groups})
+    }
+    created, updated = [], []
+    for group in groups:
+        row = existing.get(tuple(group[name] for name in key_fields))
+        if row is None:
+            row = model(period=period, **{name: group[name] for name in key_fields})
+            created.append(row)
+        else:
+            updated.append(row)
+        for name in counters:
+            setattr(row, name, getattr(row, name) + (group[name] or 0))
+        for field, name in labels.items():
+            if group[name]:
+                setattr(row, field, group[name])
+
+    model.objects.bulk_create(created, batch_size=500)
+    model.objects.bulk_update(updated, [*counters, *labels], batch_size=500)
+
+
+def rebuild_rollups():
+    """Drop all rollups and rewind the watermark, to recount from the raw events"""
+    with transaction.atomic():
+        ScanRollup.objects.all().delete()
+        ProductScanRollup.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).update(last_event_id=0)
+
+
+def window_start(period, buckets):
+    """Start of the window covering the last `buckets` buckets, the current one included"""
+    # Buckets are truncated in the current time zone, like TruncHour/TruncDay
+    now = timezone.localtime()
+    if period == RollupPeriod.DAY:
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start = now.replace(minute=0, second=0, microsecond=0)
+    return start - BUCKET_SIZES[period] * (buckets - 1)
+
+
+def rollups_updated_at():
+    """When the rollups last took in new events, or None if they never have"""
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    return watermark.updated_at if watermark else None
+
+
+def top_products(days, limit):
+    """Most scanned products over the last `days` days"""
+    rows = (
+        ProductScanRollup.objects
+        .filter(period=RollupPeriod.DAY, bucket__gte=window_start(RollupPeriod.DAY, days))
+        .values("barcode")
+        .annotate(scans=Sum("scans"), name=Max("product_name"))
+        .order_by("-scans", "barcode")[:limit]
+    )
+    return [
+        {"barcode": row["barcode"], "product_name": row["name"], "scans": row["scans"]}
+        for row in rows
+    ]
+
+
+def risk_distribution(days, dimension, limit):
+    """Scans per risk level for the `limit` most scanned categories or countries"""
+    rows = (
+        ScanRollup.objects
+        .filter(period=RollupPeriod.DAY, bucket__gte=window_start(RollupPeriod.DAY, days))
+        .values(dimension, "risk_level")
+        .annotate(scans=Sum("scans"))
+        .order_by()
+    )
+    distribution = {}
+    for row in rows:
+        entry = distribution.setdefault(row[dimension], {
+            dimension: row[dimension],
+            "scans": 0,
+            "risk_levels": {level: 0 for level in (*RISK_LEVELS, "unknown")},
+        })
+        entry["scans"] += row["scans"]
+        entry["risk_levels"][row["risk_level"] if row["risk_level"] in RISK_LEVELS else "unknown"] += row["scans"]
+    return sorted(distribution.values(), key=lambda entry: (-entry["scans"], entry[dimension]))[:limit]
+
+
+def adulteration_trend(period, buckets):
+    """Scans and adulteration flags per hour or day, oldest first, empty buckets included"""
+    start = window_start(period, buckets)
+    rows = (
+        ScanRollup.objects
+        .filter(period=period, bucket__gte=start)
+        .values("bucket")
+        .annotate(scans=Sum("scans"), flagged_scans=Sum("flagged_scans"), flags=Sum("flags"))
+        .order_by()
+    )
+    by_bucket = {row["bucket"]: row for row in rows}
+    series = []
+    for index in range(buckets):
+        bucket = start + BUCKET_SIZES[period] * index
+        row = by_bucket.get(bucket, {"scans": 0, "flagged_scans": 0, "flags": 0})
+        series.append({
+            "bucket": bucket.isoformat(),
+            "scans": row["scans"],
+            "flagged_scans": row["flagged_scans"],
+            "flags": row["flags"],
+            "flagged_share": round(row["flagged_scans"] / row["scans"], 4) if row["scans"] else 0.0,
+        })
+    return series
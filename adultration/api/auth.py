@@ -0,0 +1,83 @@
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.permissions import BasePermission
+
+from .models import ApiKey
+
+# Keys are looked up by hash once a minute per worker, not on every request;
+# a revoked key stops working within that time
+API_KEY_CACHE_TTL = 60
+
+API_KEY_HEADER = "HTTP_X_API_KEY"
+AUTHORIZATION_KEYWORD = "Api-Key"
+
+_key_cache = TTLCache(maxsize=4096, ttl=API_KEY_CACHE_TTL)
+_key_cache_lock = threading.Lock()
+
+
+def lookup_api_key(raw_key):
+    """The active ApiKey for raw_key, or None; unknown keys are cached too"""
+    key_hash = ApiKey.hash_key(raw_key)
+    with _key_cache_lock:
+        if key_hash in _key_cache:
+            return _key_cache[key_hash]
+
+    api_key = ApiKey.objects.filter(key_hash=key_hash, is_active=True).first()
+    with _key_cache_lock:
+        _key_cache[key_hash] = api_key
+    return api_key
+
+
+def request_api_key(request):
+    return request.auth if isinstance(request.auth, ApiKey) else None
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """Authenticates API clients by key.
+
+    The key goes in an ``X-API-Key`` header or as ``Authorization: Api-Key
+    <key>``. The request stays anonymous (no Django user); the ApiKey is
+    available as request.auth and selects the client's rate limits.
+    """
+
+    def authenticate(self, request):
+        raw_key = request.META.get(API_KEY_HEADER)
+        if raw_key is None:
+            keyword, _, credentials = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+            if keyword != AUTHORIZATION_KEYWORD:
+                return None
+            raw_key = credentials
+
+        raw_key = raw_key.strip()
+        api_key = lookup_api_key(raw_key) if raw_key else None
+        if api_key is None:
+            raise exceptions.AuthenticationFailed("Invalid or revoked API key.")
+        return AnonymousUser(), api_key
+
+    def authenticate_header(self, request):
+        return AUTHORIZATION_KEYWORD
+
+
+class ApiKeyRequired(BasePermission):
+    """Rejects requests without an API key when settings.API_KEY_REQUIRED is on"""
+
+    message = "An API key is required."
+
+    def has_permission(self, request, view):
+        return not settings.API_KEY_REQUIRED or request_api_key(request) is not None
+
+
+class ApiKeyOrStaffRequired(BasePermission):
+    """For bulk endpoints: API clients with a key, or staff signed in to the site"""
+
+    message = "An API key is required."
+
+    def has_permission(self, request, view):
+        if request_api_key(request) is not None:
+            return True
+        return bool(request.user and request.user.is_staff)
@@ -0,0 +1,33 @@
+import zxingcpp
+
+# Retail symbologies that carry a GTIN OpenFoodFacts can look up.
+RETAIL_FORMATS = zxingcpp.barcode_formats_from_str("EAN13,EAN8,UPCA")
+
+
+def is_valid_gtin(code):
+    """Return True if code is a GTIN-8/12/13/14 with a correct check digit."""
+    # str.isdigit() also accepts non-ASCII digits such as "٤"
+    if not code or not (code.isascii() and code.isdigit()) or len(code) not in (8, 12, 13, 14):
+        return False
+
+    digits = [int(d) for d in code]
+    body, check = digits[:-1], digits[-1]
+    # Weights alternate 3,1,3,... starting from the digit next to the check digit
+    total = sum(d * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return (10 - total % 10) % 10 == check
+
+
+def decode_gtins(image):
+    """Decode retail barcodes from a PIL image and return the valid GTINs found.
+
+    Codes are returned in detection order without duplicates. An empty list
+    means no usable barcode was visible in the photo.
+    """
+    results = zxingcpp.read_barcodes(image.convert("L"), formats=RETAIL_FORMATS)
+
+    gtins = []
+    for result in results:
+        code = result.text.strip()
+        if is_valid_gtin(code) and code not in gtins:
+            gtins.append(code)
+    return gtins
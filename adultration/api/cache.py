@@ -0,0 +1,336 @@
+"""
+Django cache backend shared by every worker process on a node.
+
+Entries live in one SQLite file in WAL mode, memory-mapped by each worker.
+The file's pages sit once in the OS page cache and every process maps the
+same copy, so a product fetched by one worker is a hit in all of them and
+is stored once. Readers never take a lock: WAL readers work from a
+snapshot and do not block writers or each other.
+
+Values are pickled and zlib-compressed when that makes them smaller; the
+OpenFoodFacts payloads compress about 3x. The total size of the entries is
+kept in a trigger-maintained counter. Once it passes MAX_SIZE, expired
+entries go first, then the least recently read ones. Recency is recorded
+lazily: each worker notes the keys it served and writes their access
+times in one batch every TOUCH_INTERVAL seconds, so a read is never a
+write.
+
+Configure with, for example:
+
+    CACHES = {
+        "default": {
+            "BACKEND": "api.cache.SQLiteCache",
+            "LOCATION": "/srv/foodguard/var/cache.sqlite3",
+            "OPTIONS": {"MAX_SIZE": 64 * 1024 * 1024},
+        }
+    }
+
+Connections are opened lazily and reopened after a fork, so the backend is
+safe with gunicorn --preload. The directory is created private to the
+server's user: values are unpickled on read, so nobody else may be able to
+write the file. warm() reads the whole file once, e.g. in the
+master before it forks, to get it into the page cache the workers share.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .metrics import record_error
+
+RAW = b"p"
+COMPRESSED = b"z"
+COMPRESS_MIN_LENGTH = 512
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT NOT NULL UNIQUE,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+INSERT OR IGNORE INTO stats (id, total) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE stats SET total = total + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE stats SET total = total - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE stats SET total = total - old.size + new.size WHERE id = 0;
+END;
+"""
+
+LIVE = "(expires IS NULL OR expires > ?)"
+
+
+def encode(value):
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN_LENGTH:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            return COMPRESSED + compressed
+    return RAW + data
+
+
+def decode(blob):
+    blob = bytes(blob)
+    data = zlib.decompress(blob[1:]) if blob[:1] == COMPRESSED else blob[1:]
+    return pickle.loads(data)
+
+
+@contextmanager
+def write_transaction(connection):
+    """Holds the database's write lock, which is shared by every process"""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+class SQLiteCache(BaseCache):
+    """Size-bounded, approximately-LRU cache in a SQLite file shared by local processes"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.path = location
+        self.max_size = int(options.get("MAX_SIZE", 64 * 1024 * 1024))
+        # Fraction of MAX_SIZE freed when culling, so culls do not run on every set
+        self.cull_fraction = float(options.get("CULL_FRACTION", 0.1))
+        self.mmap_size = int(options.get("MMAP_SIZE", 2 * self.max_size))
+        self.touch_interval = float(options.get("TOUCH_INTERVAL", 5.0))
+        self.local = threading.local()
+
+    def connection(self):
+        local = self.local
+        # Connections must not cross a fork; the parent's belongs to the parent
+        if getattr(local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # A cache can lose its last writes in a power cut; it cannot be slow
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            connection.executescript(SCHEMA)
+            local.connection = connection
+            local.pid = os.getpid()
+            local.touched = {}
+            local.touched_at = time.time()
+        return local.connection
+
+    # Reads
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            row = self.connection().execute(
+                f"SELECT value FROM entries WHERE key = ? AND {LIVE}", (key, time.time()),
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_get", e)
+            return default
+        if row is None:
+            return default
+        self.note_access([key])
+        return decode(row[0])
+
+    def get_many(self, keys, version=None):
+        keys_by_cache_key = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys_by_cache_key:
+            return {}
+        placeholders = ",".join("?" * len(keys_by_cache_key))
+        try:
+            rows = self.connection().execute(
+                f"SELECT key, value FROM entries WHERE key IN ({placeholders}) AND {LIVE}",
+                (*keys_by_cache_key, time.time()),
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_get", e)
+            return {}
+        self.note_access([key for key, _ in rows])
+        return {keys_by_cache_key[key]: decode(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            row = self.connection().execute(
+                f"SELECT 1 FROM entries WHERE key = ? AND {LIVE}", (key, time.time()),
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_get", e)
+            return False
+        return row is not None
+
+    def note_access(self, keys):
+        """Remember reads; their access times are written in batches"""
+        local = self.local
+        now = time.time()
+        for key in keys:
+            local.touched[key] = now
+        if now - local.touched_at >= self.touch_interval:
+            self.flush_access_times()
+
+    def flush_access_times(self):
+        local = self.local
+        touched, local.touched = local.touched, {}
+        local.touched_at = time.time()
+        if not touched:
+            return
+        try:
+            with write_transaction(self.connection()) as connection:
+                connection.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?",
+                    [(accessed, key) for key, accessed in touched.items()],
+                )
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_touch", e)
+
+    # Writes
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.write(key, value, timeout, only_if_missing=False)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.write(key, value, timeout, only_if_missing=True)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def write(self, key, value, timeout, only_if_missing):
+        blob = encode(value)
+        now = time.time()
+        # An add() may replace an entry that has expired but not been culled yet
+        condition = "WHERE entries.expires IS NOT NULL AND entries.expires <= :now" if only_if_missing else ""
+        try:
+            cursor = self.connection().execute(
+                f"""
+                INSERT INTO entries (key, value, expires, accessed, size)
+                VALUES (:key, :value, :expires, :now, :size)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value, expires = excluded.expires,
+                    accessed = excluded.accessed, size = excluded.size
+                {condition}
+                """,
+                {
+                    "key": key,
+                    "value": blob,
+                    "expires": self.get_backend_timeout(timeout),
+                    "now": now,
+                    "size": len(key) + len(blob),
+                },
+            )
+            written = cursor.rowcount > 0
+            if written:
+                self.cull_if_needed()
+            return written
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_set", e)
+            return False
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            cursor = self.connection().execute(
+                f"UPDATE entries SET expires = ? WHERE key = ? AND {LIVE}",
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_set", e)
+            return False
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Read-modify-write under the write lock, so atomic across processes
+        try:
+            with write_transaction(self.connection()) as connection:
+                row = connection.execute(
+                    f"SELECT value FROM entries WHERE key = ? AND {LIVE}", (key, time.time()),
+                ).fetchone()
+                if row is None:
+                    raise ValueError("Key '%s' not found" % key)
+                value = decode(row[0]) + delta
+                blob = encode(value)
+                connection.execute(
+                    "UPDATE entries SET value = ?, size = ? WHERE key = ?", (blob, len(key) + len(blob), key),
+                )
+        except (sqlite3.Error, OSError) as e:
+            # Unreadable counts as missing, which is what callers of incr() handle
+            record_error("cache_set", e)
+            raise ValueError("Key '%s' not found" % key) from e
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            cursor = self.connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_delete", e)
+            return False
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not keys:
+            return
+        placeholders = ",".join("?" * len(keys))
+        try:
+            self.connection().execute(f"DELETE FROM entries WHERE key IN ({placeholders})", keys)
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_delete", e)
+
+    def clear(self):
+        try:
+            self.connection().execute("DELETE FROM entries")
+        except (sqlite3.Error, OSError) as e:
+            record_error("cache_delete", e)
+
+    # Eviction
+
+    def total_size(self):
+        return self.connection().execute("SELECT total FROM stats WHERE id = 0").fetchone()[0]
+
+    def cull_if_needed(self):
+        if self.total_size() <= self.max_size:
+            return
+        connection = self.connection()
+        # Let this worker's recent reads count before choosing what to drop
+        self.flush_access_times()
+        connection.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        excess = self.total_size() - self.max_size * (1 - self.cull_fraction)
+        if excess <= 0:
+            return
+        # Walk the accessed index from the oldest entry, only as far as needed
+        victims = []
+        for rowid, size in connection.execute("SELECT rowid, size FROM entries ORDER BY accessed"):
+            victims.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        with write_transaction(connection):
+            connection.executemany("DELETE FROM entries WHERE rowid = ?", victims)
+
+    def warm(self):
+        """Read the whole file once, pulling it into the shared page cache"""
+        self.connection()
+        with open(self.path, "rb") as f:
+            while f.read(1024 * 1024):
+                pass
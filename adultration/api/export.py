@@ -0,0 +1,104 @@
+"""
+Streaming NDJSON exports of product analyses.
+
+An export re-scores stored products, every product or the products of one
+category, with the current analysis rules and writes one JSON document per
+line, in barcode order:
+
+    {"barcode": "...", "status": "success", "product_info": {...}, "risk_assessment": {...}, ...}
+    {"barcode": "...", "status": "not_stored", "message": "..."}
+    ...
+    {"complete": true, "exported": 1234}
+
+Analyses have the shape of the barcode endpoint's. Products saved before
+payloads were stored are "not_stored" until they are looked up or imported
+again. The last line only appears once the export has finished, so a file
+without it was cut short. To resume, pass the barcode of the last complete
+line as the cursor; the export continues after it.
+
+Rows are read through a server-side cursor (QuerySet.iterator) and written
+out as they are produced, in chunks of about CHUNK_BYTES, so memory stays
+flat whatever the size of the export. Optional gzip output is flushed at
+every chunk, so an interrupted download decompresses up to where it stopped.
+"""
+
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .metrics import track_stage
+from .models import Product
+from .services import product_service
+
+# Rows fetched from the database cursor at a time
+ROW_CHUNK_SIZE = 500
+CHUNK_BYTES = 64 * 1024
+
+
+def export_products(category=None, cursor=""):
+    """Stored products in export order (barcode), after cursor"""
+    products = Product.objects.order_by("barcode")
+    if category:
+        products = products.filter(category_entries__category=category)
+    if cursor:
+        products = products.filter(barcode__gt=cursor)
+    return products
+
+
+def product_record(product):
+    if not product.payload:
+        return {
+            "barcode": product.barcode,
+            "status": "not_stored",
+            "message": "Product data is not stored; look the product up or import it again to export it",
+        }
+    return {"barcode": product.barcode, **product_service.analyze_product_data(product.payload)}
+
+
+def export_lines(category=None, cursor=""):
+    """The export as NDJSON lines (str), ending with the completion line"""
+    exported = 0
+    for product in export_products(category, cursor).iterator(chunk_size=ROW_CHUNK_SIZE):
+        with track_stage("export_record"):
+            yield json.dumps(product_record(product), cls=DjangoJSONEncoder) + "\n"
+        exported += 1
+    yield json.dumps({"complete": True, "exported": exported}) + "\n"
+
+
+def export_chunks(lines, compress=False):
+    """Encode lines in chunks of about CHUNK_BYTES, gzip-compressed if asked"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    buffered = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        buffered.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            chunk = b"".join(buffered)
+            buffered, size = [], 0
+            # A sync flush ends each chunk on a byte boundary the reader can decompress up to
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+    chunk = b"".join(buffered)
+    if compressor:
+        yield compressor.compress(chunk) + compressor.flush()
+    elif chunk:
+        yield chunk
+
+
+async def iterate_async(chunks):
+    """Serve a synchronous generator to an ASGI server one chunk at a time.
+
+    Under ASGI, Django reads a synchronous streaming_content into a list
+    before sending any of it. The generator runs in Django's sync thread,
+    like a view, which keeps its database cursor on one connection.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while True:
+        chunk = await next_chunk(chunks, done)
+        if chunk is done:
+            return
+        yield chunk
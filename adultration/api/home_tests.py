@@ -0,0 +1,122 @@
+"""
+Home adulteration tests, kept as data in api/data/home_tests.json.
+
+The file holds the tests and the part of the OpenFoodFacts category
+taxonomy they need:
+
+- "tests": test id -> the payload returned to clients, plus the
+  "categories" (taxonomy IDs such as "en:honeys") it is meant for. A test
+  for a category also applies to every category below it.
+- "taxonomy": category -> its parent categories.
+- "synonyms": other IDs for a category, such as the ones product_store
+  derives from free-text categories ("en:honey").
+- "general": tests offered for every product.
+
+Adding a test or a category is an edit to that file, not to code. It is
+loaded once per process, on first use, into an index from each category to
+every test for it or for any of its ancestors, nearest first. A product's
+tests are then one lookup per most specific category. Payloads are built
+once and shared, read-only, by every response.
+"""
+
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+
+from .product_store import product_categories
+
+KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(__file__), "data", "home_tests.json")
+
+
+class HomeTest(dict):
+    """A test payload; one instance is shared by every response, so it cannot be changed"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Home test payloads are shared and read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return HomeTest, (dict(self),)
+
+
+def build_payload(spec):
+    return HomeTest(
+        (field, tuple(value) if isinstance(value, list) else value)
+        for field, value in spec.items()
+        if field != "categories"
+    )
+
+
+def ancestors(category, parents):
+    """Every ancestor of category, nearest first"""
+    found = []
+    queue = list(parents.get(category, ()))
+    while queue:
+        parent = queue.pop(0)
+        if parent != category and parent not in found:
+            found.append(parent)
+            queue.extend(parents.get(parent, ()))
+    return found
+
+
+class HomeTestKnowledgeBase:
+    def __init__(self, data):
+        parents = data["taxonomy"]
+        self.synonyms = MappingProxyType(dict(data.get("synonyms", {})))
+        self.tests = MappingProxyType({test_id: build_payload(spec) for test_id, spec in data["tests"].items()})
+        self.general = tuple(data.get("general", ()))
+
+        tests_by_category = {}
+        for test_id, spec in data["tests"].items():
+            for category in spec["categories"]:
+                tests_by_category.setdefault(category, []).append(test_id)
+
+        categories = set(parents) | set(tests_by_category) | set(self.synonyms.values())
+        categories.update(parent for category_parents in parents.values() for parent in category_parents)
+        self.ancestors = MappingProxyType({
+            category: tuple(ancestors(category, parents)) for category in categories
+        })
+
+        index = {}
+        for category in categories:
+            test_ids = []
+            for applies_to in (category, *self.ancestors[category]):
+                for test_id in tests_by_category.get(applies_to, ()):
+                    if test_id not in test_ids:
+                        test_ids.append(test_id)
+            if test_ids:
+                index[category] = tuple(test_ids)
+        self.index = MappingProxyType(index)
+
+    def specific_categories(self, categories):
+        """The known categories among categories that are not an ancestor of another"""
+        known = []
+        for category in categories:
+            category = self.synonyms.get(category, category)
+            if category in self.ancestors and category not in known:
+                known.append(category)
+        covered = {ancestor for category in known for ancestor in self.ancestors[category]}
+        return [category for category in known if category not in covered]
+
+    def tests_for(self, categories):
+        """The payloads of the tests for a product in categories, general tests first"""
+        test_ids = list(self.general)
+        # OpenFoodFacts lists categories broadest first; offer the most specific tests first
+        for category in reversed(self.specific_categories(categories)):
+            for test_id in self.index.get(category, ()):
+                if test_id not in test_ids:
+                    test_ids.append(test_id)
+        return [self.tests[test_id] for test_id in test_ids]
+
+
+@lru_cache(maxsize=None)
+def knowledge_base():
+    with open(KNOWLEDGE_BASE_PATH, encoding="utf-8") as f:
+        return HomeTestKnowledgeBase(json.load(f))
+
+
+def home_tests_for_product(product_data):
+    return knowledge_base().tests_for(product_categories(product_data))
@@ -0,0 +1,34 @@
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+# Longest side (in pixels) of the working copy used by the image pipeline.
+# Barcodes and packet labels stay legible at this size while decoding cost
+# and memory stay bounded regardless of the camera resolution.
+TARGET_MAX_SIDE = settings.IMAGE_TARGET_MAX_SIDE
+JPEG_QUALITY = settings.IMAGE_JPEG_QUALITY
+
+
+def downscale_image(image_file, max_side=TARGET_MAX_SIDE):
+    """Open an uploaded image and return an RGB copy no larger than max_side.
+
+    For JPEGs the decoder is asked for a reduced-scale draft first, so a
+    12 MP photo is never fully decoded just to be thrown away.
+    """
+    image_file.seek(0)
+    image = Image.open(image_file)
+    image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_side, max_side))
+    image_file.seek(0)
+    return image
+
+
+def encode_jpeg(image, quality=JPEG_QUALITY):
+    """Encode a PIL image as JPEG bytes for upstream analysis"""
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.services import product_service
+
+
+class Command(BaseCommand):
+    help = "Run the barcode analysis pipeline in-process and print the result as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("barcodes", nargs="+", help="one or more product barcodes")
+        parser.add_argument("--compact", action="store_true", help="one JSON document per line")
+        parser.add_argument("--record", action="store_true", help="log the lookups as scan events")
+
+    def handle(self, *args, **options):
+        indent = None if options["compact"] else 2
+        for barcode in options["barcodes"]:
+            analysis = product_service.analyze_product_by_barcode(barcode, record=options["record"])
+            self.stdout.write(json.dumps({"barcode": barcode, "analysis": analysis}, indent=indent))
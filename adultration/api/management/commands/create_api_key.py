@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.models import ApiKey
+
+
+class Command(BaseCommand):
+    help = "Create an API key for a client and print it (it is stored hashed and cannot be shown again)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="who the key is for")
+        parser.add_argument("--barcode-rate", type=int, help="barcode lookups and other cheap requests per minute")
+        parser.add_argument("--image-rate", type=int, help="image analyses per minute")
+        parser.add_argument("--image-daily-quota", type=int, help="image analyses per UTC day (0 for no limit)")
+
+    def handle(self, *args, **options):
+        api_key = ApiKey(name=options["name"])
+        for field in ("barcode_rate", "image_rate", "image_daily_quota"):
+            if options[field] is not None:
+                setattr(api_key, field, options[field] or None)
+        raw_key = api_key.set_new_key()
+        api_key.save()
+        self.stdout.write(raw_key)
@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.export import export_chunks, export_lines
+
+
+class Command(BaseCommand):
+    help = "Re-score the stored products and write their analyses as NDJSON (optionally gzipped)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-o", "--output", help="file to write, e.g. analyses.ndjson.gz (default: stdout)")
+        parser.add_argument("--category", default="", help="only products of this category, e.g. en:honeys")
+        parser.add_argument("--cursor", default="", help="resume after this barcode (the last line of an interrupted export)")
+        parser.add_argument("--gzip", action="store_true", help="compress the output (implied by a .gz output file)")
+
+    def handle(self, *args, **options):
+        path = options["output"]
+        compress = options["gzip"] or bool(path and path.endswith(".gz"))
+        chunks = export_chunks(export_lines(options["category"], options["cursor"]), compress)
+
+        output = open(path, "wb") if path else open(sys.stdout.fileno(), "wb", closefd=False)
+        with output:
+            for chunk in chunks:
+                output.write(chunk)
+        if path:
+            self.stdout.write(f"Exported analyses to {path}")
@@ -0,0 +1,22 @@
+import gzip
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.product_store import import_products
+
+
+class Command(BaseCommand):
+    help = "Load OpenFoodFacts products (JSON lines, optionally gzipped) into the local product store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON-lines export, one product per line, e.g. openfoodfacts-products.jsonl.gz")
+        parser.add_argument("--batch-size", type=int, default=1000, help="products per transaction")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            products = (json.loads(line) for line in f if line.strip())
+            count = import_products(products, batch_size=options["batch_size"])
+        self.stdout.write(f"Stored {count} products")
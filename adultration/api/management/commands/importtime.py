@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a cold start does before it can answer: build the WSGI app, resolve
+# the route and import the view behind it
+COLD_START = """
+import time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import resolve
+resolve({route!r})
+print("cold start: %.1f ms" % ((time.perf_counter() - started) * 1000))
+"""
+
+
+class Command(BaseCommand):
+    help = "Report which imports a cold start spends its time on, using python -X importtime"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--route", default="/api/v1/barcode/", help="URL path resolved after startup")
+        parser.add_argument("--limit", type=int, default=25, help="number of modules to list")
+        parser.add_argument("--self", action="store_true", dest="by_self", help="sort by self time instead of cumulative")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", COLD_START.format(route=options["route"])],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            self.stderr.write(result.stderr)
+            return
+
+        modules = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            if not self_us.strip().isdigit():
+                continue  # the header line
+            modules.append((int(self_us), int(cumulative_us), name.rstrip()))
+
+        key = 0 if options["by_self"] else 1
+        modules.sort(key=lambda module: module[key], reverse=True)
+
+        self.stdout.write(f"settings: {settings.SETTINGS_MODULE}")
+        self.stdout.write(result.stdout.strip())
+        self.stdout.write(f"imports: {len(modules)} modules, {sum(m[0] for m in modules) / 1000:.1f} ms total self time\n")
+        self.stdout.write(f"{'self ms':>9}{'cumul ms':>10}  module")
+        for self_us, cumulative_us, name in modules[:options["limit"]]:
+            self.stdout.write(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {name}")
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.analytics import rebuild_rollups, rollup_scan_events
+
+
+class Command(BaseCommand):
+    help = "Fold scan events recorded since the last run into the hourly and daily analytics rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000, help="events per transaction")
+        parser.add_argument("--rebuild", action="store_true", help="discard the rollups and recount every event")
+        parser.add_argument(
+            "--every", type=float, metavar="SECONDS",
+            help="keep running, catching up this often (for hosts without cron)",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            rebuild_rollups()
+
+        while True:
+            total = 0
+            while True:
+                processed = rollup_scan_events(options["batch_size"])
+                total += processed
+                if processed < options["batch_size"]:
+                    break
+            self.stdout.write(f"Rolled up {total} scan events")
+
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
@@ -0,0 +1,112 @@
+import hmac
+import os
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from rest_framework.renderers import JSONRenderer
+
+# Spans cheap in-process steps (sub-millisecond) up to slow Gemini calls
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_DURATION = Histogram(
+    "foodguard_stage_duration_seconds",
+    "Time spent in each stage of the analysis pipeline",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "foodguard_errors_total",
+    "Errors raised or swallowed by pipeline stages, by exception type",
+    ["stage", "type"],
+)
+UPSTREAM_RESPONSES = Counter(
+    "foodguard_upstream_responses_total",
+    "Responses received from upstream services, by status code",
+    ["service", "status"],
+)
+CACHE_LOOKUPS = Counter(
+    "foodguard_cache_lookups_total",
+    "Cache lookups, by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+
+
+@contextmanager
+def track_stage(stage):
+    """Time a pipeline stage; usable as a context manager or a decorator.
+
+    Exceptions escaping the stage are counted by type and re-raised.
+    """
+    start = perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(stage, e)
+        raise
+    finally:
+        STAGE_DURATION.labels(stage).observe(perf_counter() - start)
+
+
+def record_error(stage, error):
+    """Count an error that a stage handled itself instead of raising"""
+    STAGE_ERRORS.labels(stage, type(error).__name__).inc()
+
+
+def record_upstream_status(service, status):
+    UPSTREAM_RESPONSES.labels(service, str(status)).inc()
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports response serialization time"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with track_stage("render"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def metrics_access_allowed(request):
+    """Staff users, or scrapers sending METRICS_TOKEN as a bearer token"""
+    user = getattr(request, "user", None)
+    if user and user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    if not token:
+        return False
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+def metrics_view(request):
+    """Expose all metrics in the Prometheus text format.
+
+    Under gunicorn each worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+    (see gunicorn.conf.py) and the collector merges them, so a scrape that
+    lands on any worker reports totals for the whole node. Only staff and
+    scrapers holding METRICS_TOKEN may read them.
+    """
+    if not metrics_access_allowed(request):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
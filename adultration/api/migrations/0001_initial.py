@@ -0,0 +1,31 @@
+# Generated by Django 5.0.3 on 2026-10-19 18:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('barcode', models.CharField(blank=True, max_length=20)),
+                ('source', models.CharField(choices=[('barcode', 'Barcode lookup'), ('image_barcode', 'Barcode read from a photo'), ('image_ai', 'AI analysis of a photo')], max_length=16)),
+                ('status', models.CharField(max_length=16)),
+                ('risk_level', models.CharField(blank=True, max_length=16)),
+                ('cache_status', models.CharField(choices=[('hit', 'Cache hit'), ('miss', 'Cache miss'), ('none', 'No product lookup')], max_length=8)),
+                ('latency_ms', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='scan_created_idx'), models.Index(fields=['barcode', '-created_at'], name='scan_barcode_created_idx')],
+            },
+        ),
+    ]
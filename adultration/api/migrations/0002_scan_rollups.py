@@ -0,0 +1,75 @@
+# Generated by Django 5.0.3 on 2026-10-19 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductScanRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('barcode', models.CharField(max_length=20)),
+                ('product_name', models.CharField(blank=True, max_length=200)),
+                ('scans', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScanRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('country', models.CharField(blank=True, max_length=64)),
+                ('risk_level', models.CharField(blank=True, max_length=16)),
+                ('scans', models.PositiveIntegerField(default=0)),
+                ('flagged_scans', models.PositiveIntegerField(default=0)),
+                ('flags', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='scanevent',
+            name='adulteration_flags',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scanevent',
+            name='category',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='scanevent',
+            name='country',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='scanevent',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddConstraint(
+            model_name='productscanrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'bucket', 'barcode'), name='product_rollup_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='scanrollup',
+            constraint=models.UniqueConstraint(fields=('period', 'bucket', 'category', 'country', 'risk_level'), name='scan_rollup_key'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.3 on 2026-10-19 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_scan_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('barcode', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('product_name', models.CharField(blank=True, max_length=200)),
+                ('brands', models.CharField(blank=True, max_length=200)),
+                ('categories', models.TextField(blank=True)),
+                ('nutriscore_grade', models.CharField(blank=True, max_length=1)),
+                ('nova_group', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('additives_count', models.PositiveSmallIntegerField(default=0)),
+                ('image_url', models.URLField(blank=True, max_length=500)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('last_modified_t', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100)),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_entries', to='api.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'rank', 'product'], name='product_category_rank_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productcategory',
+            constraint=models.UniqueConstraint(fields=('product', 'category'), name='product_category_unique'),
+        ),
+    ]
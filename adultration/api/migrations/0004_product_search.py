@@ -0,0 +1,31 @@
+# Generated by Django 5.0.3 on 2026-10-19 18:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_product_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='index_version',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ProductToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='api.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='producttoken',
+            constraint=models.UniqueConstraint(fields=('token', 'product'), name='product_token_unique'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('prefix', models.CharField(editable=False, max_length=12)),
+                ('key_hash', models.CharField(editable=False, max_length=64, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('barcode_rate', models.PositiveIntegerField(default=120, help_text='Barcode lookups and other cheap requests per minute')),
+                ('image_rate', models.PositiveIntegerField(default=10, help_text='Image analyses per minute')),
+                ('image_daily_quota', models.PositiveIntegerField(blank=True, default=1000, help_text='Image analyses per UTC day; empty for no limit', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
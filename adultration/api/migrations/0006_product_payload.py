@@ -0,0 +1,22 @@
+# Generated by Django 5.0.3 on 2026-10-19 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_api_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='productcategory',
+            index=models.Index(fields=['category', 'product'], name='product_category_export_idx'),
+        ),
+    ]
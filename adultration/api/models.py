@@ -1,3 +1,225 @@
+import hashlib
+import secrets
+
 from django.db import models
+from django.utils import timezone
+
+
+class ScanEvent(models.Model):
+    """One product lookup, recorded for analytics and cache warming.
+
+    Written in batches through api.scan_log, never one row per request.
+    """
+
+    class Source(models.TextChoices):
+        BARCODE = "barcode", "Barcode lookup"
+        IMAGE_BARCODE = "image_barcode", "Barcode read from a photo"
+        IMAGE_AI = "image_ai", "AI analysis of a photo"
+
+    class CacheStatus(models.TextChoices):
+        HIT = "hit", "Cache hit"
+        MISS = "miss", "Cache miss"
+        NONE = "none", "No product lookup"
+
+    barcode = models.CharField(max_length=20, blank=True)
+    source = models.CharField(max_length=16, choices=Source.choices)
+    # "success", "not_found" or "error", as reported by the analysis
+    status = models.CharField(max_length=16)
+    risk_level = models.CharField(max_length=16, blank=True)
+    cache_status = models.CharField(max_length=8, choices=CacheStatus.choices)
+    latency_ms = models.PositiveIntegerField()
+    # Dimensions for the analytics rollups, copied from the analysis so they
+    # can be aggregated without the OpenFoodFacts payload
+    product_name = models.CharField(max_length=200, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=64, blank=True)
+    adulteration_flags = models.PositiveSmallIntegerField(default=0)
+    # Set when the scan happens, not when its batch is written
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set when the batch is written; the rollups wait for writes to settle
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Time-range scans for rollups and exports
+            models.Index(fields=["created_at"], name="scan_created_idx"),
+            # History of one product, most recent first
+            models.Index(fields=["barcode", "-created_at"], name="scan_barcode_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.barcode or self.source} at {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+
+class RollupPeriod(models.TextChoices):
+    HOUR = "hour", "Hour"
+    DAY = "day", "Day"
+
+
+class ScanRollup(models.Model):
+    """Scan counts per time bucket, category, country and risk level.
+
+    Maintained incrementally from ScanEvents by api.analytics; dashboards
+    read these rows instead of grouping the raw events.
+    """
+
+    period = models.CharField(max_length=4, choices=RollupPeriod.choices)
+    # Start of the hour or day (UTC)
+    bucket = models.DateTimeField()
+    category = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=64, blank=True)
+    risk_level = models.CharField(max_length=16, blank=True)
+    scans = models.PositiveIntegerField(default=0)
+    # Scans whose product raised at least one adulteration flag, and the flags raised in total
+    flagged_scans = models.PositiveIntegerField(default=0)
+    flags = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "bucket", "category", "country", "risk_level"],
+                name="scan_rollup_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.bucket:%Y-%m-%d %H:%M}: {self.scans} scans"
+
+
+class ProductScanRollup(models.Model):
+    """Scans of one barcode per time bucket, for top-product rankings"""
+
+    period = models.CharField(max_length=4, choices=RollupPeriod.choices)
+    bucket = models.DateTimeField()
+    barcode = models.CharField(max_length=20)
+    product_name = models.CharField(max_length=200, blank=True)
+    scans = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["period", "bucket", "barcode"], name="product_rollup_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.barcode} {self.period} {self.bucket:%Y-%m-%d %H:%M}: {self.scans} scans"
+
+
+class RollupWatermark(models.Model):
+    """Id of the last ScanEvent folded into the rollups"""
+
+    name = models.CharField(max_length=32, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at event {self.last_event_id}"
+
+
+class Product(models.Model):
+    """An OpenFoodFacts product kept locally, for lookups that span products.
+
+    Filled from live lookups and from bulk imports (manage.py
+    import_products); maintained by api.product_store.
+    """
+
+    barcode = models.CharField(max_length=20, primary_key=True)
+    product_name = models.CharField(max_length=200, blank=True)
+    brands = models.CharField(max_length=200, blank=True)
+    categories = models.TextField(blank=True)
+    nutriscore_grade = models.CharField(max_length=1, blank=True)
+    nova_group = models.PositiveSmallIntegerField(null=True, blank=True)
+    additives_count = models.PositiveSmallIntegerField(default=0)
+    image_url = models.URLField(max_length=500, blank=True)
+    # Lower is healthier; see product_store.product_rank
+    rank = models.PositiveSmallIntegerField()
+    # OpenFoodFacts revision, to skip rewriting unchanged products
+    last_modified_t = models.BigIntegerField(null=True, blank=True)
+    # product_store.INDEX_VERSION the index entries were built with
+    index_version = models.PositiveSmallIntegerField(default=0)
+    # The OpenFoodFacts fields the analysis reads, so that stored products
+    # can be re-scored and exported without fetching them again
+    payload = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_name or 'Unnamed product'} ({self.barcode})"
+
+
+class ProductCategory(models.Model):
+    """Category rank index: one row per product and category it belongs to.
+
+    rank is copied from the product so that the best products of a category
+    are a single range scan of product_category_rank_idx.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="category_entries")
+    category = models.CharField(max_length=100)
+    # Position in the product's category list; higher is more specific
+    depth = models.PositiveSmallIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["category", "rank", "product"], name="product_category_rank_idx"),
+            # Exports walk a category in barcode order
+            models.Index(fields=["category", "product"], name="product_category_export_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "category"], name="product_category_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} in {self.category}"
+
+
+class ProductToken(models.Model):
+    """Inverted index for product search: one row per product and search token.
+
+    Tokens are field-qualified ("additive:e211"); see api.search.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            # Doubles as the posting list index: a token's products in barcode order
+            models.UniqueConstraint(fields=["token", "product"], name="product_token_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.token} in {self.product_id}"
+
+
+class ApiKey(models.Model):
+    """An API client: its credentials and rate limits (see api.ratelimit).
+
+    Only a hash of the key is stored. The key itself is shown once, when it
+    is created with manage.py create_api_key or in the admin.
+    """
+
+    name = models.CharField(max_length=100)
+    # Start of the key, so its owner can tell which one it is
+    prefix = models.CharField(max_length=12, editable=False)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    barcode_rate = models.PositiveIntegerField(default=120, help_text="Barcode lookups and other cheap requests per minute")
+    image_rate = models.PositiveIntegerField(default=10, help_text="Image analyses per minute")
+    image_daily_quota = models.PositiveIntegerField(
+        null=True, blank=True, default=1000, help_text="Image analyses per UTC day; empty for no limit",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def hash_key(raw_key):
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    def set_new_key(self):
+        """Give the client a new random key; returns it, as it cannot be recovered later"""
+        raw_key = "fg_" + secrets.token_urlsafe(32)
+        self.prefix = raw_key[:12]
+        self.key_hash = self.hash_key(raw_key)
+        return raw_key
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.name} ({self.prefix}...)"
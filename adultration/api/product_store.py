@@ -0,0 +1,217 @@
+"""
+Local product store and the category rank index used for healthier
+alternatives.
+
+Every stored product gets a rank, an integer where lower is healthier:
+Nutri-Score first, then NOVA group, then the number of additives. The
+rank is copied into one ProductCategory row per category of the product,
+indexed on (category, rank), so "the best products in this category" is an
+index range scan whatever the size of the store. The product's search
+tokens (api.search) are kept alongside. All of them are updated together
+whenever a product is saved, never rebuilt in bulk.
+"""
+
+import re
+
+from django.db import transaction
+
+from .metrics import track_stage
+from .models import Product, ProductCategory, ProductToken
+from .search import product_tokens
+
+# Bump when ranking, tokenization or the stored payload changes, so that
+# stored products are re-indexed on their next save even if OpenFoodFacts
+# has not changed them
+INDEX_VERSION = 2
+
+# Comprehensive product fields fetched from OpenFoodFacts; the analysis
+# reads nothing else, so they are also what Product.payload keeps
+OPENFOODFACTS_FIELDS = [
+    "product_name", "brands", "categories", "categories_tags", "ingredients_text", 
+    "nutrition_grades", "nutriscore_grade", "nutriscore_score",
+    "additives_tags", "allergens_tags", "traces_tags",
+    "ingredients_analysis_tags", "labels_tags", "packaging_tags",
+    "countries_tags", "manufacturing_places_tags", "stores_tags",
+    "quantity", "serving_size", "energy_100g", "fat_100g", 
+    "saturated_fat_100g", "carbohydrates_100g", "sugars_100g",
+    "fiber_100g", "proteins_100g", "salt_100g", "sodium_100g",
+    "vitamin_c_100g", "calcium_100g", "iron_100g", "image_url",
+    "image_nutrition_url", "image_ingredients_url", "ecoscore_grade",
+    "nova_group", "last_modified_t", "created_t"
+]
+
+NUTRISCORE_GRADES = "abcde"
+# Products without a Nutri-Score rank after every graded one and are
+# never offered as alternatives
+UNRANKED = 9999
+UNKNOWN_NOVA_GROUP = 5
+MAX_RANKED_ADDITIVES = 99
+
+MAX_ALTERNATIVES = 20
+
+PRODUCT_FIELDS = [
+    "product_name", "brands", "categories", "nutriscore_grade", "nova_group",
+    "additives_count", "image_url", "rank", "last_modified_t", "index_version", "payload",
+]
+
+
+def additives_count(product):
+    additives = product.get("additives_tags")
+    if additives is not None:
+        return len(additives)
+    return product.get("additives_n") or 0
+
+
+def product_rank(product):
+    """Nutri-Score, then NOVA group, then additive count, as one sortable integer"""
+    grade = str(product.get("nutriscore_grade") or "").lower()
+    if len(grade) != 1 or grade not in NUTRISCORE_GRADES:
+        return UNRANKED
+    nova_group = product.get("nova_group")
+    if nova_group not in (1, 2, 3, 4):
+        nova_group = UNKNOWN_NOVA_GROUP
+    return (
+        NUTRISCORE_GRADES.index(grade) * 1000
+        + nova_group * 100
+        + min(additives_count(product), MAX_RANKED_ADDITIVES)
+    )
+
+
+def product_categories(product):
+    """The product's categories, broadest first.
+
+    OpenFoodFacts taxonomy tags ("en:sodas") when the payload has them,
+    otherwise the free-text categories normalized the same way.
+    """
+    tags = product.get("categories_tags")
+    if not tags:
+        tags = [
+            "en:" + re.sub(r"[^\w]+", "-", name.strip().lower()).strip("-")
+            for name in (product.get("categories") or "").split(",")
+        ]
+    categories = []
+    for tag in tags:
+        tag = tag[:100]
+        if tag and tag != "en:" and tag not in categories:
+            categories.append(tag)
+    return categories
+
+
+def product_fields(product):
+    grade = str(product.get("nutriscore_grade") or "").lower()
+    nova_group = product.get("nova_group")
+    return {
+        "product_name": (product.get("product_name") or "")[:200],
+        "brands": (product.get("brands") or "")[:200],
+        "categories": product.get("categories") or "",
+        "nutriscore_grade": grade if len(grade) == 1 and grade in NUTRISCORE_GRADES else "",
+        "nova_group": nova_group if nova_group in (1, 2, 3, 4) else None,
+        "additives_count": min(additives_count(product), 32767),
+        "image_url": (product.get("image_url") or "")[:500],
+        "rank": product_rank(product),
+        "last_modified_t": product.get("last_modified_t"),
+        "index_version": INDEX_VERSION,
+        "payload": {field: product[field] for field in OPENFOODFACTS_FIELDS if field in product},
+    }
+
+
+def category_entries(product, rank, categories):
+    return [
+        ProductCategory(product=product, category=category, depth=depth, rank=rank)
+        for depth, category in enumerate(categories)
+    ]
+
+
+def token_entries(product, product_data):
+    return [ProductToken(product=product, token=token) for token in product_tokens(product_data)]
+
+
+def save_product(barcode, product_data):
+    """Store or refresh one product and its index entries.
+
+    A product whose OpenFoodFacts revision has not changed is left alone.
+    """
+    fields = product_fields(product_data)
+    with transaction.atomic(), track_stage("product_store_save"):
+        stored = Product.objects.filter(pk=barcode).first()
+        if (
+            stored and fields["last_modified_t"]
+            and stored.last_modified_t == fields["last_modified_t"]
+            and stored.index_version == INDEX_VERSION
+        ):
+            return stored
+
+        stored, _ = Product.objects.update_or_create(barcode=barcode, defaults=fields)
+        ProductCategory.objects.filter(product=stored).delete()
+        ProductCategory.objects.bulk_create(category_entries(stored, stored.rank, product_categories(product_data)))
+        ProductToken.objects.filter(product=stored).delete()
+        ProductToken.objects.bulk_create(token_entries(stored, product_data))
+    return stored
+
+
+def import_products(products, batch_size=1000):
+    """Bulk-load OpenFoodFacts payloads (with their "code"); returns the number stored"""
+    count = 0
+    batch = []
+    for product_data in products:
+        if product_data.get("code"):
+            batch.append(product_data)
+        if len(batch) >= batch_size:
+            count += import_batch(batch)
+            batch = []
+    if batch:
+        count += import_batch(batch)
+    return count
+
+
+def import_batch(batch):
+    # The same barcode twice in one statement would be an upsert conflict
+    by_barcode = {str(product_data["code"])[:20]: product_data for product_data in batch}
+    products = [Product(barcode=barcode, **product_fields(data)) for barcode, data in by_barcode.items()]
+    entries = [
+        entry
+        for product in products
+        for entry in category_entries(product, product.rank, product_categories(by_barcode[product.barcode]))
+    ]
+    tokens = [entry for product in products for entry in token_entries(product, by_barcode[product.barcode])]
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=["barcode"], update_fields=PRODUCT_FIELDS,
+        )
+        ProductCategory.objects.filter(product__in=list(by_barcode)).delete()
+        ProductCategory.objects.bulk_create(entries, batch_size=1000)
+        ProductToken.objects.filter(product__in=list(by_barcode)).delete()
+        ProductToken.objects.bulk_create(tokens, batch_size=1000)
+    return len(products)
+
+
+def find_alternatives(barcode, limit):
+    """Up to `limit` better-ranked products sharing a category with barcode.
+
+    The most specific shared category is searched first, broader ones only
+    to fill up the list. Returns (product, alternatives), or (None, []) when
+    the product is not in the store.
+    """
+    with track_stage("product_alternatives"):
+        product = Product.objects.filter(pk=barcode).first()
+        if product is None:
+            return None, []
+
+        categories = product.category_entries.order_by("-depth").values_list("category", flat=True)
+        alternatives = []
+        seen = {product.barcode}
+        for category in categories:
+            entries = (
+                ProductCategory.objects
+                .filter(category=category, rank__lt=min(product.rank, UNRANKED))
+                .order_by("rank", "product")
+                .select_related("product")
+                [:limit + len(seen)]
+            )
+            for entry in entries:
+                if entry.product_id not in seen:
+                    seen.add(entry.product_id)
+                    alternatives.append((entry.product, category))
+                    if len(alternatives) >= limit:
+                        return product, alternatives
+        return product, alternatives
@@ -0,0 +1,119 @@
+import os
+import re
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.http import FileResponse, Http404, JsonResponse
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfilingMiddleware:
+    """Sample a single request with pyinstrument when a staff user asks for it.
+
+    Send ``X-Profile: 1`` or add ``?profile=1`` to a request made with a staff
+    session. The speedscope report (open it at https://www.speedscope.app) is
+    written to the profile store and its id returned in ``X-Profile-Id``.
+    Unflagged requests only pay for one header and one query parameter lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.META.get(PROFILE_HEADER) != "1" and request.GET.get(PROFILE_QUERY_PARAM) != "1":
+            return self.get_response(request)
+
+        user = getattr(request, "user", None)
+        if not (user and user.is_staff):
+            return self.get_response(request)
+
+        # Imported here so the profiler costs nothing until it is used
+        from pyinstrument import Profiler
+
+        profiler = Profiler(interval=settings.PROFILE_SAMPLE_INTERVAL)
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+
+        response["X-Profile-Id"] = save_profile(profiler, request)
+        return response
+
+
+def save_profile(profiler, request):
+    """Write a speedscope report to the store, evicting the oldest beyond the limit"""
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    store = settings.PROFILE_STORE_DIR
+    os.makedirs(store, mode=0o700, exist_ok=True)
+
+    profile_id = uuid.uuid4().hex
+    path = os.path.join(store, f"{profile_id}.json")
+    with open(path, "w") as f:
+        f.write(profiler.output(SpeedscopeRenderer()))
+    with open(os.path.join(store, f"{profile_id}.txt"), "w") as f:
+        f.write(f"{request.method} {request.get_full_path()}\n{time.time()}\n")
+
+    reports = sorted(
+        (entry for entry in os.scandir(store) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in reports[:-settings.PROFILE_STORE_MAX_REPORTS]:
+        for suffix in (".json", ".txt"):
+            try:
+                os.remove(entry.path[:-len(".json")] + suffix)
+            except FileNotFoundError:
+                pass
+
+    return profile_id
+
+
+def staff_required(view):
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        user = getattr(request, "user", None)
+        if not (user and user.is_staff):
+            return JsonResponse({"error": "Staff access required", "status": "error"}, status=403)
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+@staff_required
+def profile_list(request):
+    """List the stored profiles, newest first"""
+    store = settings.PROFILE_STORE_DIR
+    profiles = []
+    if os.path.isdir(store):
+        for entry in os.scandir(store):
+            if not entry.name.endswith(".txt"):
+                continue
+            try:
+                with open(entry.path) as f:
+                    request_line, created = f.read().splitlines()[:2]
+            except (FileNotFoundError, ValueError):
+                # Evicted or still being written by another worker
+                continue
+            profiles.append({
+                "id": entry.name[:-len(".txt")],
+                "request": request_line,
+                "created": float(created),
+            })
+    profiles.sort(key=lambda profile: profile["created"], reverse=True)
+    return JsonResponse({"profiles": profiles})
+
+
+@staff_required
+def profile_detail(request, profile_id):
+    """Download one speedscope report"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise Http404("Unknown profile")
+    path = os.path.join(settings.PROFILE_STORE_DIR, f"{profile_id}.json")
+    if not os.path.exists(path):
+        raise Http404("Unknown profile")
+    return FileResponse(open(path, "rb"), content_type="application/json", as_attachment=True, filename=f"{profile_id}.speedscope.json")
@@ -0,0 +1,212 @@
+"""
+Token-bucket rate limits and daily quotas for the API.
+
+Each client gets one bucket per scope, per API key or, without a key, per
+client IP: "barcode" for the cheap lookups and "image" for the photo
+analyses that may call Gemini. A bucket holds up to `rate` tokens and
+refills at `rate` per minute, so a client can burst to its per-minute
+limit and sustain it. Image analyses are also counted against a daily
+quota. The chunks of resumable uploads have their own "upload" scope, with
+the same limit for every client, so a large upload never eats into the
+budget for scans.
+
+The buckets live in a small SQLite file shared by the workers of the host,
+never in the application database. A check is a single
+INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement, atomic across
+processes. In WAL mode with synchronous=OFF it takes tens of microseconds.
+Limits are per host: behind a load balancer with N hosts a client can get
+up to N times its limit. If the file cannot be used (locked, disk full,
+read-only volume), requests are let through and the error is counted,
+like the product cache does.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from .auth import request_api_key
+from .metrics import record_error, track_stage
+
+DAY = 24 * 60 * 60
+# Expired buckets and past days' counters are deleted every this many checks
+PRUNE_EVERY = 10000
+
+RateLimit = namedtuple("RateLimit", "allowed limit remaining reset retry_after policy")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    granted INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    day INTEGER NOT NULL,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Refill for the time since the last request, then take `cost` tokens if
+# there are enough. All SET expressions see the row as it was before.
+TAKE_TOKENS = """
+INSERT INTO buckets (key, tokens, updated, granted) VALUES (:key, :capacity - :cost, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    granted = min(:capacity, tokens + (:now - updated) * :rate) >= :cost,
+    tokens = min(:capacity, tokens + (:now - updated) * :rate)
+        - (CASE WHEN min(:capacity, tokens + (:now - updated) * :rate) >= :cost THEN :cost ELSE 0 END),
+    updated = :now
+RETURNING tokens, granted
+"""
+
+# Returns no row once the day's count has reached the limit
+COUNT_REQUEST = """
+INSERT INTO counters (key, day, count) VALUES (:key, :day, 1)
+ON CONFLICT (key) DO UPDATE SET count = count + 1 WHERE count < :limit
+RETURNING count
+"""
+
+
+class TokenBucketStore:
+    """Buckets and daily counters in a SQLite file, one connection per thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self):
+        local = self.local
+        # SQLite connections must not cross a fork
+        if getattr(local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.executescript(SCHEMA)
+            local.connection = connection
+            local.pid = os.getpid()
+            local.checks = 0
+        local.checks += 1
+        if local.checks % PRUNE_EVERY == 0:
+            self.prune(local.connection)
+        return local.connection
+
+    def prune(self, connection):
+        now = time.time()
+        connection.execute("DELETE FROM buckets WHERE updated < ?", (now - DAY,))
+        connection.execute("DELETE FROM counters WHERE day < ?", (int(now // DAY),))
+
+    def take(self, key, per_minute, cost=1, now=None):
+        """Take cost tokens from the bucket; returns (granted, tokens left)"""
+        now = time.time() if now is None else now
+        try:
+            tokens, granted = self.connection().execute(TAKE_TOKENS, {
+                "key": key,
+                "capacity": per_minute,
+                "rate": per_minute / 60,
+                "cost": cost,
+                "now": now,
+            }).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            # Fail open: an unusable store must not take the API down
+            record_error("rate_limit", e)
+            return True, per_minute
+        return bool(granted), tokens
+
+    def count(self, key, limit, now=None):
+        """Count one request against a daily limit; returns (granted, count so far)"""
+        now = time.time() if now is None else now
+        day = int(now // DAY)
+        try:
+            row = self.connection().execute(COUNT_REQUEST, {"key": f"{key}:{day}", "day": day, "limit": limit}).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            record_error("rate_limit", e)
+            return True, 0
+        return (True, row[0]) if row else (False, limit)
+
+
+rate_limits = TokenBucketStore(settings.RATE_LIMIT_STORE)
+
+
+def client_limits(scope, api_key):
+    """(requests per minute, requests per UTC day or None) for a client in scope"""
+    if scope == "upload":
+        # Chunks only carry an upload that was started under the barcode limit
+        return settings.UPLOAD_CHUNK_RATE_LIMIT, None
+    if api_key is not None:
+        daily = api_key.image_daily_quota if scope == "image" else None
+        return getattr(api_key, f"{scope}_rate"), daily
+    return settings.ANONYMOUS_RATE_LIMITS[scope], settings.ANONYMOUS_DAILY_QUOTAS.get(scope)
+
+
+def check_rate_limit(scope, api_key, ident):
+    """Take one request from the client's bucket (and quota) for scope"""
+    client = f"key:{api_key.pk}" if api_key is not None else f"ip:{ident}"
+    per_minute, daily = client_limits(scope, api_key)
+    policy = f"{per_minute};w=60" + (f", {daily};w={DAY}" if daily else "")
+    now = time.time()
+
+    with track_stage("rate_limit"):
+        granted, tokens = rate_limits.take(f"{scope}:{client}", per_minute, now=now)
+        if granted and daily:
+            within_quota, _ = rate_limits.count(f"{scope}:{client}", daily, now=now)
+            if not within_quota:
+                until_tomorrow = math.ceil(DAY - now % DAY)
+                return RateLimit(False, daily, 0, until_tomorrow, until_tomorrow, policy)
+
+    refill_rate = per_minute / 60
+    return RateLimit(
+        allowed=granted,
+        limit=per_minute,
+        remaining=int(tokens),
+        reset=math.ceil((per_minute - tokens) / refill_rate),
+        retry_after=None if granted else math.ceil((1 - tokens) / refill_rate),
+        policy=policy,
+    )
+
+
+def client_ident(request):
+    """The client IP used for clients without an API key (DRF's NUM_PROXIES rules)"""
+    return BaseThrottle().get_ident(request)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Applies check_rate_limit to views that declare a throttle_scope"""
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None:
+            return True
+
+        self.result = check_rate_limit(scope, request_api_key(request), self.get_ident(request))
+        # Picked up by RateLimitHeadersMiddleware, whatever the response
+        request._request.rate_limit = self.result
+        return self.result.allowed
+
+    def wait(self):
+        return self.result.retry_after
+
+
+class RateLimitHeadersMiddleware:
+    """Adds the RateLimit-* headers (and Retry-After) of a rate-limited request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        result = getattr(request, "rate_limit", None)
+        if result is not None:
+            response["RateLimit-Policy"] = result.policy
+            response["RateLimit-Limit"] = str(result.limit)
+            response["RateLimit-Remaining"] = str(result.remaining)
+            response["RateLimit-Reset"] = str(result.reset)
+            if result.retry_after is not None:
+                response["Retry-After"] = str(result.retry_after)
+        return response
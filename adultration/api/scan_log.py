@@ -0,0 +1,133 @@
+import atexit
+import os
+import re
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from .metrics import record_error, track_stage
+
+# The Gemini analysis is sectioned text; its risk line looks like "Risk Level: High"
+AI_RISK_LEVEL = re.compile(r"\b(?:risk\s*level|overall\s*risk)\s*[:\-]?\s*(low|medium|high)\b", re.IGNORECASE)
+
+
+class ScanEventBuffer:
+    """Collects ScanEvents in memory and writes them with bulk_create.
+
+    A background thread flushes whenever SCAN_EVENT_FLUSH_SIZE events are
+    waiting or SCAN_EVENT_FLUSH_INTERVAL seconds have passed, so recording a scan never waits on
+    the database. flush() writes whatever is pending synchronously; it runs
+    at interpreter exit and from gunicorn's worker_exit hook, so a graceful
+    shutdown loses nothing. A hard kill can still lose up to one interval.
+    """
+
+    def __init__(self, flush_size=None, flush_interval=None, max_pending=None):
+        self.flush_size = flush_size or settings.SCAN_EVENT_FLUSH_SIZE
+        self.flush_interval = flush_interval or settings.SCAN_EVENT_FLUSH_INTERVAL
+        self.max_pending = max_pending or settings.SCAN_EVENT_MAX_PENDING
+        self.condition = threading.Condition()
+        self.events = []
+        self.thread = None
+        self.pid = None
+        atexit.register(self.flush)
+
+    def add(self, event):
+        with self.condition:
+            self.ensure_thread()
+            if len(self.events) >= self.max_pending:
+                # The database has been unreachable for a while; shed load
+                # rather than grow without bound
+                record_error("scan_log", OverflowError())
+                return
+            self.events.append(event)
+            if len(self.events) >= self.flush_size:
+                self.condition.notify()
+
+    def ensure_thread(self):
+        # Threads do not survive fork, and events buffered before it belong
+        # to the parent, so a forked worker starts afresh
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.events = []
+            self.thread = None
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="scan-event-flusher", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.events) >= self.flush_size, timeout=self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self.condition:
+            if self.pid != os.getpid():
+                return  # nothing recorded in this process; inherited events are the parent's
+            batch, self.events = self.events, []
+        if not batch:
+            return
+
+        from .models import ScanEvent
+
+        # This may run on the flusher thread, whose connection can go stale
+        close_old_connections()
+        try:
+            with track_stage("scan_log_flush"):
+                ScanEvent.objects.bulk_create(batch, batch_size=500)
+        except DatabaseError as e:
+            print(f"Error writing {len(batch)} scan events: {e}")
+            # Keep them for the next flush, within the pending limit
+            with self.condition:
+                room = self.max_pending - len(self.events)
+                if room > 0:
+                    self.events[:0] = batch[-room:]
+
+
+scan_events = ScanEventBuffer()
+
+
+def record_scan(source, started, analysis=None, barcode="", cache_status="none", ai_analysis=None):
+    """Buffer a ScanEvent for one finished lookup.
+
+    started is the perf_counter() value taken when the lookup began.
+    analysis is the barcode analysis dict, if any; ai_analysis the Gemini
+    text, whose risk level is used when there is no product analysis.
+    """
+    from .models import ScanEvent
+
+    latency_ms = round((perf_counter() - started) * 1000)
+    status = "error"
+    risk_level = ""
+    product = {}
+    flags = 0
+    if analysis:
+        status = analysis.get("status", "error")
+        risk_level = (analysis.get("risk_assessment") or {}).get("overall_risk", "")
+        product = analysis.get("product_info") or {}
+        flags = len((analysis.get("adulteration_analysis") or {}).get("risks", ()))
+    if not risk_level and ai_analysis:
+        status = "error" if ai_analysis.startswith("AI analysis failed") else "success"
+        match = AI_RISK_LEVEL.search(ai_analysis)
+        risk_level = match.group(1).capitalize() if match else ""
+
+    scan_events.add(ScanEvent(
+        barcode=barcode or "",
+        source=source,
+        status=status,
+        risk_level=risk_level,
+        cache_status=cache_status,
+        latency_ms=latency_ms,
+        product_name=(product.get("product_name") or "")[:200],
+        category=primary_category(product),
+        country=(product.get("countries_tags") or [""])[0][:64],
+        adulteration_flags=min(flags, 32767),
+    ))
+
+
+def primary_category(product):
+    """The broadest of the product's categories ("Beverages" for "Beverages, Sodas")"""
+    categories = product.get("categories") or ""
+    return categories.split(",", 1)[0].strip()[:100]
@@ -0,0 +1,183 @@
+"""
+Continuous-scan sessions over a WebSocket, for scanning many items in a row.
+
+A client connects once to ws(s)://<host>/ws/v1/scan/ and then sends each
+detected barcode as a text frame holding just the digits. Each result comes
+back as one JSON text frame as soon as its lookup finishes, in the shape of
+the /api/v1/barcode/ response:
+
+    {"status": "success", "barcode": "...", "analysis": {...}}
+    {"status": "error", "barcode": "...", "error": "...", "retry_after": 3}
+
+Lookups are pipelined: up to SCAN_SESSION_MAX_IN_FLIGHT run at once on
+worker threads, so results can arrive out of order; match them by barcode.
+A barcode that is already being looked up in the session is not looked up
+again. Every lookup counts against the client's "barcode" rate limit, as a
+POST would. API clients may send their key in an X-API-Key header with the
+handshake. Browsers cannot set headers there, so they are limited per IP.
+
+This is a plain ASGI application. adultration_main/asgi.py routes WebSocket
+connections here and everything else to Django.
+"""
+
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http.request import split_domain_port, validate_host
+
+from .auth import lookup_api_key
+from .ratelimit import check_rate_limit, client_ident
+from .services import product_service
+
+SCAN_SESSION_PATH = "/ws/v1/scan/"
+BARCODE = re.compile(r"^\d{1,20}$")
+
+# Close codes sent before the handshake is accepted reach the client as HTTP 403
+CLOSE_FORBIDDEN = 4403
+CLOSE_UNAUTHORIZED = 4401
+
+
+def allowed_origin(headers):
+    """Browsers always send Origin; it must be one of our own hosts.
+
+    Nothing else stops another site's page from opening a session with a
+    visitor's IP and using up their rate limit.
+    """
+    origin = headers.get("origin")
+    if origin is None:
+        return True
+    domain, _ = split_domain_port(urlsplit(origin).netloc)
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = [".localhost", "127.0.0.1", "[::1]"]
+    return bool(domain) and validate_host(domain, allowed_hosts)
+
+
+def connection_meta(scope, headers):
+    """The request.META entries client_ident needs, from an ASGI scope"""
+    meta = {"REMOTE_ADDR": scope["client"][0] if scope.get("client") else ""}
+    if "x-forwarded-for" in headers:
+        meta["HTTP_X_FORWARDED_FOR"] = headers["x-forwarded-for"]
+    return meta
+
+
+async def scan_session(scope, receive, send):
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    if not allowed_origin(headers):
+        await send({"type": "websocket.close", "code": CLOSE_FORBIDDEN})
+        return
+
+    api_key = None
+    raw_key = headers.get("x-api-key", "").strip()
+    if raw_key:
+        api_key = await sync_to_async(lookup_api_key)(raw_key)
+        if api_key is None:
+            await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+            return
+    elif settings.API_KEY_REQUIRED:
+        await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+        return
+
+    ident = client_ident(SimpleNamespace(META=connection_meta(scope, headers)))
+    await send({"type": "websocket.accept"})
+    await ScanSession(send, api_key, ident).run(receive)
+
+
+class ScanSession:
+    """One connected scanner: reads barcodes, writes results as they finish"""
+
+    def __init__(self, send, api_key, ident):
+        self.send = send
+        self.api_key = api_key
+        self.ident = ident
+        self.slots = asyncio.Semaphore(settings.SCAN_SESSION_MAX_IN_FLIGHT)
+        # Results are written by concurrent lookups; frames must not interleave
+        self.send_lock = asyncio.Lock()
+        self.pending = set()
+        self.tasks = set()
+
+    async def run(self, receive):
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(receive(), settings.SCAN_SESSION_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    await self.send({"type": "websocket.close", "code": 1000})
+                    return
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message["type"] == "websocket.receive":
+                    text = message.get("text")
+                    if text is None:
+                        text = (message.get("bytes") or b"").decode("ascii", "replace")
+                    self.submit(text.strip())
+        finally:
+            for task in self.tasks:
+                task.cancel()
+
+    def submit(self, barcode):
+        if not BARCODE.match(barcode):
+            self.spawn(self.reply_error(barcode[:20], "Invalid barcode"))
+        elif barcode in self.pending:
+            return
+        elif len(self.pending) >= settings.SCAN_SESSION_MAX_PENDING:
+            self.spawn(self.reply_error(barcode, "Too many scans waiting, please slow down"))
+        else:
+            self.pending.add(barcode)
+            self.spawn(self.lookup(barcode))
+
+    def spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def lookup(self, barcode):
+        try:
+            async with self.slots:
+                text = await sync_to_async(self.analyze, thread_sensitive=False)(barcode)
+        finally:
+            self.pending.discard(barcode)
+        await self.reply(text)
+
+    def analyze(self, barcode):
+        """Rate-limit and analyze one barcode on a worker thread; returns the result frame"""
+        limit = check_rate_limit("barcode", self.api_key, self.ident)
+        if not limit.allowed:
+            return json.dumps({
+                "status": "error",
+                "barcode": barcode,
+                "error": "Too many requests, please try again shortly",
+                "retry_after": limit.retry_after,
+            })
+
+        # Worker threads outlive requests; don't let them keep stale connections
+        close_old_connections()
+        try:
+            analysis = product_service.analyze_product_by_barcode(barcode)
+            result = {"status": "success", "barcode": barcode, "analysis": analysis}
+        except Exception as e:
+            result = {"status": "error", "barcode": barcode, "error": f"Analysis failed: {str(e)}"}
+        finally:
+            close_old_connections()
+        return json.dumps(result, cls=DjangoJSONEncoder)
+
+    async def reply_error(self, barcode, error):
+        await self.reply(json.dumps({"status": "error", "barcode": barcode, "error": error}))
+
+    async def reply(self, text):
+        async with self.send_lock:
+            try:
+                await self.send({"type": "websocket.send", "text": text})
+            except (OSError, RuntimeError):
+                pass  # the client has gone; run() is cancelling the rest
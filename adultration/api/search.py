@@ -0,0 +1,303 @@
+"""
+Boolean search over the local product store.
+
+Products are indexed as field-qualified tokens, one ProductToken row per
+distinct token: every word of ingredients_text ("ingredient:palm") and
+every additive, allergen, label and manufacturing place tag without its
+language prefix ("additive:e211", "place:india"). product_store rewrites a
+product's tokens whenever it saves the product.
+
+Queries combine terms with AND (also implied between terms), OR, NOT and
+parentheses:
+
+    additive:e211 AND ingredient:"hydrogenated fat" AND place:india
+    (allergen:milk OR allergen:soybeans) NOT label:organic
+
+A quoted ingredient phrase matches products having all of its words. A
+term without a field matches any field.
+
+A query is answered one page at a time in barcode order. Candidates are
+read from the posting lists of the cheapest terms that every match must
+contain, in chunks, and the whole expression is checked against each
+chunk in one indexed lookup. So the cost of a page follows the rarest
+required term, not the size of the store. A page stops early after
+MAX_SCANNED candidates, returning a cursor to continue from.
+"""
+
+import re
+import unicodedata
+
+from .metrics import track_stage
+from .models import Product, ProductToken
+
+SEARCH_FIELDS = {
+    "ingredient": "ingredients_text",
+    "additive": "additives_tags",
+    "allergen": "allergens_tags",
+    "label": "labels_tags",
+    "place": "manufacturing_places_tags",
+}
+TAG_FIELDS = [field for field in SEARCH_FIELDS if field != "ingredient"]
+
+STOPWORDS = frozenset({"and", "or", "of", "the", "with", "in", "from", "contains", "may", "de", "et"})
+
+MAX_TOKEN_LENGTH = 100
+MAX_QUERY_TERMS = 20
+# Posting lists are only counted up to this many rows to pick the driving terms
+ESTIMATE_LIMIT = 10000
+CANDIDATE_CHUNK = 500
+MAX_SCANNED = 20000
+
+QUERY_TOKEN = re.compile(r'\(|\)|[^\s()"]+:"[^"]*"|"[^"]*"|[^\s()"]+')
+LANGUAGE_PREFIX = re.compile(r"^[a-z]{2}:")
+
+
+class SearchQueryError(ValueError):
+    pass
+
+
+def fold(text):
+    """Lowercase and strip accents, so "Émulsifiant" and "emulsifiant" match"""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text):
+    return [
+        word for word in re.findall(r"[a-z0-9]+", fold(text))
+        if len(word) > 1 and not word.isdigit() and word not in STOPWORDS
+    ]
+
+
+def tag_slug(tag):
+    return re.sub(r"[^a-z0-9]+", "-", fold(LANGUAGE_PREFIX.sub("", str(tag).strip().lower()))).strip("-")
+
+
+def token(field, value):
+    return f"{field}:{value}"[:MAX_TOKEN_LENGTH]
+
+
+def product_tokens(product_data):
+    """The distinct search tokens of an OpenFoodFacts payload"""
+    tokens = {token("ingredient", word) for word in words(product_data.get("ingredients_text") or "")}
+    for field in TAG_FIELDS:
+        for tag in product_data.get(SEARCH_FIELDS[field]) or ():
+            slug = tag_slug(tag)
+            if slug:
+                tokens.add(token(field, slug))
+    return tokens
+
+
+# Query trees are tuples: ("term", token), ("not", node), ("and" | "or", [nodes])
+
+def parse_query(query):
+    parser = QueryParser(QUERY_TOKEN.findall(query))
+    tree = parser.parse()
+    if len(query_terms(tree)) > MAX_QUERY_TERMS:
+        raise SearchQueryError(f"Queries are limited to {MAX_QUERY_TERMS} terms")
+    return tree
+
+
+class QueryParser:
+    """Recursive descent parser; NOT binds tightest, then AND, then OR"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def peek_operator(self):
+        current = self.peek()
+        return current.upper() if current and current.upper() in ("AND", "OR", "NOT") else current
+
+    def advance(self):
+        current = self.peek()
+        self.position += 1
+        return current
+
+    def parse(self):
+        if not self.tokens:
+            raise SearchQueryError("The query is empty")
+        tree = self.parse_or()
+        if self.peek() is not None:
+            raise SearchQueryError(f"Unexpected {self.peek()!r}")
+        return tree
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek_operator() == "OR":
+            self.advance()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() is not None and self.peek_operator() not in ("OR", ")"):
+            if self.peek_operator() == "AND":
+                self.advance()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not(self):
+        if self.peek_operator() == "NOT":
+            self.advance()
+            return ("not", self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        current = self.advance()
+        if current is None or current.upper() in ("AND", "OR"):
+            raise SearchQueryError("Expected a search term")
+        if current == ")":
+            raise SearchQueryError("Unexpected ')'")
+        if current == "(":
+            tree = self.parse_or()
+            if self.advance() != ")":
+                raise SearchQueryError("Missing ')'")
+            return tree
+        return parse_term(current)
+
+
+def parse_term(text):
+    field, value = "", text
+    if re.match(r"^\w+:", text) and not LANGUAGE_PREFIX.match(text):
+        field, _, value = text.partition(":")
+        if field not in SEARCH_FIELDS:
+            raise SearchQueryError(f"Unknown field {field!r}; use one of {', '.join(SEARCH_FIELDS)}")
+    value = value.strip('"')
+
+    options = []
+    if field in ("", "ingredient"):
+        ingredient_words = [("term", token("ingredient", word)) for word in words(value)]
+        if len(ingredient_words) == 1:
+            options.append(ingredient_words[0])
+        elif ingredient_words:
+            options.append(("and", ingredient_words))
+    if field == "":
+        tag_fields = TAG_FIELDS
+    elif field == "ingredient":
+        tag_fields = []
+    else:
+        tag_fields = [field]
+    for tag_field in tag_fields:
+        slug = tag_slug(value)
+        if slug:
+            options.append(("term", token(tag_field, slug)))
+
+    if not options:
+        raise SearchQueryError(f"{text!r} has nothing to search for")
+    return options[0] if len(options) == 1 else ("or", options)
+
+
+def query_terms(tree):
+    kind = tree[0]
+    if kind == "term":
+        return {tree[1]}
+    if kind == "not":
+        return query_terms(tree[1])
+    return set().union(*(query_terms(child) for child in tree[1]))
+
+
+def matches(tree, tokens):
+    kind = tree[0]
+    if kind == "term":
+        return tree[1] in tokens
+    if kind == "not":
+        return not matches(tree[1], tokens)
+    if kind == "and":
+        return all(matches(child, tokens) for child in tree[1])
+    return any(matches(child, tokens) for child in tree[1])
+
+
+def driving_terms(tree, estimates):
+    """The cheapest terms whose posting lists together hold every match of tree.
+
+    None when no such set exists (a negation alone matches nearly everything).
+    """
+    kind = tree[0]
+    if kind == "term":
+        return [tree[1]]
+    if kind == "not":
+        return None
+    options = [driving_terms(child, estimates) for child in tree[1]]
+    if kind == "or":
+        if any(option is None for option in options):
+            return None
+        return sorted({term for option in options for term in option})
+    options = [option for option in options if option is not None]
+    if not options:
+        return None
+    return min(options, key=lambda terms: sum(estimates[term] for term in terms))
+
+
+def estimate(term):
+    return ProductToken.objects.filter(token=term)[:ESTIMATE_LIMIT].count()
+
+
+def next_candidates(terms, after):
+    """The next chunk of barcodes after `after` holding any of the terms.
+
+    Returns (barcodes, exhausted); exhausted means no posting list has
+    anything left beyond this chunk.
+    """
+    barcodes = set()
+    bound = None
+    for term in terms:
+        chunk = list(
+            ProductToken.objects.filter(token=term, product__gt=after)
+            .order_by("product").values_list("product", flat=True)[:CANDIDATE_CHUNK]
+        )
+        barcodes.update(chunk)
+        if len(chunk) == CANDIDATE_CHUNK:
+            # Beyond this barcode the term may have more postings not read yet
+            bound = chunk[-1] if bound is None else min(bound, chunk[-1])
+    return sorted(barcode for barcode in barcodes if bound is None or barcode <= bound), bound is None
+
+
+def search_products(query, cursor="", limit=20):
+    """One page of products matching query, after the cursor barcode.
+
+    Returns (products, next_cursor); next_cursor is None on the last page.
+    Raises SearchQueryError for queries that cannot be run.
+    """
+    with track_stage("product_search"):
+        tree = parse_query(query)
+        terms = query_terms(tree)
+        estimates = {term: estimate(term) for term in terms}
+        drivers = driving_terms(tree, estimates)
+        if drivers is None:
+            raise SearchQueryError("A query needs at least one term that is not negated")
+
+        found = []
+        position = cursor or ""
+        scanned = 0
+        while len(found) < limit and scanned < MAX_SCANNED:
+            candidates, exhausted = next_candidates(drivers, position)
+            if not candidates:
+                position = None
+                break
+
+            present = {}
+            for barcode, term in ProductToken.objects.filter(
+                product__in=candidates, token__in=terms,
+            ).values_list("product", "token"):
+                present.setdefault(barcode, set()).add(term)
+
+            for barcode in candidates:
+                position = barcode
+                scanned += 1
+                if matches(tree, present.get(barcode, ())):
+                    found.append(barcode)
+                    if len(found) == limit:
+                        break
+            else:
+                if exhausted:
+                    position = None
+                    break
+
+        products = Product.objects.in_bulk(found)
+        return [products[barcode] for barcode in found if barcode in products], position
@@ -1,6 +1,70 @@
 from rest_framework import serializers
+from .models import RollupPeriod
+from .product_store import MAX_ALTERNATIVES
+from .uploads import ResumableUpload, UploadNotFound
 
 class BarcodeSerializer(serializers.Serializer):
     Barcode=serializers.CharField(max_length=20)
 class ImageSerializer(serializers.Serializer):
-    image=serializers.ImageField()
\ No newline at end of file
+    image=serializers.FileField(required=False)
+    # A completed chunked upload (see ImageUploadApi) instead of a multipart file
+    upload_id=serializers.CharField(required=False)
+    use_ai=serializers.BooleanField(required=False, default=False)
+
+    def validate_image(self, value):
+        from PIL import Image, UnidentifiedImageError
+
+        # Only the header is parsed here; pixels are decoded once, at reduced
+        # scale, during preprocessing
+        try:
+            Image.open(value)
+        except (UnidentifiedImageError, OSError):
+            raise serializers.ValidationError("Upload a valid image. The file you uploaded was either not an image or a corrupted image.")
+        value.seek(0)
+        return value
+
+    def validate(self, attrs):
+        if "upload_id" in attrs:
+            try:
+                upload = ResumableUpload.load(attrs["upload_id"])
+            except UploadNotFound as e:
+                raise serializers.ValidationError({"upload_id": str(e.detail)})
+            if not upload.complete:
+                raise serializers.ValidationError({"upload_id": "Upload is incomplete"})
+
+            image = upload.as_uploaded_file()
+            try:
+                attrs["image"] = self.validate_image(image)
+            except serializers.ValidationError as e:
+                image.close()
+                raise serializers.ValidationError({"image": e.detail})
+            attrs["upload"] = upload
+        elif "image" not in attrs:
+            raise serializers.ValidationError({"image": "No file was submitted."})
+        return attrs
+
+class AlternativesQuerySerializer(serializers.Serializer):
+    limit=serializers.IntegerField(min_value=1, max_value=MAX_ALTERNATIVES, default=5)
+
+class SearchQuerySerializer(serializers.Serializer):
+    q=serializers.CharField(max_length=500)
+    # Barcode of the last result of the previous page
+    cursor=serializers.CharField(max_length=20, required=False, default="")
+    limit=serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+class ExportQuerySerializer(serializers.Serializer):
+    category=serializers.CharField(max_length=100, required=False, default="")
+    # Barcode of the last complete line of an interrupted export
+    cursor=serializers.CharField(max_length=20, required=False, default="")
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    period=serializers.ChoiceField(choices=RollupPeriod.choices, default=RollupPeriod.DAY)
+    days=serializers.IntegerField(min_value=1, max_value=366, default=7)
+    by=serializers.ChoiceField(choices=["category", "country"], default="category")
+    limit=serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        # Hourly series are for recent activity; longer spans use daily buckets
+        if attrs["period"] == RollupPeriod.HOUR and attrs["days"] > 7:
+            raise serializers.ValidationError({"days": "Hourly data is limited to the last 7 days."})
+        return attrs
@@ -0,0 +1,524 @@
+"""
+Barcode and image analysis pipelines.
+
+The API views, the frontend views, management commands and batch jobs all
+call the module-level product_service / image_service instances, so they
+share one HTTP connection pool, one cache and one set of analysis rules.
+"""
+
+from time import perf_counter
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from . import product_store
+from .product_store import OPENFOODFACTS_FIELDS
+from .home_tests import home_tests_for_product
+from .LLM import LLM
+from .metrics import track_stage, record_cache_lookup, record_upstream_status
+from .models import ScanEvent
+from .scan_log import record_scan
+
+
+class ProductAnalysisService:
+    """OpenFoodFacts lookup plus health and adulteration analysis for a barcode"""
+
+    def __init__(self):
+        # Pooled keep-alive connections to OpenFoodFacts, shared by all callers
+        self.session = requests.Session()
+
+    def analyze_product_by_barcode(self, barcode, record=True):
+        """Comprehensive product analysis using OpenFoodFacts API"""
+        
+        started = perf_counter()
+        analysis, cache_status = self.analyze_barcode(barcode)
+        if record:
+            record_scan(ScanEvent.Source.BARCODE, started, analysis, barcode, cache_status)
+        return analysis
+
+    def analyze_barcode(self, barcode):
+        """Run the barcode analysis; returns (analysis, cache_status)"""
+        
+        # Fetch detailed product information
+        product_data, cache_status = self.lookup_openfoodfacts_data(barcode)
+        
+        if not product_data:
+            return {
+                "status": "not_found",
+                "message": "Product not found in OpenFoodFacts database",
+                "barcode": barcode,
+                "recommendations": "Try scanning the barcode again or enter manually"
+            }, cache_status
+        
+        return self.analyze_product_data(product_data), cache_status
+    
+    def analyze_product_data(self, product_data):
+        """The full analysis of an OpenFoodFacts payload, as returned for a barcode"""
+        
+        # Analyze the product for health and adulteration
+        analysis = self.analyze_product_health_and_adulteration(product_data)
+        
+        return {
+            "status": "success",
+            "product_info": product_data,
+            "health_analysis": analysis["health"],
+            "adulteration_analysis": analysis["adulteration"],
+            "recommendations": analysis["recommendations"],
+            "home_tests": analysis["home_tests"],
+            "risk_assessment": analysis["risk_assessment"]
+        }
+
+    def fetch_openfoodfacts_data(self, barcode):
+        """Fetch comprehensive product data, served from the cache when possible"""
+        return self.lookup_openfoodfacts_data(barcode)[0]
+
+    def lookup_openfoodfacts_data(self, barcode):
+        """Like fetch_openfoodfacts_data, also saying whether the cache answered
+
+        Returns (product_data, cache_status), cache_status being "hit" or "miss".
+        """
+        
+        cache_key = f"off:product:{barcode}"
+        with track_stage("cache_get"):
+            cached = cache.get(cache_key)
+        record_cache_lookup("openfoodfacts", cached is not None)
+        if cached is not None:
+            return cached or None, ScanEvent.CacheStatus.HIT
+        
+        product_data, definitive = self.request_openfoodfacts_data(barcode)
+        
+        # Unknown barcodes are cached too (as an empty dict), for less time,
+        # so repeated scans of a missing product don't all go upstream.
+        # Timeouts and upstream errors are never cached.
+        if definitive:
+            with track_stage("cache_set"):
+                cache.set(
+                    cache_key,
+                    product_data or {},
+                    settings.OPENFOODFACTS_CACHE_TIMEOUT if product_data else settings.OPENFOODFACTS_NOT_FOUND_CACHE_TIMEOUT,
+                )
+        if product_data:
+            self.store_product(barcode, product_data)
+        return product_data, ScanEvent.CacheStatus.MISS
+
+    def store_product(self, barcode, product_data):
+        """Keep the product in the local store; failing to do so never fails a lookup"""
+        try:
+            product_store.save_product(barcode, product_data)
+        except DatabaseError as e:
+            print(f"Error storing product {barcode}: {e}")
+
+    def find_alternatives(self, barcode, limit=5):
+        """Healthier products in the same category as barcode.
+
+        Returns (product, alternatives) as product_store.find_alternatives
+        does; a product not yet in the store is looked up first.
+        """
+        
+        product, alternatives = product_store.find_alternatives(barcode, limit)
+        if product is None:
+            product_data = self.fetch_openfoodfacts_data(barcode)
+            if not product_data:
+                return None, []
+            # Cached lookups from before the store existed are not stored yet
+            self.store_product(barcode, product_data)
+            product, alternatives = product_store.find_alternatives(barcode, limit)
+        return product, alternatives
+
+    def request_openfoodfacts_data(self, barcode):
+        """Fetch comprehensive product data from OpenFoodFacts API
+
+        Returns (product_data, definitive); definitive is False when the
+        lookup failed rather than OpenFoodFacts not knowing the product.
+        """
+        
+        url = f"{settings.OPENFOODFACTS_BASE_URL}/api/v2/product/{barcode}"
+        params = {
+            "fields": ",".join(OPENFOODFACTS_FIELDS)
+        }
+        
+        try:
+            with track_stage("off_fetch"):
+                response = self.session.get(url, params=params, timeout=10)
+            record_upstream_status("openfoodfacts", response.status_code)
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                if data.get("status") == 1 and data.get("product"):
+                    return data["product"], True
+                else:
+                    return None, True
+            else:
+                return None, response.status_code == 404
+                
+        except requests.RequestException as e:
+            record_upstream_status("openfoodfacts", "error")
+            print(f"Error fetching OpenFoodFacts data: {e}")
+            return None, False
+
+    def analyze_product_health_and_adulteration(self, product_data):
+        """Analyze product for health and adulteration risks"""
+        
+        # Health Analysis
+        health_analysis = self.analyze_health_factors(product_data)
+        
+        # Adulteration Analysis
+        adulteration_analysis = self.analyze_adulteration_risks(product_data)
+        
+        # Risk Assessment
+        risk_assessment = self.assess_overall_risk(health_analysis, adulteration_analysis)
+        
+        # Recommendations
+        recommendations = self.generate_recommendations(health_analysis, adulteration_analysis)
+        
+        # Home Tests
+        home_tests = self.generate_home_tests(product_data, adulteration_analysis)
+        
+        return {
+            "health": health_analysis,
+            "adulteration": adulteration_analysis,
+            "risk_assessment": risk_assessment,
+            "recommendations": recommendations,
+            "home_tests": home_tests
+        }
+
+    @track_stage("analyze_health_factors")
+    def analyze_health_factors(self, product_data):
+        """Analyze health factors of the product"""
+        
+        health_score = 0
+        health_issues = []
+        health_benefits = []
+        
+        # Nutri-Score Analysis
+        nutriscore = product_data.get("nutriscore_grade", "").upper()
+        if nutriscore in ["A", "B"]:
+            health_score += 2
+            health_benefits.append(f"Good Nutri-Score ({nutriscore})")
+        elif nutriscore in ["C"]:
+            health_score += 1
+            health_issues.append(f"Moderate Nutri-Score ({nutriscore})")
+        elif nutriscore in ["D", "E"]:
+            health_score -= 2
+            health_issues.append(f"Poor Nutri-Score ({nutriscore})")
+        
+        # NOVA Group Analysis (Food Processing)
+        nova_group = product_data.get("nova_group")
+        if nova_group == 1:
+            health_score += 2
+            health_benefits.append("Minimally processed food")
+        elif nova_group == 2:
+            health_score += 1
+            health_benefits.append("Processed culinary ingredients")
+        elif nova_group == 3:
+            health_score -= 1
+            health_issues.append("Processed food")
+        elif nova_group == 4:
+            health_score -= 2
+            health_issues.append("Ultra-processed food")
+        
+        # Nutritional Analysis
+        nutrition_analysis = self.analyze_nutrition(product_data)
+        health_score += nutrition_analysis["score"]
+        health_issues.extend(nutrition_analysis["issues"])
+        health_benefits.extend(nutrition_analysis["benefits"])
+        
+        # Additives Analysis
+        additives = product_data.get("additives_tags", [])
+        if additives:
+            harmful_additives = [additive for additive in additives if any(harmful in additive.lower() for harmful in ["e621", "e951", "e211", "e250"])]
+            if harmful_additives:
+                health_score -= 1
+                health_issues.append(f"Contains potentially harmful additives: {', '.join(harmful_additives)}")
+        
+        # Allergens Analysis
+        allergens = product_data.get("allergens_tags", [])
+        if allergens:
+            health_issues.append(f"Contains allergens: {', '.join(allergens)}")
+        
+        return {
+            "overall_score": health_score,
+            "nutriscore": nutriscore,
+            "nova_group": nova_group,
+            "health_issues": health_issues,
+            "health_benefits": health_benefits,
+            "nutrition_analysis": nutrition_analysis,
+            "additives_count": len(additives),
+            "allergens": allergens
+        }
+
+    @track_stage("analyze_nutrition")
+    def analyze_nutrition(self, product_data):
+        """Analyze nutritional content"""
+        
+        score = 0
+        issues = []
+        benefits = []
+        
+        # Sugar Analysis
+        sugars = product_data.get("sugars_100g", 0)
+        if sugars > 15:
+            score -= 2
+            issues.append(f"High sugar content ({sugars}g/100g)")
+        elif sugars < 5:
+            score += 1
+            benefits.append(f"Low sugar content ({sugars}g/100g)")
+        
+        # Salt Analysis
+        salt = product_data.get("salt_100g", 0)
+        if salt > 1.5:
+            score -= 2
+            issues.append(f"High salt content ({salt}g/100g)")
+        elif salt < 0.3:
+            score += 1
+            benefits.append(f"Low salt content ({salt}g/100g)")
+        
+        # Fat Analysis
+        fat = product_data.get("fat_100g", 0)
+        saturated_fat = product_data.get("saturated_fat_100g", 0)
+        
+        if saturated_fat > 5:
+            score -= 1
+            issues.append(f"High saturated fat ({saturated_fat}g/100g)")
+        
+        # Fiber Analysis
+        fiber = product_data.get("fiber_100g", 0)
+        if fiber > 3:
+            score += 1
+            benefits.append(f"Good fiber content ({fiber}g/100g)")
+        
+        # Protein Analysis
+        protein = product_data.get("proteins_100g", 0)
+        if protein > 10:
+            score += 1
+            benefits.append(f"Good protein content ({protein}g/100g)")
+        
+        return {
+            "score": score,
+            "issues": issues,
+            "benefits": benefits,
+            "sugars": sugars,
+            "salt": salt,
+            "fat": fat,
+            "saturated_fat": saturated_fat,
+            "fiber": fiber,
+            "protein": protein
+        }
+
+    @track_stage("analyze_adulteration_risks")
+    def analyze_adulteration_risks(self, product_data):
+        """Analyze potential adulteration risks"""
+        
+        adulteration_risks = []
+        risk_level = "Low"
+        
+        # Check for suspicious ingredients
+        ingredients_text = product_data.get("ingredients_text", "").lower()
+        suspicious_patterns = [
+            "artificial", "synthetic", "imitation", "substitute",
+            "modified", "hydrogenated", "trans fat", "high fructose"
+        ]
+        
+        for pattern in suspicious_patterns:
+            if pattern in ingredients_text:
+                adulteration_risks.append(f"Contains {pattern} ingredients")
+        
+        # Check for excessive additives
+        additives = product_data.get("additives_tags", [])
+        if len(additives) > 10:
+            adulteration_risks.append(f"High number of additives ({len(additives)})")
+            risk_level = "Medium"
+        
+        # Check for artificial colors
+        artificial_colors = [additive for additive in additives if "e1" in additive.lower()]
+        if artificial_colors:
+            adulteration_risks.append(f"Contains artificial colors: {', '.join(artificial_colors)}")
+            risk_level = "Medium"
+        
+        # Check for preservatives
+        preservatives = [additive for additive in additives if any(p in additive.lower() for p in ["e200", "e202", "e211", "e220"])]
+        if preservatives:
+            adulteration_risks.append(f"Contains preservatives: {', '.join(preservatives)}")
+        
+        # Check packaging and origin
+        packaging = product_data.get("packaging_tags", [])
+        if "plastic" in str(packaging).lower():
+            adulteration_risks.append("Packaged in plastic (potential chemical leaching)")
+        
+        # Check manufacturing location
+        manufacturing_places = product_data.get("manufacturing_places_tags", [])
+        if not manufacturing_places:
+            adulteration_risks.append("Manufacturing location not specified")
+            risk_level = "Medium"
+        
+        if len(adulteration_risks) > 3:
+            risk_level = "High"
+        elif len(adulteration_risks) > 1:
+            risk_level = "Medium"
+        
+        return {
+            "risk_level": risk_level,
+            "risks": adulteration_risks,
+            "additives_count": len(additives),
+            "suspicious_ingredients": len([r for r in adulteration_risks if "suspicious" in r]),
+            "packaging_concerns": len([r for r in adulteration_risks if "packaging" in r])
+        }
+
+    @track_stage("assess_overall_risk")
+    def assess_overall_risk(self, health_analysis, adulteration_analysis):
+        """Assess overall consumption risk"""
+        
+        health_score = health_analysis["overall_score"]
+        adulteration_level = adulteration_analysis["risk_level"]
+        
+        if health_score < -2 or adulteration_level == "High":
+            overall_risk = "High"
+            confidence = 9
+        elif health_score < 0 or adulteration_level == "Medium":
+            overall_risk = "Medium"
+            confidence = 7
+        else:
+            overall_risk = "Low"
+            confidence = 8
+        
+        return {
+            "overall_risk": overall_risk,
+            "confidence_score": confidence,
+            "health_score": health_score,
+            "adulteration_risk": adulteration_level,
+            "consumption_recommendation": self.get_consumption_recommendation(overall_risk)
+        }
+
+    def get_consumption_recommendation(self, risk_level):
+        """Get consumption recommendation based on risk level"""
+        
+        recommendations = {
+            "Low": "Safe to consume regularly as part of a balanced diet",
+            "Medium": "Consume in moderation, consider healthier alternatives",
+            "High": "Avoid or consume very rarely, consider alternative products"
+        }
+        
+        return recommendations.get(risk_level, "Consult nutritionist for personalized advice")
+
+    @track_stage("generate_recommendations")
+    def generate_recommendations(self, health_analysis, adulteration_analysis):
+        """Generate comprehensive recommendations"""
+        
+        recommendations = []
+        
+        # Health-based recommendations
+        if health_analysis["overall_score"] < 0:
+            recommendations.append("Consider choosing products with better Nutri-Score (A or B)")
+        
+        if health_analysis["nutrition_analysis"]["sugars"] > 15:
+            recommendations.append("High sugar content - limit consumption")
+        
+        if health_analysis["nutrition_analysis"]["salt"] > 1.5:
+            recommendations.append("High salt content - consume in moderation")
+        
+        # Adulteration-based recommendations
+        if adulteration_analysis["risk_level"] == "High":
+            recommendations.append("High adulteration risk - consider alternative products")
+        
+        if adulteration_analysis["additives_count"] > 10:
+            recommendations.append("High additive content - choose products with fewer additives")
+        
+        # General recommendations
+        recommendations.extend([
+            "Read ingredient labels carefully",
+            "Choose products with minimal processing",
+            "Prefer products with clear manufacturing information",
+            "Consider organic alternatives when possible"
+        ])
+        
+        return recommendations
+
+    @track_stage("generate_home_tests")
+    def generate_home_tests(self, product_data, adulteration_analysis):
+        """Home tests for the product's categories, from the knowledge base in api/home_tests.py"""
+        return home_tests_for_product(product_data)
+
+
+class ImageAnalysisService:
+    """Barcode-first analysis of a food photo, falling back to Gemini"""
+
+    def __init__(self, product_service):
+        self.product_service = product_service
+        self.llm = LLM()
+
+    def analyze_image(self, image_file, use_ai=False):
+        """Analyze an uploaded image.
+
+        Returns the source ("barcode" or "ai"), the barcode analysis when a
+        GTIN was readable in the photo, and the Gemini analysis when no
+        product was found or use_ai was requested.
+        """
+        
+        # Pillow is only needed here; keep it off the barcode route's cold start
+        from .imaging import downscale_image, encode_jpeg
+        
+        started = perf_counter()
+        
+        # Decode once, at reduced scale; every later stage works on this copy
+        with track_stage("image_preprocess"):
+            working_image = downscale_image(image_file)
+        
+        result = {"source": "ai"}
+        
+        # Look for a readable barcode first: a cached OpenFoodFacts
+        # lookup is far cheaper than a Gemini call
+        barcode_analysis, cache_status = self.analyze_visible_barcode(working_image)
+        if barcode_analysis:
+            result["barcode"] = barcode_analysis["barcode"]
+            result["barcode_analysis"] = barcode_analysis
+            if barcode_analysis["status"] == "success":
+                result["source"] = "barcode"
+        
+        # Only fall back to the LLM when the barcode path gave us
+        # nothing, or when the caller explicitly asked for it
+        if result["source"] == "ai" or use_ai:
+            with track_stage("image_encode"):
+                image_bytes = encode_jpeg(working_image)
+            result["analysis"] = self.llm.analyze_food_image(image_bytes)
+        
+        record_scan(
+            ScanEvent.Source.IMAGE_BARCODE if result["source"] == "barcode" else ScanEvent.Source.IMAGE_AI,
+            started,
+            analysis=barcode_analysis,
+            barcode=result.get("barcode", ""),
+            cache_status=cache_status,
+            ai_analysis=result.get("analysis"),
+        )
+        return result
+
+    def analyze_visible_barcode(self, image):
+        """Decode a GTIN from the photo and run the barcode product analysis
+
+        Returns (analysis, cache_status); analysis is None when no barcode
+        could be read.
+        """
+        
+        from .barcode_reader import decode_gtins
+        
+        try:
+            with track_stage("barcode_decode"):
+                gtins = decode_gtins(image)
+        except Exception as e:
+            print(f"Error decoding barcode from image: {e}")
+            return None, ScanEvent.CacheStatus.NONE
+        
+        if not gtins:
+            return None, ScanEvent.CacheStatus.NONE
+        
+        barcode = gtins[0]
+        # Recorded as part of the image scan, not as a lookup of its own
+        analysis, cache_status = self.product_service.analyze_barcode(barcode)
+        analysis.setdefault("barcode", barcode)
+        return analysis, cache_status
+
+
+product_service = ProductAnalysisService()
+image_service = ImageAnalysisService(product_service)
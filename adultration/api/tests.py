@@ -1,3 +1,1035 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib.util
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
 
-# Create your tests here.
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import zxingcpp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from .analytics import rebuild_rollups, rollup_scan_events
+from .barcode_reader import decode_gtins, is_valid_gtin
+from .cache import SQLiteCache
+from .export import export_chunks, export_lines
+from .home_tests import HomeTestKnowledgeBase, home_tests_for_product
+from .metrics import metrics_access_allowed, track_stage
+from .models import ApiKey, Product, RollupPeriod, ScanEvent, ScanRollup
+from .product_store import UNRANKED, find_alternatives, import_products, product_rank
+from .profiling import save_profile
+from .ratelimit import DAY, TokenBucketStore
+from .scan_log import ScanEventBuffer, record_scan
+from .scan_session import CLOSE_FORBIDDEN, CLOSE_UNAUTHORIZED, SCAN_SESSION_PATH, scan_session
+from .search import SearchQueryError, parse_query, search_products
+from .services import product_service
+from .uploads import MAX_IMAGE_UPLOAD_SIZE, ImageUploadGuard, ResumableUpload, UploadRejected
+
+
+def product(code, **fields):
+    """A minimal OpenFoodFacts payload"""
+    return {"code": code, "product_name": f"Product {code}", **fields}
+
+
+def use_fresh_rate_limits(testcase):
+    """Point the rate limiter at an empty store for the duration of a test"""
+    directory = tempfile.TemporaryDirectory()
+    testcase.addCleanup(directory.cleanup)
+    path = os.path.join(directory.name, "ratelimit.sqlite3")
+    testcase.enterContext(override_settings(RATE_LIMIT_STORE=path))
+    # The store is opened at import, from the setting's value then
+    store = TokenBucketStore(path)
+    testcase.enterContext(mock.patch("api.ratelimit.rate_limits", store))
+    return store
+
+
+def use_empty_cache(testcase):
+    """Replace the node's shared cache with an empty in-memory one for a test"""
+    testcase.enterContext(override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": testcase.id()},
+    }))
+
+
+class SearchQueryParserTests(TestCase):
+    def test_not_binds_tighter_than_and_and_and_than_or(self):
+        self.assertEqual(
+            parse_query("additive:e211 OR allergen:milk NOT label:organic"),
+            ("or", [
+                ("term", "additive:e211"),
+                ("and", [("term", "allergen:milk"), ("not", ("term", "label:organic"))]),
+            ]),
+        )
+
+    def test_parentheses_and_explicit_and(self):
+        self.assertEqual(
+            parse_query("(additive:e211 OR additive:e202) AND place:india"),
+            ("and", [
+                ("or", [("term", "additive:e211"), ("term", "additive:e202")]),
+                ("term", "place:india"),
+            ]),
+        )
+
+    def test_quoted_ingredient_phrase_needs_every_word(self):
+        self.assertEqual(
+            parse_query('ingredient:"Hydrogenated Fat"'),
+            ("and", [("term", "ingredient:hydrogenated"), ("term", "ingredient:fat")]),
+        )
+
+    def test_tags_are_folded_and_lose_their_language_prefix(self):
+        self.assertEqual(parse_query("label:en:Végétarien"), ("term", "label:vegetarien"))
+
+    def test_invalid_queries(self):
+        for query in ["", "(additive:e211", "additive:e211 )", "colour:red", "additive:e211 OR", 'ingredient:"of the"']:
+            with self.subTest(query=query):
+                with self.assertRaises(SearchQueryError):
+                    parse_query(query)
+
+
+class SearchProductsTests(TestCase):
+    def setUp(self):
+        import_products([
+            product("001", ingredients_text="Sugar, palm oil", additives_tags=["en:e211"], manufacturing_places_tags=["India"]),
+            product("002", ingredients_text="Milk, sugar", allergens_tags=["en:milk"], labels_tags=["en:organic"]),
+            product("003", ingredients_text="Palm oil, salt", additives_tags=["en:e211"], allergens_tags=["en:milk"]),
+            product("004", ingredients_text="Water", additives_tags=["en:e202"]),
+        ])
+
+    def search(self, query, cursor="", limit=20):
+        products, next_cursor = search_products(query, cursor, limit)
+        return [p.barcode for p in products], next_cursor
+
+    def test_boolean_queries(self):
+        self.assertEqual(self.search("additive:e211"), (["001", "003"], None))
+        self.assertEqual(self.search('ingredient:"palm oil" allergen:milk'), (["003"], None))
+        self.assertEqual(self.search("allergen:milk NOT label:organic"), (["003"], None))
+        self.assertEqual(self.search("additive:e202 OR place:india"), (["001", "004"], None))
+        self.assertEqual(self.search("sugar"), (["001", "002"], None))
+
+    def test_pages_continue_from_the_cursor(self):
+        self.assertEqual(self.search("ingredient:palm OR additive:e202", limit=2), (["001", "003"], "003"))
+        self.assertEqual(self.search("ingredient:palm OR additive:e202", cursor="003", limit=2), (["004"], None))
+
+    def test_negation_alone_is_refused(self):
+        with self.assertRaises(SearchQueryError):
+            search_products("NOT label:organic")
+
+
+class ProductRankTests(SimpleTestCase):
+    def test_nutriscore_then_nova_group_then_additives(self):
+        ranked = [
+            product("1", nutriscore_grade="a", nova_group=1, additives_tags=[]),
+            product("2", nutriscore_grade="a", nova_group=1, additives_tags=["en:e330"]),
+            product("3", nutriscore_grade="a", nova_group=2, additives_n=0),
+            product("4", nutriscore_grade="a"),
+            product("5", nutriscore_grade="B", nova_group=1),
+            product("6", nutriscore_grade="e", nova_group=1),
+        ]
+        ranks = [product_rank(p) for p in ranked]
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertEqual(len(set(ranks)), len(ranks))
+
+    def test_products_without_a_nutriscore_are_unranked(self):
+        for grade in (None, "", "unknown", "not-applicable", "f"):
+            self.assertEqual(product_rank(product("1", nutriscore_grade=grade, nova_group=1)), UNRANKED)
+        self.assertLess(product_rank(product("1", nutriscore_grade="e", nova_group=4, additives_n=500)), UNRANKED)
+
+
+@override_settings(ANONYMOUS_RATE_LIMITS={"barcode": 1000, "image": 1000})
+class AlternativesTests(TestCase):
+    def setUp(self):
+        use_fresh_rate_limits(self)
+        sodas = ["en:beverages", "en:sodas"]
+        import_products([
+            product("100", nutriscore_grade="d", nova_group=4, categories_tags=sodas),
+            product("101", nutriscore_grade="a", nova_group=4, categories_tags=sodas),
+            product("102", nutriscore_grade="a", nova_group=1, additives_tags=["en:e330"], categories_tags=["en:beverages"]),
+            product("103", nutriscore_grade="a", nova_group=1, additives_tags=[], categories_tags=["en:beverages"]),
+            product("104", categories_tags=sodas),
+            product("105", nutriscore_grade="e", nova_group=4, categories_tags=sodas),
+            product("106", nutriscore_grade="b", nova_group=1, categories_tags=sodas),
+        ])
+
+    def alternatives(self, barcode, limit=20):
+        product, alternatives = find_alternatives(barcode, limit)
+        return [(p.barcode, category) for p, category in alternatives]
+
+    def test_most_specific_category_first_then_by_rank(self):
+        self.assertEqual(self.alternatives("100"), [
+            ("101", "en:sodas"), ("106", "en:sodas"), ("103", "en:beverages"), ("102", "en:beverages"),
+        ])
+
+    def test_only_better_ranked_products_never_the_product_itself(self):
+        alternatives = [barcode for barcode, _ in self.alternatives("106")]
+        self.assertEqual(alternatives, ["101", "103", "102"])
+        self.assertEqual(self.alternatives("103"), [])
+
+    def test_unranked_products_are_never_alternatives(self):
+        self.assertNotIn("104", [barcode for barcode, _ in self.alternatives("105")])
+        # An unranked product is offered every ranked one
+        self.assertEqual([barcode for barcode, _ in self.alternatives("104")], ["101", "106", "100", "105", "103", "102"])
+
+    def test_limit(self):
+        self.assertEqual(self.alternatives("100", limit=3), [
+            ("101", "en:sodas"), ("106", "en:sodas"), ("103", "en:beverages"),
+        ])
+        self.assertEqual(self.alternatives("100", limit=1), [("101", "en:sodas")])
+
+    def test_unknown_barcode(self):
+        self.assertEqual(find_alternatives("999", 5), (None, []))
+
+    def test_api(self):
+        response = self.client.get("/api/v1/alternatives/100/", {"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["product"]["barcode"], "100")
+        self.assertEqual(
+            [(alternative["barcode"], alternative["category"]) for alternative in response.json()["alternatives"]],
+            [("101", "en:sodas"), ("106", "en:sodas")],
+        )
+        self.assertEqual(self.client.get("/api/v1/alternatives/100/", {"limit": 0}).status_code, 400)
+
+    def test_api_unknown_barcode_is_404(self):
+        with mock.patch.object(product_service, "fetch_openfoodfacts_data", return_value=None) as fetch:
+            response = self.client.get("/api/v1/alternatives/999/")
+        fetch.assert_called_once_with("999")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["status"], "not_found")
+
+
+class BarcodeReaderTests(SimpleTestCase):
+    def test_check_digits(self):
+        # EAN-8, UPC-A, EAN-13 and GTIN-14
+        for code in ("96385074", "036000291452", "4006381333931", "10012345678902"):
+            self.assertTrue(is_valid_gtin(code), code)
+            wrong = code[:-1] + str((int(code[-1]) + 1) % 10)
+            self.assertFalse(is_valid_gtin(wrong), wrong)
+
+    def test_malformed_codes(self):
+        for code in (None, "", "4006381333931 ", "400638133393a", "+4006381333931", "4006381333931".replace("0", "O"),
+                     "123456", "1234567890", "400638133393100", "٤٠٠٦٣٨١٣٣٣٩٣١"):
+            self.assertFalse(is_valid_gtin(code), code)
+
+    def test_decodes_a_photographed_barcode(self):
+        barcode = zxingcpp.create_barcode("4006381333931", zxingcpp.BarcodeFormat.EAN13)
+        image = Image.fromarray(barcode.to_image(scale=3, add_quiet_zones=True)).convert("RGB")
+        self.assertEqual(decode_gtins(image), ["4006381333931"])
+        self.assertEqual(decode_gtins(Image.new("RGB", (320, 160), "white")), [])
+
+    def test_misread_and_repeated_codes_are_dropped(self):
+        reads = [SimpleNamespace(text=text) for text in (" 4006381333932", "96385074", "4006381333931 ", "96385074")]
+        with mock.patch("api.barcode_reader.zxingcpp.read_barcodes", return_value=reads) as read_barcodes:
+            self.assertEqual(decode_gtins(Image.new("RGB", (10, 10))), ["96385074", "4006381333931"])
+        self.assertEqual(read_barcodes.call_args.args[0].mode, "L")
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.sqlite3")
+        self.cache = self.make_cache()
+
+    def make_cache(self, max_size=64 * 1024):
+        # TOUCH_INTERVAL 0 writes access times on every read
+        return SQLiteCache(self.path, {"OPTIONS": {"MAX_SIZE": max_size, "TOUCH_INTERVAL": 0}})
+
+    def test_get_and_set(self):
+        product = {"product_name": "Milk", "ingredients_text": "milk " * 500}
+        self.cache.set("product", product)
+        self.assertEqual(self.cache.get("product"), product)
+        self.assertIsNone(self.cache.get("missing"))
+        self.assertEqual(self.cache.get("missing", "default"), "default")
+        # Another worker's instance sees the same file
+        self.assertEqual(self.make_cache().get("product"), product)
+
+    def test_expired_entries_are_misses_and_can_be_added_again(self):
+        self.cache.set("key", "old", timeout=0)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.add("key", "new"))
+        self.assertFalse(self.cache.add("key", "newer"))
+        self.assertEqual(self.cache.get("key"), "new")
+
+    def test_incr_and_delete(self):
+        self.cache.set("count", 1)
+        self.assertEqual(self.cache.incr("count", 2), 3)
+        self.assertTrue(self.cache.delete("count"))
+        with self.assertRaises(ValueError):
+            self.cache.incr("count")
+
+    def test_cull_keeps_size_bounded_and_drops_least_recently_read(self):
+        cache = self.make_cache(max_size=20 * 1024)
+        cache.set("hot", os.urandom(2048))
+        for i in range(20):
+            # Random bytes do not compress, so each entry is about 2 KB
+            cache.set(f"cold-{i}", os.urandom(2048))
+            cache.get("hot")
+
+        self.assertLessEqual(cache.total_size(), 20 * 1024)
+        self.assertIsNotNone(cache.get("hot"))
+        self.assertIsNone(cache.get("cold-0"))
+        self.assertIsNotNone(cache.get("cold-19"))
+
+    def test_directory_is_created_private(self):
+        path = os.path.join(os.path.dirname(self.path), "state", "cache.sqlite3")
+        SQLiteCache(path, {}).set("key", "value")
+        self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o700)
+
+    def test_store_errors_are_misses_not_exceptions(self):
+        # A regular file where the directory should be: the store cannot be opened
+        blocker = os.path.join(os.path.dirname(self.path), "blocker")
+        open(blocker, "w").close()
+        cache = SQLiteCache(os.path.join(blocker, "cache.sqlite3"), {})
+        cache.set("key", "value")
+        self.assertFalse(cache.add("key", "value"))
+        self.assertIsNone(cache.get("key"))
+        self.assertFalse(cache.has_key("key"))
+        self.assertFalse(cache.touch("key"))
+        self.assertFalse(cache.delete("key"))
+        cache.delete_many(["key", "other"])
+        cache.clear()
+        with self.assertRaises(ValueError):
+            cache.incr("key")
+
+
+class TokenBucketStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.store = TokenBucketStore(os.path.join(directory.name, "ratelimit.sqlite3"))
+
+    def test_bucket_allows_a_burst_then_refills_at_the_rate(self):
+        now = 1000.0
+        granted = [self.store.take("barcode:ip:1", 60, now=now)[0] for _ in range(61)]
+        self.assertEqual(granted, [True] * 60 + [False])
+        # 60 per minute: one token per second
+        self.assertFalse(self.store.take("barcode:ip:1", 60, now=now + 0.5)[0])
+        granted, tokens = self.store.take("barcode:ip:1", 60, now=now + 1.5)
+        self.assertTrue(granted)
+        self.assertAlmostEqual(tokens, 0.5)
+        # Never refills beyond the capacity
+        self.assertEqual(self.store.take("barcode:ip:1", 60, now=now + 3600), (True, 59))
+
+    def test_buckets_are_per_key(self):
+        self.store.take("image:ip:1", 1, now=0)
+        self.assertFalse(self.store.take("image:ip:1", 1, now=0)[0])
+        self.assertTrue(self.store.take("image:ip:2", 1, now=0)[0])
+
+    def test_daily_quota_resets_the_next_day(self):
+        now = 10 * DAY + 100
+        self.assertEqual([self.store.count("image:key:1", 2, now=now) for _ in range(3)], [(True, 1), (True, 2), (False, 2)])
+        self.assertEqual(self.store.count("image:key:1", 2, now=now + DAY), (True, 1))
+
+    def test_unusable_store_lets_requests_through(self):
+        blocker = os.path.join(self.directory, "not-a-directory")
+        open(blocker, "w").close()
+        store = TokenBucketStore(os.path.join(blocker, "ratelimit.sqlite3"))
+        self.assertEqual(store.take("barcode:ip:1", 60), (True, 60))
+        self.assertEqual(store.count("image:ip:1", 5), (True, 0))
+
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+
+
+class ImageUploadGuardTests(SimpleTestCase):
+    def receive(self, *chunks):
+        guard = ImageUploadGuard(None)
+        guard.new_file("image", "upload.jpg", "image/jpeg", None)
+        start = 0
+        for chunk in chunks:
+            guard.receive_data_chunk(chunk, start)
+            start += len(chunk)
+        guard.file_complete(start)
+
+    def test_images_pass(self):
+        self.receive(PNG_HEADER + b"rest of the image")
+        self.receive(b"\xff\xd8\xff", b"\xe0" + b"\x00" * 100)
+        self.receive(b"RIFF\x00\x00\x00\x00WEBPVP8 ")
+
+    def test_non_images_are_refused_from_their_first_bytes(self):
+        with self.assertRaisesMessage(UploadRejected, "Only image files are allowed"):
+            self.receive(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n", b"never read")
+
+    def test_short_files_are_checked_when_complete(self):
+        with self.assertRaises(UploadRejected):
+            self.receive(b"B")
+        self.receive(b"GIF89a")
+
+    def test_oversized_uploads_are_refused(self):
+        guard = ImageUploadGuard(None)
+        with self.assertRaises(UploadRejected):
+            guard.handle_raw_input(None, {}, 2 * MAX_IMAGE_UPLOAD_SIZE, b"boundary")
+        guard.new_file("image", "upload.jpg", "image/jpeg", None)
+        with self.assertRaises(UploadRejected):
+            guard.receive_data_chunk(b"\x00" * 1024, MAX_IMAGE_UPLOAD_SIZE)
+
+
+@override_settings(ANONYMOUS_RATE_LIMITS={"barcode": 1000, "image": 1000}, ANONYMOUS_DAILY_QUOTAS={})
+class ImageApiUploadTests(TestCase):
+    def setUp(self):
+        use_fresh_rate_limits(self)
+
+    def test_non_image_upload_is_rejected(self):
+        upload = SimpleUploadedFile("notes.jpg", b"just some text, not a photo", content_type="image/jpeg")
+        response = self.client.post("/api/v1/image/", {"image": upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Only image files are allowed", "status": "error"})
+
+
+class ResumableUploadExpiryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(RESUMABLE_UPLOAD_DIR=directory.name, RESUMABLE_UPLOAD_EXPIRY=60))
+
+    def test_active_upload_keeps_its_metadata(self):
+        active = ResumableUpload.create(100)
+        abandoned = ResumableUpload.create(100)
+        long_ago = time.time() - 120
+        # Appends only touch the part file
+        os.utime(active.meta_path, (long_ago, long_ago))
+        for path in (abandoned.meta_path, abandoned.part_path):
+            os.utime(path, (long_ago, long_ago))
+
+        ResumableUpload.remove_expired()
+
+        self.assertEqual(ResumableUpload.load(active.upload_id).offset, 0)
+        self.assertFalse(os.path.exists(abandoned.meta_path))
+        self.assertFalse(os.path.exists(abandoned.part_path))
+
+
+def scan_event(barcode="737628064502"):
+    return ScanEvent(barcode=barcode, source="barcode", status="success", cache_status="miss", latency_ms=10)
+
+
+class ScanEventBufferTests(TestCase):
+    def make_buffer(self, flush_size=100, flush_interval=3600, max_pending=1000, background=False):
+        with mock.patch("api.scan_log.atexit.register") as register:
+            buffer = ScanEventBuffer(flush_size, flush_interval, max_pending)
+        register.assert_called_once_with(buffer.flush)
+        if not background:
+            # As if this process had started its flusher already; tests flush by hand
+            buffer.pid = os.getpid()
+            buffer.thread = mock.Mock()
+        return buffer
+
+    def capture_writes(self):
+        """Patch bulk_create to record each batch instead of writing it"""
+        batches = []
+        written = threading.Event()
+
+        def bulk_create(batch, batch_size):
+            batches.append(list(batch))
+            written.set()
+
+        self.enterContext(mock.patch.object(ScanEvent.objects, "bulk_create", side_effect=bulk_create))
+        return batches, written
+
+    def test_flusher_writes_once_the_batch_is_full(self):
+        batches, written = self.capture_writes()
+        buffer = self.make_buffer(flush_size=3, background=True)
+        for _ in range(3):
+            buffer.add(scan_event())
+        self.assertTrue(written.wait(5))
+        self.assertEqual(len(batches[0]), 3)
+
+    def test_flusher_writes_a_partial_batch_after_the_interval(self):
+        batches, written = self.capture_writes()
+        buffer = self.make_buffer(flush_interval=0.05, background=True)
+        # Let the flusher go back to sleep for good after the test
+        self.addCleanup(setattr, buffer, "flush_interval", 3600)
+        buffer.add(scan_event())
+        self.assertTrue(written.wait(5))
+        self.assertEqual(len(batches[0]), 1)
+
+    def test_flush_writes_pending_events(self):
+        buffer = self.make_buffer()
+        buffer.add(scan_event("1"))
+        buffer.add(scan_event("2"))
+        buffer.flush()
+        self.assertEqual(sorted(ScanEvent.objects.values_list("barcode", flat=True)), ["1", "2"])
+        self.assertEqual(buffer.events, [])
+        buffer.flush()
+        self.assertEqual(ScanEvent.objects.count(), 2)
+
+    def test_worker_exit_hook_flushes_the_shared_buffer(self):
+        path = os.path.join(settings.BASE_DIR.parent, "gunicorn.conf.py")
+        spec = importlib.util.spec_from_file_location("gunicorn_conf", path)
+        config = importlib.util.module_from_spec(spec)
+        # The config sets PROMETHEUS_MULTIPROC_DIR for gunicorn; keep it out of this process
+        with mock.patch.dict(os.environ):
+            spec.loader.exec_module(config)
+        buffer = self.make_buffer()
+        buffer.add(scan_event())
+        with mock.patch("api.scan_log.scan_events", buffer):
+            config.worker_exit(server=None, worker=None)
+        self.assertEqual(ScanEvent.objects.count(), 1)
+
+    def test_forked_worker_drops_the_parents_events(self):
+        buffer = self.make_buffer()
+        buffer.add(scan_event("parent"))
+        # As seen from a child forked after that add
+        buffer.pid = -1
+        buffer.flush()
+        self.assertEqual(ScanEvent.objects.count(), 0)
+        with mock.patch("api.scan_log.threading.Thread"):
+            buffer.add(scan_event("child"))
+        self.assertEqual(buffer.pid, os.getpid())
+        self.assertEqual([event.barcode for event in buffer.events], ["child"])
+
+    def test_events_beyond_max_pending_are_dropped(self):
+        buffer = self.make_buffer(max_pending=2)
+        for barcode in "123":
+            buffer.add(scan_event(barcode))
+        self.assertEqual([event.barcode for event in buffer.events], ["1", "2"])
+
+    def test_failed_write_keeps_the_newest_events_for_the_next_flush(self):
+        buffer = self.make_buffer(max_pending=3)
+        for barcode in "123":
+            buffer.add(scan_event(barcode))
+        with mock.patch.object(ScanEvent.objects, "bulk_create", side_effect=DatabaseError("database is locked")):
+            buffer.flush()
+        self.assertEqual([event.barcode for event in buffer.events], ["1", "2", "3"])
+
+        def fail_after_a_scan(batch, batch_size):
+            # A scan recorded while the batch was being written
+            buffer.add(scan_event("4"))
+            raise DatabaseError("database is locked")
+
+        with mock.patch.object(ScanEvent.objects, "bulk_create", side_effect=fail_after_a_scan):
+            buffer.flush()
+        self.assertEqual([event.barcode for event in buffer.events], ["2", "3", "4"])
+
+        buffer.flush()
+        self.assertEqual(sorted(ScanEvent.objects.values_list("barcode", flat=True)), ["2", "3", "4"])
+
+    def test_record_scan_buffers_the_analysis_dimensions(self):
+        buffer = self.make_buffer()
+        analysis = {
+            "status": "success",
+            "risk_assessment": {"overall_risk": "High"},
+            "product_info": {"product_name": "Milk", "categories": "Dairies, Milks", "countries_tags": ["en:india"]},
+            "adulteration_analysis": {"risks": ["urea", "starch"]},
+        }
+        with mock.patch("api.scan_log.scan_events", buffer):
+            record_scan("barcode", time.perf_counter(), analysis, barcode="8901234567890", cache_status="hit")
+            record_scan("image_ai", time.perf_counter(), ai_analysis="Summary...\nRisk Level: medium")
+        buffer.flush()
+
+        scanned = ScanEvent.objects.get(source="barcode")
+        self.assertEqual(
+            (scanned.barcode, scanned.status, scanned.risk_level, scanned.cache_status),
+            ("8901234567890", "success", "High", "hit"),
+        )
+        self.assertEqual((scanned.product_name, scanned.category, scanned.country), ("Milk", "Dairies", "en:india"))
+        self.assertEqual(scanned.adulteration_flags, 2)
+        photo = ScanEvent.objects.get(source="image_ai")
+        self.assertEqual((photo.status, photo.risk_level, photo.cache_status), ("success", "Medium", "none"))
+
+
+class FakeWebSocket:
+    """The receive and send callables of an ASGI WebSocket connection"""
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, message):
+        await self.outgoing.put(message)
+
+    def scan(self, *barcodes):
+        for barcode in barcodes:
+            self.incoming.put_nowait({"type": "websocket.receive", "text": barcode})
+
+    async def next_message(self):
+        return await asyncio.wait_for(self.outgoing.get(), 5)
+
+    async def next_result(self):
+        """The next result frame, decoded"""
+        message = await self.next_message()
+        if message["type"] != "websocket.send":
+            raise AssertionError(f"Expected a result, got {message}")
+        return json.loads(message["text"])
+
+
+class BlockingLookups:
+    """Stands in for the product analysis; every lookup waits for release"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.started = []
+        self.running = 0
+        self.most_running = 0
+
+    def __call__(self, barcode):
+        with self.lock:
+            self.started.append(barcode)
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+        return {"barcode": barcode}
+
+    async def wait_for_started(self, count):
+        for _ in range(500):
+            if len(self.started) >= count:
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"{len(self.started)} lookups started, expected {count}")
+
+
+@override_settings(
+    ALLOWED_HOSTS=["foodguard.example"],
+    ANONYMOUS_RATE_LIMITS={"barcode": 1000, "image": 1000},
+    API_KEY_REQUIRED=False,
+    SCAN_SESSION_MAX_IN_FLIGHT=2,
+    SCAN_SESSION_MAX_PENDING=3,
+    SCAN_SESSION_IDLE_TIMEOUT=5,
+)
+class ScanSessionTests(TestCase):
+    def setUp(self):
+        use_fresh_rate_limits(self)
+        self.lookups = BlockingLookups()
+        self.addCleanup(self.lookups.release.set)
+        self.enterContext(mock.patch.object(product_service, "analyze_product_by_barcode", self.lookups))
+
+    async def connect(self, origin="https://foodguard.example", **headers):
+        if origin is not None:
+            headers["origin"] = origin
+        scope = {
+            "type": "websocket",
+            "path": SCAN_SESSION_PATH,
+            "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+            "client": ("203.0.113.7", 50000),
+        }
+        socket = FakeWebSocket()
+        socket.incoming.put_nowait({"type": "websocket.connect"})
+        socket.session = asyncio.ensure_future(scan_session(scope, socket.receive, socket.send))
+        return socket, await socket.next_message()
+
+    async def disconnect(self, socket):
+        self.lookups.release.set()
+        socket.incoming.put_nowait({"type": "websocket.disconnect"})
+        await asyncio.wait_for(socket.session, 5)
+
+    async def test_foreign_origins_are_refused(self):
+        socket, message = await self.connect(origin="https://elsewhere.example")
+        self.assertEqual(message, {"type": "websocket.close", "code": CLOSE_FORBIDDEN})
+        await asyncio.wait_for(socket.session, 5)
+
+        # Our own pages, and clients that are not browsers, are accepted
+        for origin in ("https://foodguard.example", None):
+            socket, message = await self.connect(origin=origin)
+            self.assertEqual(message, {"type": "websocket.accept"})
+            await self.disconnect(socket)
+
+    async def test_unknown_api_keys_are_refused(self):
+        socket, message = await self.connect(x_api_key="fg_not-a-key")
+        self.assertEqual(message, {"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+
+    async def test_a_key_is_needed_when_required(self):
+        with self.settings(API_KEY_REQUIRED=True):
+            socket, message = await self.connect()
+        self.assertEqual(message, {"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+
+    async def test_scans_count_against_the_keys_rate_limit(self):
+        api_key = ApiKey(name="Scanner", barcode_rate=1)
+        raw_key = api_key.set_new_key()
+        await sync_to_async(api_key.save)()
+        with self.settings(API_KEY_REQUIRED=True):
+            socket, message = await self.connect(x_api_key=raw_key)
+        self.assertEqual(message, {"type": "websocket.accept"})
+        self.lookups.release.set()
+
+        socket.scan("1")
+        self.assertEqual((await socket.next_result())["status"], "success")
+        socket.scan("2")
+        result = await socket.next_result()
+        self.assertEqual((result["status"], result["barcode"]), ("error", "2"))
+        self.assertGreater(result["retry_after"], 0)
+        self.assertEqual(self.lookups.started, ["1"])
+        await self.disconnect(socket)
+
+    async def test_anonymous_scans_are_limited_per_ip(self):
+        with self.settings(ANONYMOUS_RATE_LIMITS={"barcode": 2, "image": 1000}):
+            socket, _ = await self.connect()
+            self.lookups.release.set()
+            results = []
+            for barcode in ("1", "2", "3"):
+                socket.scan(barcode)
+                results.append(await socket.next_result())
+        self.assertEqual([result["status"] for result in results], ["success", "success", "error"])
+        self.assertIn("retry_after", results[2])
+        await self.disconnect(socket)
+
+    async def test_lookups_in_flight_are_bounded(self):
+        socket, _ = await self.connect()
+        socket.scan("1", "2", "3")
+        await self.lookups.wait_for_started(2)
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(self.lookups.started), 2)
+
+        self.lookups.release.set()
+        results = [await socket.next_result() for _ in range(3)]
+        self.assertEqual(sorted(result["barcode"] for result in results), ["1", "2", "3"])
+        self.assertEqual(self.lookups.most_running, 2)
+        await self.disconnect(socket)
+
+    async def test_scans_beyond_max_pending_are_refused(self):
+        socket, _ = await self.connect()
+        socket.scan("1", "2", "3", "4")
+        result = await socket.next_result()
+        self.assertEqual((result["status"], result["barcode"]), ("error", "4"))
+        self.assertIn("slow down", result["error"])
+        await self.disconnect(socket)
+
+    async def test_a_barcode_being_looked_up_is_not_looked_up_again(self):
+        socket, _ = await self.connect()
+        socket.scan("1", "1", "1")
+        await self.lookups.wait_for_started(1)
+        self.lookups.release.set()
+        self.assertEqual((await socket.next_result())["barcode"], "1")
+
+        # Once answered, the same barcode is a new scan
+        socket.scan("1")
+        self.assertEqual((await socket.next_result())["barcode"], "1")
+        self.assertEqual(self.lookups.started, ["1", "1"])
+        self.assertTrue(socket.outgoing.empty())
+        await self.disconnect(socket)
+
+    async def test_invalid_barcodes_get_an_error(self):
+        socket, _ = await self.connect()
+        socket.scan("not a barcode")
+        result = await socket.next_result()
+        self.assertEqual((result["status"], result["error"]), ("error", "Invalid barcode"))
+        self.assertEqual(self.lookups.started, [])
+        await self.disconnect(socket)
+
+    async def test_idle_sessions_are_closed(self):
+        with self.settings(SCAN_SESSION_IDLE_TIMEOUT=0.05):
+            socket, _ = await self.connect()
+            self.assertEqual(await socket.next_message(), {"type": "websocket.close", "code": 1000})
+        await asyncio.wait_for(socket.session, 5)
+
+
+@override_settings(SCAN_ROLLUP_SETTLE_TIME=60)
+class RollupScanEventsTests(TestCase):
+    def record(self, count, risk_level="Low", written_ago=timedelta(minutes=5)):
+        events = ScanEvent.objects.bulk_create([
+            ScanEvent(source="barcode", status="success", risk_level=risk_level, cache_status="hit",
+                      latency_ms=10, category="en:milks", country="en:india")
+            for _ in range(count)
+        ])
+        ScanEvent.objects.filter(id__in=[event.id for event in events]).update(recorded_at=timezone.now() - written_ago)
+        return events
+
+    def daily_scans(self):
+        return sum(ScanRollup.objects.filter(period=RollupPeriod.DAY).values_list("scans", flat=True))
+
+    def test_each_event_is_counted_once(self):
+        self.record(3)
+        self.assertEqual(rollup_scan_events(), 3)
+        self.assertEqual(rollup_scan_events(), 0)
+        self.record(2, risk_level="High")
+        self.assertEqual(rollup_scan_events(batch_size=1), 1)
+        self.assertEqual(rollup_scan_events(), 1)
+        self.assertEqual(self.daily_scans(), 5)
+        self.assertEqual(ScanRollup.objects.get(period=RollupPeriod.DAY, risk_level="High").scans, 2)
+
+    def test_recent_writes_hold_back_later_ids(self):
+        self.record(2)
+        recent = self.record(1, written_ago=timedelta(seconds=0))
+        self.record(2)
+        # The recent batch may have neighbours that are not visible yet
+        self.assertEqual(rollup_scan_events(), 2)
+        ScanEvent.objects.filter(id=recent[0].id).update(recorded_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(rollup_scan_events(), 3)
+        self.assertEqual(self.daily_scans(), 5)
+
+    def test_rebuild_recounts_from_the_events(self):
+        self.record(4)
+        rollup_scan_events()
+        rebuild_rollups()
+        self.assertEqual(self.daily_scans(), 0)
+        self.assertEqual(rollup_scan_events(), 4)
+        self.assertEqual(self.daily_scans(), 4)
+
+
+class AnalyticsApiAccessTests(TestCase):
+    def setUp(self):
+        use_fresh_rate_limits(self)
+        use_empty_cache(self)
+
+    def test_an_api_key_is_required(self):
+        url = "/api/v1/analytics/top-products/"
+        self.assertIn(self.client.get(url).status_code, (401, 403))
+        api_key = ApiKey(name="dashboard")
+        raw_key = api_key.set_new_key()
+        api_key.save()
+        response = self.client.get(url, HTTP_X_API_KEY=raw_key)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("RateLimit-Remaining", response.headers)
+
+
+class TrackStageTests(SimpleTestCase):
+    def samples(self, stage):
+        """(timed runs, errors by type) recorded for stage"""
+        runs = REGISTRY.get_sample_value("foodguard_stage_duration_seconds_count", {"stage": stage}) or 0
+        errors = {
+            sample.labels["type"]: sample.value
+            for metric in REGISTRY.collect() if metric.name == "foodguard_errors"
+            for sample in metric.samples
+            if sample.name == "foodguard_errors_total" and sample.labels["stage"] == stage
+        }
+        return runs, errors
+
+    def test_context_manager(self):
+        with track_stage("test_context_manager"):
+            pass
+        with self.assertRaises(KeyError):
+            with track_stage("test_context_manager"):
+                raise KeyError("missing")
+        self.assertEqual(self.samples("test_context_manager"), (2, {"KeyError": 1}))
+
+    def test_decorator(self):
+        @track_stage("test_decorator")
+        def stage(fail):
+            if fail:
+                raise ValueError("bad input")
+            return "result"
+
+        self.assertEqual(stage(False), "result")
+        self.assertEqual(stage(False), "result")
+        with self.assertRaises(ValueError):
+            stage(True)
+        self.assertEqual(self.samples("test_decorator"), (3, {"ValueError": 1}))
+
+
+class MetricsAccessTests(TestCase):
+    def request(self, authorization=None, user=None):
+        headers = {"HTTP_AUTHORIZATION": authorization} if authorization is not None else {}
+        request = RequestFactory().get("/metrics", **headers)
+        request.user = user or AnonymousUser()
+        return request
+
+    @override_settings(METRICS_TOKEN="s3cret-token")
+    def test_bearer_token(self):
+        self.assertTrue(metrics_access_allowed(self.request("Bearer s3cret-token")))
+        self.assertTrue(metrics_access_allowed(self.request("bearer  s3cret-token")))
+        for authorization in (None, "", "Bearer", "Bearer wrong", "Bearer s3cret", "Basic s3cret-token", "s3cret-token"):
+            self.assertFalse(metrics_access_allowed(self.request(authorization)), authorization)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_no_token_configured_means_staff_only(self):
+        for authorization in (None, "Bearer", "Bearer ", "Bearer undefined"):
+            self.assertFalse(metrics_access_allowed(self.request(authorization)), authorization)
+        self.assertTrue(metrics_access_allowed(self.request(user=User(username="staff", is_staff=True))))
+        self.assertFalse(metrics_access_allowed(self.request(user=User(username="user"))))
+
+    @override_settings(METRICS_TOKEN="s3cret-token")
+    def test_view(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.client.force_login(User.objects.create_user("user"))
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"foodguard_stage_duration_seconds", response.content)
+        self.client.logout()
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret-token").status_code, 200)
+
+
+class FakeProfiler:
+    def output(self, renderer):
+        return "{}"
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = directory.name
+        self.enterContext(override_settings(PROFILE_STORE_DIR=self.store))
+        self.staff = User.objects.create_user("staff", is_staff=True)
+        self.user = User.objects.create_user("user")
+
+    def reports(self):
+        return sorted(name[:-len(".json")] for name in os.listdir(self.store) if name.endswith(".json"))
+
+    def test_staff_requests_are_profiled_when_flagged(self):
+        self.client.force_login(self.staff)
+        response = self.client.get("/api/v1/profiles/", {"profile": "1"})
+        self.assertEqual(self.reports(), [response["X-Profile-Id"]])
+        response = self.client.get("/api/v1/profiles/", HTTP_X_PROFILE="1")
+        self.assertIn(response["X-Profile-Id"], self.reports())
+
+        listed = self.client.get("/api/v1/profiles/").json()["profiles"]
+        self.assertEqual(sorted(profile["id"] for profile in listed), self.reports())
+        self.assertEqual(listed[0]["request"], "GET /api/v1/profiles/")
+        download = self.client.get(f"/api/v1/profiles/{response['X-Profile-Id']}/")
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(json.loads(b"".join(download.streaming_content))["$schema"],
+                         "https://www.speedscope.app/file-format-schema.json")
+
+    def test_only_the_exact_flag_profiles(self):
+        self.client.force_login(self.staff)
+        for query in ({"profile": "10"}, {"profile": "0"}, {"noprofile": "1"}, {"q": "profile=1"}):
+            self.assertNotIn("X-Profile-Id", self.client.get("/api/v1/profiles/", query))
+        self.assertNotIn("X-Profile-Id", self.client.get("/api/v1/profiles/", HTTP_X_PROFILE="0"))
+        self.assertEqual(self.reports(), [])
+
+    def test_other_users_are_not_profiled_or_shown_profiles(self):
+        response = self.client.get("/api/v1/profiles/", {"profile": "1"})
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(self.user)
+        response = self.client.get("/api/v1/profiles/", {"profile": "1"})
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get(f"/api/v1/profiles/{'0' * 32}/").status_code, 403)
+        self.assertEqual(self.reports(), [])
+
+    def test_unknown_or_malformed_ids_are_404(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(f"/api/v1/profiles/{'0' * 32}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/profiles/..%2f..%2fsettings/").status_code, 404)
+
+    def test_store_keeps_the_newest_reports(self):
+        request = RequestFactory().get("/api/v1/barcode/")
+        saved = []
+        for i in range(settings.PROFILE_STORE_MAX_REPORTS + 2):
+            saved.append(save_profile(FakeProfiler(), request))
+            # Distinct, increasing ages, whatever the file system's timestamp resolution
+            os.utime(os.path.join(self.store, f"{saved[-1]}.json"), (i, i))
+        self.assertEqual(settings.PROFILE_STORE_MAX_REPORTS, 50)
+        self.assertEqual(self.reports(), sorted(saved[2:]))
+        self.assertEqual(len([name for name in os.listdir(self.store) if name.endswith(".txt")]), 50)
+
+
+class HomeTestKnowledgeBaseTests(SimpleTestCase):
+    def setUp(self):
+        self.knowledge_base = HomeTestKnowledgeBase({
+            "taxonomy": {
+                "en:cheeses": ["en:dairies"],
+                "en:paneer": ["en:cheeses"],
+                "en:honeys": ["en:sweeteners"],
+            },
+            "synonyms": {"en:cheese": "en:cheeses"},
+            "general": ["look"],
+            "tests": {
+                "look": {"categories": [], "test_name": "Look"},
+                "dairy": {"categories": ["en:dairies"], "test_name": "Dairy", "materials_needed": ["Iodine"]},
+                "cheese": {"categories": ["en:cheeses"], "test_name": "Cheese"},
+                "paneer": {"categories": ["en:paneer"], "test_name": "Paneer"},
+                "honey": {"categories": ["en:honeys"], "test_name": "Honey"},
+            },
+        })
+
+    def names(self, categories):
+        return [test["test_name"] for test in self.knowledge_base.tests_for(categories)]
+
+    def test_tests_apply_to_every_category_below_theirs(self):
+        self.assertEqual(self.names(["en:dairies", "en:cheeses", "en:paneer"]), ["Look", "Paneer", "Cheese", "Dairy"])
+        self.assertEqual(self.names(["en:cheese"]), ["Look", "Cheese", "Dairy"])
+
+    def test_products_in_several_branches_get_the_tests_of_each(self):
+        self.assertEqual(self.names(["en:cheeses", "en:honeys"]), ["Look", "Honey", "Cheese", "Dairy"])
+
+    def test_unknown_categories_get_the_general_tests(self):
+        self.assertEqual(self.names(["en:spreads"]), ["Look"])
+        self.assertEqual(self.names([]), ["Look"])
+
+    def test_payloads_are_shared_and_read_only(self):
+        dairy = self.knowledge_base.tests_for(["en:dairies"])[1]
+        self.assertIs(dairy, self.knowledge_base.tests_for(["en:cheeses"])[2])
+        self.assertEqual(dairy["materials_needed"], ("Iodine",))
+        with self.assertRaises(TypeError):
+            dairy["test_name"] = "Changed"
+        self.assertEqual(pickle.loads(pickle.dumps(dairy)), dairy)
+
+    def test_bundled_knowledge_base(self):
+        tests = home_tests_for_product({"categories_tags": ["en:dairies", "en:milks"]})
+        self.assertGreater(len(tests), 1)
+        self.assertTrue(all("test_name" in test and "procedure" in test for test in tests))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        use_fresh_rate_limits(self)
+        use_empty_cache(self)
+        import_products([
+            product(f"00{i}", categories_tags=["en:dairies", "en:milks"] if i % 2 else ["en:honeys"],
+                    ingredients_text="Milk", nutriscore_grade="b")
+            for i in range(1, 6)
+        ])
+
+    def records(self, category=None, cursor=""):
+        return [json.loads(line) for line in export_lines(category, cursor)]
+
+    def test_export_lists_analyses_in_barcode_order_then_completes(self):
+        records = self.records()
+        self.assertEqual([record["barcode"] for record in records[:-1]], ["001", "002", "003", "004", "005"])
+        self.assertTrue(all(record["status"] == "success" and "risk_assessment" in record for record in records[:-1]))
+        self.assertEqual(records[-1], {"complete": True, "exported": 5})
+
+    def test_export_resumes_after_the_cursor(self):
+        records = self.records(cursor="003")
+        self.assertEqual([record.get("barcode") for record in records], ["004", "005", None])
+        self.assertEqual(records[-1]["exported"], 2)
+
+    def test_export_by_category(self):
+        records = self.records(category="en:milks")
+        self.assertEqual([record.get("barcode") for record in records], ["001", "003", "005", None])
+
+    def test_products_without_payload_are_marked(self):
+        Product.objects.filter(barcode="002").update(payload={})
+        record = self.records()[1]
+        self.assertEqual((record["barcode"], record["status"]), ("002", "not_stored"))
+
+    def test_gzip_chunks_decompress_up_to_an_interruption(self):
+        lines = [json.dumps({"barcode": f"{i:012d}", "padding": os.urandom(64).hex()}) + "\n" for i in range(2000)]
+        chunks = list(export_chunks(iter(lines), compress=True))
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(gzip.decompress(b"".join(chunks)).decode(), "".join(lines))
+        # Without the final chunk, every line of the earlier ones is still readable
+        partial = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(b"".join(chunks[:-1])).decode()
+        self.assertTrue(partial.endswith("\n"))
+        self.assertTrue("".join(lines).startswith(partial))
+
+    def test_endpoint_streams_ndjson_to_api_clients(self):
+        url = "/api/v1/export/analyses/"
+        self.assertIn(self.client.get(url).status_code, (401, 403))
+        api_key = ApiKey(name="export")
+        raw_key = api_key.set_new_key()
+        api_key.save()
+
+        response = self.client.get(url, {"cursor": "004"}, HTTP_X_API_KEY=raw_key, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])["barcode"], "005")
+        self.assertEqual(json.loads(lines[-1]), {"complete": True, "exported": 1})
+
+        self.assertEqual(self.client.get(url, {"cursor": "x" * 21}, HTTP_X_API_KEY=raw_key).status_code, 400)
@@ -0,0 +1,268 @@
+import json
+import os
+import re
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows development servers
+    fcntl = None
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Room for the multipart boundaries and the small form fields sent with the image
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Leading bytes of the image formats Pillow can decode without plugins
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+SNIFF_LENGTH = 12
+
+# Chunk size suggested to resumable-upload clients, and the most one request
+# may carry (kept well under DATA_UPLOAD_MAX_MEMORY_SIZE, since chunks are
+# read from request.body)
+UPLOAD_CHUNK_SIZE = 256 * 1024
+MAX_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadRejected(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "Invalid image upload"
+    default_code = "invalid_upload"
+
+
+class UploadNotFound(APIException):
+    status_code = status.HTTP_404_NOT_FOUND
+    default_detail = "Upload not found or expired"
+    default_code = "upload_not_found"
+
+
+class UploadOffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Chunk offset does not match the bytes received so far"
+    default_code = "offset_mismatch"
+
+    def __init__(self, offset):
+        super().__init__()
+        self.offset = offset
+
+
+def sniff_image_type(header):
+    """Return the MIME type matching the leading bytes, or None"""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    return None
+
+
+class ImageUploadGuard(FileUploadHandler):
+    """Reject oversized or non-image uploads while the body is still streaming.
+
+    Sits in front of Django's memory/temporary-file handlers and passes every
+    chunk through untouched, so a bad upload is refused after its first bytes
+    instead of after it has been buffered and handed to Pillow.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > MAX_IMAGE_UPLOAD_SIZE + MULTIPART_OVERHEAD:
+            raise UploadRejected("Image size should be less than 10MB")
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b""
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > MAX_IMAGE_UPLOAD_SIZE:
+            raise UploadRejected("Image size should be less than 10MB")
+
+        if len(self.header) < SNIFF_LENGTH:
+            self.header += raw_data[:SNIFF_LENGTH - len(self.header)]
+            if len(self.header) == SNIFF_LENGTH:
+                self.check_header()
+        return raw_data
+
+    def file_complete(self, file_size):
+        # Files shorter than the sniff window never reached the check above
+        if len(self.header) < SNIFF_LENGTH:
+            self.check_header()
+        return None
+
+    def check_header(self):
+        if sniff_image_type(self.header) is None:
+            raise UploadRejected("Only image files are allowed")
+
+
+def image_upload_handlers(request):
+    """Upload handler chain for image endpoints.
+
+    Small files stay in memory; anything above FILE_UPLOAD_MAX_MEMORY_SIZE is
+    spooled to a temporary file as it arrives.
+    """
+    return [
+        ImageUploadGuard(request),
+        MemoryFileUploadHandler(request),
+        TemporaryFileUploadHandler(request),
+    ]
+
+
+class ResumableUpload:
+    """An image sent in chunks over several requests.
+
+    Bytes are appended to <id>.part under RESUMABLE_UPLOAD_DIR, and the
+    declared size, name and type are kept in <id>.json beside it. The
+    current offset is simply the size of the part file, so a client whose
+    connection dropped asks for it and carries on from there.
+    """
+
+    def __init__(self, upload_id, size, filename, content_type):
+        self.upload_id = upload_id
+        self.size = size
+        self.filename = filename
+        self.content_type = content_type
+
+    @classmethod
+    def create(cls, size, filename="upload.jpg", content_type="image/jpeg"):
+        if not 0 < size <= MAX_IMAGE_UPLOAD_SIZE:
+            raise UploadRejected("Image size should be less than 10MB")
+
+        cls.remove_expired()
+        os.makedirs(settings.RESUMABLE_UPLOAD_DIR, exist_ok=True)
+        upload = cls(uuid.uuid4().hex, size, os.path.basename(filename) or "upload.jpg", content_type)
+        with open(upload.meta_path, "w") as f:
+            json.dump({"size": size, "filename": upload.filename, "content_type": content_type}, f)
+        open(upload.part_path, "wb").close()
+        return upload
+
+    @classmethod
+    def load(cls, upload_id):
+        # The id becomes part of a path, so only accept what create() issues
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            raise UploadNotFound()
+        try:
+            with open(os.path.join(settings.RESUMABLE_UPLOAD_DIR, f"{upload_id}.json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise UploadNotFound()
+        return cls(upload_id, meta["size"], meta["filename"], meta["content_type"])
+
+    @classmethod
+    def remove_expired(cls):
+        """Delete uploads untouched for RESUMABLE_UPLOAD_EXPIRY seconds.
+
+        Appends only touch the .part file, so an upload's files expire
+        together, by the newer of the two.
+        """
+        cutoff = time.time() - settings.RESUMABLE_UPLOAD_EXPIRY
+        try:
+            entries = list(os.scandir(settings.RESUMABLE_UPLOAD_DIR))
+        except FileNotFoundError:
+            return
+        uploads = {}
+        for entry in entries:
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            upload_id = os.path.splitext(entry.name)[0]
+            paths, last_modified = uploads.get(upload_id, ([], 0))
+            uploads[upload_id] = (paths + [entry.path], max(last_modified, mtime))
+        for paths, last_modified in uploads.values():
+            if last_modified >= cutoff:
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @property
+    def meta_path(self):
+        return os.path.join(settings.RESUMABLE_UPLOAD_DIR, f"{self.upload_id}.json")
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.RESUMABLE_UPLOAD_DIR, f"{self.upload_id}.part")
+
+    @property
+    def offset(self):
+        try:
+            return os.path.getsize(self.part_path)
+        except OSError:
+            raise UploadNotFound()
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+    def append(self, offset, data):
+        """Write a chunk at offset and return the new offset.
+
+        A retried chunk that already arrived, or one sent out of order, is
+        refused with the server's offset so the client can resynchronise.
+        """
+        if len(data) > MAX_UPLOAD_CHUNK_SIZE:
+            raise UploadRejected("Chunk is larger than the maximum chunk size")
+
+        try:
+            part = open(self.part_path, "r+b")
+        except OSError:
+            raise UploadNotFound()
+        with part:
+            # Two workers may receive retries of the same chunk at once
+            if fcntl is not None:
+                fcntl.flock(part, fcntl.LOCK_EX)
+            current = part.seek(0, os.SEEK_END)
+            if offset != current:
+                raise UploadOffsetMismatch(current)
+            if offset + len(data) > self.size:
+                raise UploadRejected("Chunk runs past the declared upload size")
+
+            # Same check ImageUploadGuard makes on single-request uploads
+            if offset < SNIFF_LENGTH:
+                part.seek(0)
+                header = (part.read(offset) + data)[:SNIFF_LENGTH]
+                if (len(header) == SNIFF_LENGTH or offset + len(data) == self.size) and sniff_image_type(header) is None:
+                    part.close()
+                    self.delete()
+                    raise UploadRejected("Only image files are allowed")
+
+            part.seek(offset)
+            part.write(data)
+            return offset + len(data)
+
+    def as_uploaded_file(self):
+        """The assembled image, shaped like a file from request.FILES"""
+        return UploadedFile(
+            open(self.part_path, "rb"),
+            name=self.filename,
+            content_type=self.content_type,
+            size=self.size,
+        )
+
+    def delete(self):
+        for path in (self.part_path, self.meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,8 +1,22 @@
 from django.urls import path
 from .views import Barcodeone
 from .views import ImageApi
+from .views import ImageUploadApi, ImageUploadChunkApi
+from .views import AlternativesApi, ProductSearchApi, AnalysesExportApi
+from .views import TopProductsApi, RiskDistributionApi, AdulterationTrendApi
+from .profiling import profile_list, profile_detail
 
 urlpatterns=[
     path('barcode/',Barcodeone.as_view()),
     path('image/',ImageApi.as_view()),
+    path('uploads/',ImageUploadApi.as_view()),
+    path('uploads/<str:upload_id>/',ImageUploadChunkApi.as_view()),
+    path('alternatives/<str:barcode>/',AlternativesApi.as_view()),
+    path('search/',ProductSearchApi.as_view()),
+    path('export/analyses/',AnalysesExportApi.as_view()),
+    path('analytics/top-products/',TopProductsApi.as_view()),
+    path('analytics/risk-distribution/',RiskDistributionApi.as_view()),
+    path('analytics/adulteration-trend/',AdulterationTrendApi.as_view()),
+    path('profiles/',profile_list),
+    path('profiles/<str:profile_id>/',profile_detail),
 ]
\ No newline at end of file
@@ -1,15 +1,41 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.parsers import MultiPartParser, FormParser
-from .serializers import BarcodeSerializer,ImageSerializer
-import requests
-from django.http import JsonResponse, HttpResponse
-from .LLM import LLM
-import json
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from . import analytics
+from .auth import ApiKeyOrStaffRequired
+from .export import export_chunks, export_lines, iterate_async
+from .metrics import TimedJSONRenderer
+from .models import RollupPeriod
+from .search import SearchQueryError, search_products
+from .serializers import (
+    AlternativesQuerySerializer,
+    AnalyticsQuerySerializer,
+    BarcodeSerializer,
+    ExportQuerySerializer,
+    ImageSerializer,
+    SearchQuerySerializer,
+)
+from .services import product_service, image_service
+from .uploads import (
+    UPLOAD_CHUNK_SIZE,
+    ResumableUpload,
+    UploadNotFound,
+    UploadOffsetMismatch,
+    UploadRejected,
+    image_upload_handlers,
+)
 
 
 class Barcodeone(APIView):
+    throttle_scope = "barcode"
+    
     def post(self, request):
         serializer = BarcodeSerializer(data=request.data)
         if serializer.is_valid():
@@ -17,7 +43,7 @@ class Barcodeone(APIView):
             
             try:
                 # Get comprehensive product information
-                product_analysis = self.analyze_product_by_barcode(barcode)
+                product_analysis = product_service.analyze_product_by_barcode(barcode)
                 
                 return Response({
                     "status": "success",
@@ -38,450 +64,32 @@ class Barcodeone(APIView):
             "details": serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    def analyze_product_by_barcode(self, barcode):
-        """Comprehensive product analysis using OpenFoodFacts API"""
-        
-        # Fetch detailed product information
-        product_data = self.fetch_openfoodfacts_data(barcode)
-        
-        if not product_data:
-            return {
-                "status": "not_found",
-                "message": "Product not found in OpenFoodFacts database",
-                "barcode": barcode,
-                "recommendations": "Try scanning the barcode again or enter manually"
-            }
-        
-        # Analyze the product for health and adulteration
-        analysis = self.analyze_product_health_and_adulteration(product_data)
-        
-        return {
-            "status": "success",
-            "product_info": product_data,
-            "health_analysis": analysis["health"],
-            "adulteration_analysis": analysis["adulteration"],
-            "recommendations": analysis["recommendations"],
-            "home_tests": analysis["home_tests"],
-            "risk_assessment": analysis["risk_assessment"]
-        }
-
-    def fetch_openfoodfacts_data(self, barcode):
-        """Fetch comprehensive product data from OpenFoodFacts API"""
-        
-        # Comprehensive fields to fetch
-        fields = [
-            "product_name", "brands", "categories", "ingredients_text", 
-            "nutrition_grades", "nutriscore_grade", "nutriscore_score",
-            "additives_tags", "allergens_tags", "traces_tags",
-            "ingredients_analysis_tags", "labels_tags", "packaging_tags",
-            "countries_tags", "manufacturing_places_tags", "stores_tags",
-            "quantity", "serving_size", "energy_100g", "fat_100g", 
-            "saturated_fat_100g", "carbohydrates_100g", "sugars_100g",
-            "fiber_100g", "proteins_100g", "salt_100g", "sodium_100g",
-            "vitamin_c_100g", "calcium_100g", "iron_100g", "image_url",
-            "image_nutrition_url", "image_ingredients_url", "ecoscore_grade",
-            "nova_group", "last_modified_t", "created_t"
-        ]
-        
-        url = f"https://world.openfoodfacts.net/api/v2/product/{barcode}"
-        params = {
-            "fields": ",".join(fields)
-        }
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("status") == 1 and data.get("product"):
-                    return data["product"]
-                else:
-                    return None
-            else:
-                return None
-                
-        except requests.RequestException as e:
-            print(f"Error fetching OpenFoodFacts data: {e}")
-            return None
-
-    def analyze_product_health_and_adulteration(self, product_data):
-        """Analyze product for health and adulteration risks"""
-        
-        # Health Analysis
-        health_analysis = self.analyze_health_factors(product_data)
-        
-        # Adulteration Analysis
-        adulteration_analysis = self.analyze_adulteration_risks(product_data)
-        
-        # Risk Assessment
-        risk_assessment = self.assess_overall_risk(health_analysis, adulteration_analysis)
-        
-        # Recommendations
-        recommendations = self.generate_recommendations(health_analysis, adulteration_analysis)
-        
-        # Home Tests
-        home_tests = self.generate_home_tests(product_data, adulteration_analysis)
-        
-        return {
-            "health": health_analysis,
-            "adulteration": adulteration_analysis,
-            "risk_assessment": risk_assessment,
-            "recommendations": recommendations,
-            "home_tests": home_tests
-        }
-
-    def analyze_health_factors(self, product_data):
-        """Analyze health factors of the product"""
-        
-        health_score = 0
-        health_issues = []
-        health_benefits = []
-        
-        # Nutri-Score Analysis
-        nutriscore = product_data.get("nutriscore_grade", "").upper()
-        if nutriscore in ["A", "B"]:
-            health_score += 2
-            health_benefits.append(f"Good Nutri-Score ({nutriscore})")
-        elif nutriscore in ["C"]:
-            health_score += 1
-            health_issues.append(f"Moderate Nutri-Score ({nutriscore})")
-        elif nutriscore in ["D", "E"]:
-            health_score -= 2
-            health_issues.append(f"Poor Nutri-Score ({nutriscore})")
-        
-        # NOVA Group Analysis (Food Processing)
-        nova_group = product_data.get("nova_group")
-        if nova_group == 1:
-            health_score += 2
-            health_benefits.append("Minimally processed food")
-        elif nova_group == 2:
-            health_score += 1
-            health_benefits.append("Processed culinary ingredients")
-        elif nova_group == 3:
-            health_score -= 1
-            health_issues.append("Processed food")
-        elif nova_group == 4:
-            health_score -= 2
-            health_issues.append("Ultra-processed food")
-        
-        # Nutritional Analysis
-        nutrition_analysis = self.analyze_nutrition(product_data)
-        health_score += nutrition_analysis["score"]
-        health_issues.extend(nutrition_analysis["issues"])
-        health_benefits.extend(nutrition_analysis["benefits"])
-        
-        # Additives Analysis
-        additives = product_data.get("additives_tags", [])
-        if additives:
-            harmful_additives = [additive for additive in additives if any(harmful in additive.lower() for harmful in ["e621", "e951", "e211", "e250"])]
-            if harmful_additives:
-                health_score -= 1
-                health_issues.append(f"Contains potentially harmful additives: {', '.join(harmful_additives)}")
-        
-        # Allergens Analysis
-        allergens = product_data.get("allergens_tags", [])
-        if allergens:
-            health_issues.append(f"Contains allergens: {', '.join(allergens)}")
-        
-        return {
-            "overall_score": health_score,
-            "nutriscore": nutriscore,
-            "nova_group": nova_group,
-            "health_issues": health_issues,
-            "health_benefits": health_benefits,
-            "nutrition_analysis": nutrition_analysis,
-            "additives_count": len(additives),
-            "allergens": allergens
-        }
-
-    def analyze_nutrition(self, product_data):
-        """Analyze nutritional content"""
-        
-        score = 0
-        issues = []
-        benefits = []
-        
-        # Sugar Analysis
-        sugars = product_data.get("sugars_100g", 0)
-        if sugars > 15:
-            score -= 2
-            issues.append(f"High sugar content ({sugars}g/100g)")
-        elif sugars < 5:
-            score += 1
-            benefits.append(f"Low sugar content ({sugars}g/100g)")
-        
-        # Salt Analysis
-        salt = product_data.get("salt_100g", 0)
-        if salt > 1.5:
-            score -= 2
-            issues.append(f"High salt content ({salt}g/100g)")
-        elif salt < 0.3:
-            score += 1
-            benefits.append(f"Low salt content ({salt}g/100g)")
-        
-        # Fat Analysis
-        fat = product_data.get("fat_100g", 0)
-        saturated_fat = product_data.get("saturated_fat_100g", 0)
-        
-        if saturated_fat > 5:
-            score -= 1
-            issues.append(f"High saturated fat ({saturated_fat}g/100g)")
-        
-        # Fiber Analysis
-        fiber = product_data.get("fiber_100g", 0)
-        if fiber > 3:
-            score += 1
-            benefits.append(f"Good fiber content ({fiber}g/100g)")
-        
-        # Protein Analysis
-        protein = product_data.get("proteins_100g", 0)
-        if protein > 10:
-            score += 1
-            benefits.append(f"Good protein content ({protein}g/100g)")
-        
-        return {
-            "score": score,
-            "issues": issues,
-            "benefits": benefits,
-            "sugars": sugars,
-            "salt": salt,
-            "fat": fat,
-            "saturated_fat": saturated_fat,
-            "fiber": fiber,
-            "protein": protein
-        }
-
-    def analyze_adulteration_risks(self, product_data):
-        """Analyze potential adulteration risks"""
-        
-        adulteration_risks = []
-        risk_level = "Low"
-        
-        # Check for suspicious ingredients
-        ingredients_text = product_data.get("ingredients_text", "").lower()
-        suspicious_patterns = [
-            "artificial", "synthetic", "imitation", "substitute",
-            "modified", "hydrogenated", "trans fat", "high fructose"
-        ]
-        
-        for pattern in suspicious_patterns:
-            if pattern in ingredients_text:
-                adulteration_risks.append(f"Contains {pattern} ingredients")
-        
-        # Check for excessive additives
-        additives = product_data.get("additives_tags", [])
-        if len(additives) > 10:
-            adulteration_risks.append(f"High number of additives ({len(additives)})")
-            risk_level = "Medium"
-        
-        # Check for artificial colors
-        artificial_colors = [additive for additive in additives if "e1" in additive.lower()]
-        if artificial_colors:
-            adulteration_risks.append(f"Contains artificial colors: {', '.join(artificial_colors)}")
-            risk_level = "Medium"
-        
-        # Check for preservatives
-        preservatives = [additive for additive in additives if any(p in additive.lower() for p in ["e200", "e202", "e211", "e220"])]
-        if preservatives:
-            adulteration_risks.append(f"Contains preservatives: {', '.join(preservatives)}")
-        
-        # Check packaging and origin
-        packaging = product_data.get("packaging_tags", [])
-        if "plastic" in str(packaging).lower():
-            adulteration_risks.append("Packaged in plastic (potential chemical leaching)")
-        
-        # Check manufacturing location
-        manufacturing_places = product_data.get("manufacturing_places_tags", [])
-        if not manufacturing_places:
-            adulteration_risks.append("Manufacturing location not specified")
-            risk_level = "Medium"
-        
-        if len(adulteration_risks) > 3:
-            risk_level = "High"
-        elif len(adulteration_risks) > 1:
-            risk_level = "Medium"
-        
-        return {
-            "risk_level": risk_level,
-            "risks": adulteration_risks,
-            "additives_count": len(additives),
-            "suspicious_ingredients": len([r for r in adulteration_risks if "suspicious" in r]),
-            "packaging_concerns": len([r for r in adulteration_risks if "packaging" in r])
-        }
-
-    def assess_overall_risk(self, health_analysis, adulteration_analysis):
-        """Assess overall consumption risk"""
-        
-        health_score = health_analysis["overall_score"]
-        adulteration_level = adulteration_analysis["risk_level"]
-        
-        if health_score < -2 or adulteration_level == "High":
-            overall_risk = "High"
-            confidence = 9
-        elif health_score < 0 or adulteration_level == "Medium":
-            overall_risk = "Medium"
-            confidence = 7
-        else:
-            overall_risk = "Low"
-            confidence = 8
-        
-        return {
-            "overall_risk": overall_risk,
-            "confidence_score": confidence,
-            "health_score": health_score,
-            "adulteration_risk": adulteration_level,
-            "consumption_recommendation": self.get_consumption_recommendation(overall_risk)
-        }
-
-    def get_consumption_recommendation(self, risk_level):
-        """Get consumption recommendation based on risk level"""
-        
-        recommendations = {
-            "Low": "Safe to consume regularly as part of a balanced diet",
-            "Medium": "Consume in moderation, consider healthier alternatives",
-            "High": "Avoid or consume very rarely, consider alternative products"
-        }
-        
-        return recommendations.get(risk_level, "Consult nutritionist for personalized advice")
-
-    def generate_recommendations(self, health_analysis, adulteration_analysis):
-        """Generate comprehensive recommendations"""
-        
-        recommendations = []
-        
-        # Health-based recommendations
-        if health_analysis["overall_score"] < 0:
-            recommendations.append("Consider choosing products with better Nutri-Score (A or B)")
-        
-        if health_analysis["nutrition_analysis"]["sugars"] > 15:
-            recommendations.append("High sugar content - limit consumption")
-        
-        if health_analysis["nutrition_analysis"]["salt"] > 1.5:
-            recommendations.append("High salt content - consume in moderation")
-        
-        # Adulteration-based recommendations
-        if adulteration_analysis["risk_level"] == "High":
-            recommendations.append("High adulteration risk - consider alternative products")
-        
-        if adulteration_analysis["additives_count"] > 10:
-            recommendations.append("High additive content - choose products with fewer additives")
-        
-        # General recommendations
-        recommendations.extend([
-            "Read ingredient labels carefully",
-            "Choose products with minimal processing",
-            "Prefer products with clear manufacturing information",
-            "Consider organic alternatives when possible"
-        ])
-        
-        return recommendations
-
-    def generate_home_tests(self, product_data, adulteration_analysis):
-        """Generate relevant home tests based on product type and risks"""
-        
-        home_tests = []
-        
-        # Get product category
-        categories = product_data.get("categories", "").lower()
-        
-        # General tests
-        home_tests.append({
-            "test_name": "Visual Inspection",
-            "materials_needed": ["Good lighting", "Magnifying glass"],
-            "procedure": "Examine product for unusual colors, textures, or foreign particles",
-            "expected_result": "Natural appearance consistent with product type",
-            "adulteration_indicator": "Unusual colors, textures, or foreign materials",
-            "safety_notes": "Do not consume if suspicious characteristics are observed",
-            "accuracy_level": "Medium"
-        })
-        
-        # Category-specific tests
-        if "milk" in categories or "dairy" in categories:
-            home_tests.extend([
-                {
-                    "test_name": "Water Detection Test",
-                    "materials_needed": ["Clean glass", "Water", "Dropper"],
-                    "procedure": "Add a few drops of milk to water. Pure milk forms a white layer on top.",
-                    "expected_result": "White layer forms on top",
-                    "adulteration_indicator": "Milk mixes completely with water",
-                    "safety_notes": "Safe to perform",
-                    "accuracy_level": "High"
-                },
-                {
-                    "test_name": "Starch Detection Test",
-                    "materials_needed": ["Iodine solution", "Cotton swab"],
-                    "procedure": "Dip cotton swab in iodine and touch it to milk",
-                    "expected_result": "Brown color",
-                    "adulteration_indicator": "Blue-black color indicates starch",
-                    "safety_notes": "Do not consume tested portion",
-                    "accuracy_level": "High"
-                }
-            ])
-        
-        if "honey" in categories:
-            home_tests.extend([
-                {
-                    "test_name": "Water Test",
-                    "materials_needed": ["Clean glass", "Water"],
-                    "procedure": "Drop honey into water. Pure honey settles at bottom.",
-                    "expected_result": "Honey settles at bottom",
-                    "adulteration_indicator": "Honey dissolves or spreads in water",
-                    "safety_notes": "Safe to perform",
-                    "accuracy_level": "High"
-                },
-                {
-                    "test_name": "Flame Test",
-                    "materials_needed": ["Matchstick", "Cotton swab"],
-                    "procedure": "Dip cotton swab in honey and try to light it",
-                    "expected_result": "Honey burns easily",
-                    "adulteration_indicator": "Honey does not burn or burns poorly",
-                    "safety_notes": "Perform in safe area, away from flammable materials",
-                    "accuracy_level": "Medium"
-                }
-            ])
-        
-        if "spice" in categories or "powder" in categories:
-            home_tests.append({
-                "test_name": "Color Test",
-                "materials_needed": ["Water", "Cotton swab"],
-                "procedure": "Rub spice on cotton swab and dip in water. Check for color bleeding.",
-                "expected_result": "Minimal color bleeding",
-                "adulteration_indicator": "Excessive color bleeding indicates artificial colors",
-                "safety_notes": "Safe to perform",
-                "accuracy_level": "Medium"
-            })
-        
-        return home_tests
-
 class ImageApi(APIView):
     parser_classes = (MultiPartParser, FormParser)
+    throttle_scope = "image"
+    
+    def initialize_request(self, request, *args, **kwargs):
+        # Size and type checks must be installed before anything reads the body
+        request.upload_handlers = image_upload_handlers(request)
+        return super().initialize_request(request, *args, **kwargs)
     
     def post(self, request):
-        serializer = ImageSerializer(data=request.data)
+        try:
+            serializer = ImageSerializer(data=request.data)
+        except UploadRejected as e:
+            return Response({
+                "error": str(e.detail),
+                "status": "error"
+            }, status=400)
+        
         if serializer.is_valid():
             image = serializer.validated_data["image"]
-            
-            # Validate image file
-            if not image.content_type.startswith("image/"):
-                return Response({
-                    "error": "Only image files are allowed",
-                    "status": "error"
-                }, status=400)
-            
-            # Check file size (max 10MB)
-            if image.size > 10 * 1024 * 1024:
-                return Response({
-                    "error": "Image size should be less than 10MB",
-                    "status": "error"
-                }, status=400)
+            upload = serializer.validated_data.get("upload")
             
             try:
-                # Initialize LLM analyzer
-                llm_analyzer = LLM()
-                
-                # Analyze the image for adulteration
-                analysis_result = llm_analyzer.analyze_food_image(image)
+                analysis_result = image_service.analyze_image(
+                    image, use_ai=serializer.validated_data["use_ai"]
+                )
                 
                 # Prepare response data
                 response_data = {
@@ -489,7 +97,7 @@ class ImageApi(APIView):
                     "filename": image.name,
                     "file_size": image.size,
                     "content_type": image.content_type,
-                    "analysis": analysis_result
+                    **analysis_result
                 }
                 
                 return Response(response_data, status=200)
@@ -501,18 +109,281 @@ class ImageApi(APIView):
                     "filename": image.name
                 }, status=500)
                 
+            finally:
+                # A chunked upload is analysed once, then its parts are dropped
+                if upload:
+                    image.close()
+                    upload.delete()
+                
         return Response({
             "error": "Invalid image data",
             "details": serializer.errors,
             "status": "error"
         }, status=400)
 
+class ImageUploadApi(APIView):
+    """Start a chunked, resumable image upload.
 
+    The client declares the size up front, PATCHes the bytes to
+    /uploads/<upload_id>/ in order, then posts the upload_id to /image/.
+    """
+    parser_classes = (JSONParser,)
+    throttle_scope = "barcode"
+    
+    def post(self, request):
+        try:
+            size = int(request.data.get("size", 0))
+        except (TypeError, ValueError):
+            size = 0
+        
+        try:
+            upload = ResumableUpload.create(
+                size,
+                filename=str(request.data.get("filename") or "upload.jpg"),
+                content_type=str(request.data.get("content_type") or "image/jpeg"),
+            )
+        except UploadRejected as e:
+            return Response({
+                "error": str(e.detail),
+                "status": "error"
+            }, status=400)
+        
+        return Response({
+            "status": "success",
+            "upload_id": upload.upload_id,
+            "offset": 0,
+            "size": upload.size,
+            "chunk_size": UPLOAD_CHUNK_SIZE
+        }, status=201)
 
+class ImageUploadChunkApi(APIView):
+    """Report the offset of a resumable upload (GET) or append a chunk (PATCH).
 
+    PATCH bodies are raw bytes starting at the offset given in the
+    Upload-Offset header.
+    """
+    throttle_scope = "upload"
+    
+    def get(self, request, upload_id):
+        try:
+            upload = ResumableUpload.load(upload_id)
+            return self.offset_response(upload, upload.offset)
+        except UploadNotFound as e:
+            return Response({"error": str(e.detail), "status": "error"}, status=404)
+    
+    def patch(self, request, upload_id):
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return Response({
+                "error": "Upload-Offset header is required",
+                "status": "error"
+            }, status=400)
+        
+        try:
+            upload = ResumableUpload.load(upload_id)
+            # Read the raw body; the chunk is not form or JSON data
+            new_offset = upload.append(offset, request.body)
+        except UploadOffsetMismatch as e:
+            response = self.offset_response(upload, e.offset, status=409)
+            response.data.update(status="error", error=str(e.detail))
+            return response
+        except (UploadNotFound, UploadRejected) as e:
+            return Response({"error": str(e.detail), "status": "error"}, status=e.status_code)
+        
+        return self.offset_response(upload, new_offset)
+    
+    def offset_response(self, upload, offset, status=200):
+        response = Response({
+            "status": "success",
+            "upload_id": upload.upload_id,
+            "offset": offset,
+            "size": upload.size,
+            "complete": offset == upload.size
+        }, status=status)
+        response["Upload-Offset"] = str(offset)
+        return response
 
 
+def describe_product(product):
+    """Summary of a stored Product for API responses"""
+    return {
+        "barcode": product.barcode,
+        "product_name": product.product_name,
+        "brands": product.brands,
+        "nutriscore_grade": product.nutriscore_grade or None,
+        "nova_group": product.nova_group,
+        "additives_count": product.additives_count,
+        "image_url": product.image_url or None
+    }
 
+class AlternativesApi(APIView):
+    """Healthier products from the same category as a barcode.
+
+    Ranked by Nutri-Score, NOVA group and additive count; served from the
+    category rank index of the local product store (api.product_store).
+    """
+    throttle_scope = "barcode"
+    
+    def get(self, request, barcode):
+        serializer = AlternativesQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({
+                "status": "error",
+                "error": "Invalid query parameters",
+                "details": serializer.errors
+            }, status=400)
+        
+        try:
+            product, alternatives = product_service.find_alternatives(barcode, serializer.validated_data["limit"])
+        except Exception as e:
+            return Response({
+                "status": "error",
+                "error": f"Lookup failed: {str(e)}",
+                "barcode": barcode
+            }, status=500)
+        
+        if product is None:
+            return Response({
+                "status": "not_found",
+                "message": "Product not found in OpenFoodFacts database",
+                "barcode": barcode
+            }, status=404)
+        
+        return Response({
+            "status": "success",
+            "barcode": barcode,
+            "product": describe_product(product),
+            "alternatives": [
+                {**describe_product(alternative), "category": category}
+                for alternative, category in alternatives
+            ]
+        }, status=200)
+
+class ProductSearchApi(APIView):
+    """Boolean search over ingredients, additives, allergens, labels and
+    manufacturing places of the stored products (see api.search).
+
+    Results come in barcode order; pass next_cursor back as cursor for the
+    following page.
+    """
+    throttle_scope = "barcode"
+    
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({
+                "status": "error",
+                "error": "Invalid query parameters",
+                "details": serializer.errors
+            }, status=400)
+        
+        params = serializer.validated_data
+        try:
+            products, next_cursor = search_products(params["q"], params["cursor"], params["limit"])
+        except SearchQueryError as e:
+            return Response({
+                "status": "error",
+                "error": f"Invalid query: {e}",
+                "query": params["q"]
+            }, status=400)
+        
+        return Response({
+            "status": "success",
+            "query": params["q"],
+            "results": [describe_product(product) for product in products],
+            "next_cursor": next_cursor
+        }, status=200)
 
 
+class AnalysesExportApi(APIView):
+    """Re-scored analyses of the stored products as streamed NDJSON (see
+    api.export), optionally for one category.
 
+    Sent gzip-compressed when the client accepts it. An interrupted export
+    resumes with cursor set to the barcode of the last line received.
+    """
+    permission_classes = (ApiKeyOrStaffRequired,)
+    renderer_classes = (TimedJSONRenderer,)
+    throttle_scope = "barcode"
+    
+    def get(self, request):
+        serializer = ExportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({
+                "status": "error",
+                "error": "Invalid query parameters",
+                "details": serializer.errors
+            }, status=400)
+        
+        params = serializer.validated_data
+        compress = "gzip" in request.headers.get("Accept-Encoding", "")
+        chunks = export_chunks(export_lines(params["category"], params["cursor"]), compress)
+        # ASGI servers need an async iterator to stream instead of buffering
+        if isinstance(request._request, ASGIRequest):
+            chunks = iterate_async(chunks)
+        
+        response = StreamingHttpResponse(chunks, content_type="application/x-ndjson")
+        response["Content-Disposition"] = 'attachment; filename="analyses.ndjson"'
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        return response
+
+
+@method_decorator(cache_page(settings.ANALYTICS_CACHE_TIMEOUT), name="get")
+class AnalyticsApi(APIView):
+    """Read-only dashboard data, computed from the scan rollups (api.analytics).
+
+    Responses are cached by URL for ANALYTICS_CACHE_TIMEOUT seconds, about
+    as often as the rollups change. They are the same for every caller, so
+    only JSON is served. Callers need an API key or a staff session and
+    count against the barcode rate limit; both are checked before the cache.
+    """
+    permission_classes = (ApiKeyOrStaffRequired,)
+    renderer_classes = (TimedJSONRenderer,)
+    throttle_scope = "barcode"
+    
+    def get(self, request):
+        serializer = AnalyticsQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({
+                "status": "error",
+                "error": "Invalid query parameters",
+                "details": serializer.errors
+            }, status=400)
+        
+        return Response({
+            "status": "success",
+            "rollups_updated_at": analytics.rollups_updated_at(),
+            **self.query(serializer.validated_data)
+        }, status=200)
+    
+    def query(self, params):
+        """The endpoint's data for the validated query parameters; subclasses implement it"""
+        raise NotImplementedError(f"{type(self).__name__} must implement query()")
+
+class TopProductsApi(AnalyticsApi):
+    def query(self, params):
+        return {
+            "days": params["days"],
+            "products": analytics.top_products(params["days"], params["limit"])
+        }
+
+class RiskDistributionApi(AnalyticsApi):
+    def query(self, params):
+        return {
+            "days": params["days"],
+            "by": params["by"],
+            "groups": analytics.risk_distribution(params["days"], params["by"], params["limit"])
+        }
+
+class AdulterationTrendApi(AnalyticsApi):
+    def query(self, params):
+        period = params["period"]
+        buckets = params["days"] * 24 if period == RollupPeriod.HOUR else params["days"]
+        return {
+            "period": period,
+            "days": params["days"],
+            "series": analytics.adulteration_trend(period, buckets)
+        }
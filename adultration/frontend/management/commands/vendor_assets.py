@@ -0,0 +1,48 @@
+import os
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from frontend.vendor import VENDOR_ASSETS, integrity
+
+
+class Command(BaseCommand):
+    help = "Download the pinned third-party browser libraries into frontend/static, checking their integrity"
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="assets to fetch (default: all)")
+        parser.add_argument("--force", action="store_true", help="replace assets that are already present")
+
+    def handle(self, *args, **options):
+        names = options["names"] or list(VENDOR_ASSETS)
+        unknown = set(names) - set(VENDOR_ASSETS)
+        if unknown:
+            raise CommandError(f"Unknown assets: {', '.join(sorted(unknown))}")
+
+        static_dir = settings.BASE_DIR / "frontend" / "static"
+        for name in names:
+            asset = VENDOR_ASSETS[name]
+            path = static_dir / asset["path"]
+            if path.exists() and not options["force"]:
+                self.stdout.write(f"{name}: already vendored at {asset['path']}")
+                continue
+
+            try:
+                response = requests.get(asset["url"], timeout=30)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                raise CommandError(f"{name}: could not download {asset['url']}: {e}")
+
+            digest = integrity(response.content)
+            if asset["integrity"] is None:
+                raise CommandError(
+                    f"{name}: no integrity pinned; check {digest} against the release "
+                    f"and set it in frontend/vendor.py"
+                )
+            if digest != asset["integrity"]:
+                raise CommandError(f"{name}: {asset['url']} has integrity {digest}, expected {asset['integrity']}")
+
+            os.makedirs(path.parent, exist_ok=True)
+            path.write_bytes(response.content)
+            self.stdout.write(f"{name}: {len(response.content)} bytes, {digest} -> {asset['path']}")
@@ -0,0 +1,446 @@
+// Barcode lookup and results for FoodGuard (loaded on demand by main.js)
+//
+// Requires scan-cache.js. Also used by the scanner and image bundles to
+// render product results.
+
+// Replay scans queued by this page while no service worker was active
+async function replayQueuedScans() {
+    const completed = await ScanCache.flushQueue(async (entry) => {
+        const response = await fetch('/api/v1/barcode/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCSRFToken()
+            },
+            body: JSON.stringify({ Barcode: entry.original })
+        });
+        return { status: response.status, data: await response.json().catch(() => ({})) };
+    }).catch(() => []);
+    
+    completed.forEach(({ barcode, data }) => handleSyncedScan(barcode, data));
+}
+
+function handleSyncedScan(barcode, data) {
+    showToast(`Queued scan ${barcode} analyzed`, 'success');
+    
+    // Replace the "queued" notice if that scan is still on screen
+    const container = document.getElementById('barcodeData');
+    if (container.dataset.pendingBarcode === ScanCache.normalizeBarcode(barcode) && !data.error) {
+        delete container.dataset.pendingBarcode;
+        displayBarcodeResults(data, barcode);
+    }
+}
+
+// GTIN-8/12/13/14 with a correct check digit (same rule as api/barcode_reader.py)
+function isValidGtin(code) {
+    if (!/^(\d{8}|\d{12,14})$/.test(code)) {
+        return false;
+    }
+    const digits = code.split('').map(Number);
+    const check = digits.pop();
+    // Weights alternate 3,1,3,... starting from the digit next to the check digit
+    const total = digits.reverse().reduce((sum, digit, i) => sum + digit * (i % 2 === 0 ? 3 : 1), 0);
+    return (10 - total % 10) % 10 === check;
+}
+
+function processDetectedBarcode(barcode, confidence = null) {
+    const detail = confidence === null ? '' : ` (${Math.round(confidence * 100)}% confidence)`;
+    showToast(`Barcode detected: ${barcode}${detail}`, 'success');
+    requestBarcodeAnalysis(barcode);
+}
+
+// Barcode Scanning
+function scanBarcode() {
+    const barcodeInput = document.getElementById('barcodeInput');
+    const barcode = barcodeInput.value.trim();
+    
+    if (!barcode) {
+        showToast('Please enter a barcode number', 'error');
+        return;
+    }
+    
+    if (!/^\d+$/.test(barcode)) {
+        showToast('Please enter a valid numeric barcode', 'error');
+        return;
+    }
+    
+    if (!isValidGtin(barcode)) {
+        showToast('That barcode is not valid. Please check the digits.', 'error');
+        return;
+    }
+    
+    requestBarcodeAnalysis(barcode);
+}
+
+// Look up a barcode, answering from the scan cache when possible.
+// A fresh cached result skips the network entirely; a stale one is shown
+// at once and replaced only if the product's revision has changed.
+async function requestBarcodeAnalysis(barcode) {
+    // A code that fails its check digit cannot be a product; don't ask
+    if (!isValidGtin(barcode)) {
+        showToast(`Ignoring invalid barcode ${barcode}`, 'error');
+        return;
+    }
+    
+    const container = document.getElementById('barcodeData');
+    delete container.dataset.pendingBarcode;
+    
+    showElement('barcodeResult');
+    showElement('barcodeLoading');
+    hideElement('barcodeData');
+    
+    const cached = await ScanCache.get(barcode).catch(() => null);
+    if (cached) {
+        hideElement('barcodeLoading');
+        showElement('barcodeData');
+        displayBarcodeResults(cached.data, barcode);
+        if (ScanCache.isFresh(cached)) {
+            showToast('Loaded from recent scans', 'success');
+            return;
+        }
+    }
+    
+    let response;
+    let data;
+    try {
+        // Call the API
+        response = await fetch('/api/v1/barcode/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCSRFToken()
+            },
+            body: JSON.stringify({
+                Barcode: barcode
+            })
+        });
+        data = await response.json();
+    } catch (error) {
+        console.error('Error:', error);
+        if (cached) {
+            showToast('Offline: showing a saved result', 'error');
+            return;
+        }
+        if (!navigator.serviceWorker || !navigator.serviceWorker.controller) {
+            // No service worker to queue it for us
+            await ScanCache.enqueue(barcode, getCSRFToken()).catch(() => {});
+            showQueuedScan(barcode);
+            return;
+        }
+        hideElement('barcodeLoading');
+        showElement('barcodeData');
+        showToast('Network error. Please try again.', 'error');
+        container.innerHTML = `
+            <div class="error-message">
+                <i class="fas fa-exclamation-triangle"></i>
+                <p>Network error. Please check your connection and try again.</p>
+            </div>
+        `;
+        return;
+    }
+    
+    if (response.status === 202 && data.status === 'queued') {
+        if (!cached) showQueuedScan(barcode);
+        return;
+    }
+    
+    hideElement('barcodeLoading');
+    showElement('barcodeData');
+    
+    if (data.error) {
+        if (cached) return;
+        showToast('Error: ' + data.error, 'error');
+        container.innerHTML = `
+            <div class="error-message">
+                <i class="fas fa-exclamation-triangle"></i>
+                <p>Failed to analyze barcode. Please try again.</p>
+            </div>
+        `;
+        return;
+    }
+    
+    if (response.headers.get('X-FoodGuard-Cache') !== 'offline') {
+        ScanCache.put(barcode, data).catch(error => console.warn('Could not cache result:', error));
+    }
+    if (!cached || ScanCache.revisionOf(data) !== cached.revision) {
+        showToast('Barcode analyzed successfully!', 'success');
+        displayBarcodeResults(data, barcode);
+    }
+}
+
+function showQueuedScan(barcode) {
+    const container = document.getElementById('barcodeData');
+    hideElement('barcodeLoading');
+    showElement('barcodeData');
+    container.dataset.pendingBarcode = ScanCache.normalizeBarcode(barcode);
+    container.innerHTML = `
+        <div class="info-note">
+            <p><i class="fas fa-wifi"></i>You are offline. Barcode ${barcode} was saved and will be analyzed when you are back online.</p>
+        </div>
+    `;
+    showToast('Offline: scan queued', 'success');
+}
+
+// Display barcode results
+function displayBarcodeResults(data, detectedBarcode = null, containerId = 'barcodeData') {
+    const resultContainer = document.getElementById(containerId);
+    const barcode = detectedBarcode || document.getElementById('barcodeInput').value;
+    
+    console.log('Barcode Analysis Data:', data);
+    
+    if (data.analysis && data.analysis.status === 'success') {
+        const analysis = data.analysis;
+        const productInfo = analysis.product_info;
+        const healthAnalysis = analysis.health_analysis;
+        const adulterationAnalysis = analysis.adulteration_analysis;
+        const riskAssessment = analysis.risk_assessment;
+        
+        resultContainer.innerHTML = `
+            <div class="analysis-container">
+                <div class="analysis-header">
+                    <i class="fas fa-barcode"></i>
+                    <h4>Comprehensive Product Analysis</h4>
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-tag"></i> Product Information</h5>
+                    <div class="info-grid">
+                        <div class="info-item">
+                            <strong>Product Name:</strong> ${productInfo.product_name || 'Not available'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Brand:</strong> ${productInfo.brands || 'Not specified'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Category:</strong> ${productInfo.categories || 'Not specified'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Quantity:</strong> ${productInfo.quantity || 'Not specified'}
+                        </div>
+                        <div class="info-item full-width">
+                            <strong>Ingredients:</strong> ${productInfo.ingredients_text || 'Not available'}
+                        </div>
+                    </div>
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-heart"></i> Health Analysis</h5>
+                    <div class="info-grid">
+                        <div class="info-item">
+                            <strong>Nutri-Score:</strong> 
+                            <span class="nutriscore-badge ${getNutriScoreClass(healthAnalysis.nutriscore)}">${healthAnalysis.nutriscore || 'Not available'}</span>
+                        </div>
+                        <div class="info-item">
+                            <strong>NOVA Group:</strong> ${healthAnalysis.nova_group || 'Not available'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Health Score:</strong> ${healthAnalysis.overall_score || 0}/10
+                        </div>
+                        <div class="info-item">
+                            <strong>Additives Count:</strong> ${healthAnalysis.additives_count || 0}
+                        </div>
+                    </div>
+                    
+                    ${healthAnalysis.health_benefits && healthAnalysis.health_benefits.length > 0 ? `
+                        <div class="benefits-section">
+                            <strong>Health Benefits:</strong>
+                            <ul>
+                                ${healthAnalysis.health_benefits.map(benefit => `<li>${benefit}</li>`).join('')}
+                            </ul>
+                        </div>
+                    ` : ''}
+                    
+                    ${healthAnalysis.health_issues && healthAnalysis.health_issues.length > 0 ? `
+                        <div class="issues-section">
+                            <strong>Health Concerns:</strong>
+                            <ul>
+                                ${healthAnalysis.health_issues.map(issue => `<li>${issue}</li>`).join('')}
+                            </ul>
+                        </div>
+                    ` : ''}
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-exclamation-triangle"></i> Adulteration Analysis</h5>
+                    <div class="info-grid">
+                        <div class="info-item">
+                            <strong>Risk Level:</strong>
+                            <span class="risk-badge ${getRiskClass(adulterationAnalysis.risk_level)}">${adulterationAnalysis.risk_level}</span>
+                        </div>
+                        <div class="info-item">
+                            <strong>Additives Count:</strong> ${adulterationAnalysis.additives_count || 0}
+                        </div>
+                        <div class="info-item">
+                            <strong>Suspicious Ingredients:</strong> ${adulterationAnalysis.suspicious_ingredients || 0}
+                        </div>
+                        <div class="info-item">
+                            <strong>Packaging Concerns:</strong> ${adulterationAnalysis.packaging_concerns || 0}
+                        </div>
+                    </div>
+                    
+                    ${adulterationAnalysis.risks && adulterationAnalysis.risks.length > 0 ? `
+                        <div class="risks-section">
+                            <strong>Identified Risks:</strong>
+                            <ul>
+                                ${adulterationAnalysis.risks.map(risk => `<li>${risk}</li>`).join('')}
+                            </ul>
+                        </div>
+                    ` : ''}
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-chart-line"></i> Risk Assessment</h5>
+                    <div class="risk-assessment">
+                        <div class="risk-level">
+                            <strong>Overall Risk:</strong>
+                            <span class="risk-badge ${getRiskClass(riskAssessment.overall_risk)}">${riskAssessment.overall_risk}</span>
+                            <span class="confidence-score">
+                                <strong>Confidence:</strong> ${riskAssessment.confidence_score}/10
+                            </span>
+                        </div>
+                        <div class="recommendations">
+                            <strong>Consumption Recommendation:</strong>
+                            <p>${riskAssessment.consumption_recommendation}</p>
+                        </div>
+                    </div>
+                </div>
+                
+                ${analysis.recommendations && analysis.recommendations.length > 0 ? `
+                    <div class="analysis-section">
+                        <h5><i class="fas fa-lightbulb"></i> Recommendations</h5>
+                        <div class="recommendations-list">
+                            <ul>
+                                ${analysis.recommendations.map(rec => `<li>${rec}</li>`).join('')}
+                            </ul>
+                        </div>
+                    </div>
+                ` : ''}
+                
+                ${analysis.home_tests && analysis.home_tests.length > 0 ? `
+                    <div class="analysis-section">
+                        <h5><i class="fas fa-home"></i> Home Tests</h5>
+                        <div class="home-tests">
+                            ${analysis.home_tests.map(test => `
+                                <div class="test-card">
+                                    <h6><i class="fas fa-flask"></i> ${test.test_name}</h6>
+                                    <div class="test-details">
+                                        <div class="test-materials">
+                                            <strong>Materials Needed:</strong>
+                                            <ul>
+                                                ${test.materials_needed.map(material => `<li>${material}</li>`).join('')}
+                                            </ul>
+                                        </div>
+                                        <div class="test-procedure">
+                                            <strong>Procedure:</strong>
+                                            <p>${test.procedure}</p>
+                                        </div>
+                                        <div class="test-results">
+                                            <div class="expected-result">
+                                                <strong>Expected Result:</strong>
+                                                <p>${test.expected_result}</p>
+                                            </div>
+                                            <div class="adulteration-indicator">
+                                                <strong>Adulteration Indicator:</strong>
+                                                <p>${test.adulteration_indicator}</p>
+                                            </div>
+                                        </div>
+                                        <div class="safety-notes">
+                                            <strong><i class="fas fa-shield-alt"></i> Safety Notes:</strong>
+                                            <p>${test.safety_notes}</p>
+                                        </div>
+                                        ${test.accuracy_level ? `
+                                            <div class="accuracy-level">
+                                                <strong><i class="fas fa-chart-line"></i> Accuracy Level:</strong>
+                                                <span class="accuracy-badge ${getAccuracyClass(test.accuracy_level)}">${test.accuracy_level}</span>
+                                            </div>
+                                        ` : ''}
+                                    </div>
+                                </div>
+                            `).join('')}
+                        </div>
+                    </div>
+                ` : ''}
+                
+                <div class="action-buttons">
+                    <button class="btn btn-primary" onclick="scanAnotherBarcode()">
+                        <i class="fas fa-plus"></i>
+                        Scan Another
+                    </button>
+                </div>
+            </div>
+        `;
+    } else if (data.analysis && data.analysis.status === 'not_found') {
+        resultContainer.innerHTML = `
+            <div class="error-message">
+                <i class="fas fa-exclamation-triangle"></i>
+                <h4>Product Not Found</h4>
+                <p><strong>Barcode:</strong> ${barcode}</p>
+                <p>This product was not found in the OpenFoodFacts database.</p>
+                <div class="info-note">
+                    <i class="fas fa-info-circle"></i>
+                    <p>Try scanning the barcode again or enter it manually. Some newer products may not be in the database yet.</p>
+                </div>
+                <div class="action-buttons">
+                    <button class="btn btn-primary" onclick="scanAnotherBarcode()">
+                        <i class="fas fa-redo"></i>
+                        Try Again
+                    </button>
+                </div>
+            </div>
+        `;
+    } else {
+        resultContainer.innerHTML = `
+            <div class="error-message">
+                <i class="fas fa-exclamation-triangle"></i>
+                <h4>Analysis Failed</h4>
+                <p><strong>Barcode:</strong> ${barcode}</p>
+                <p>Unable to analyze the product. Please try again.</p>
+                <div class="action-buttons">
+                    <button class="btn btn-primary" onclick="scanAnotherBarcode()">
+                        <i class="fas fa-redo"></i>
+                        Try Again
+                    </button>
+                </div>
+            </div>
+        `;
+    }
+}
+
+function getNutriScoreClass(nutriscore) {
+    switch(nutriscore?.toUpperCase()) {
+        case 'A': return 'nutriscore-a';
+        case 'B': return 'nutriscore-b';
+        case 'C': return 'nutriscore-c';
+        case 'D': return 'nutriscore-d';
+        case 'E': return 'nutriscore-e';
+        default: return 'nutriscore-unknown';
+    }
+}
+
+function getRiskClass(riskLevel) {
+    switch(riskLevel?.toLowerCase()) {
+        case 'low': return 'risk-low';
+        case 'medium': return 'risk-medium';
+        case 'high': return 'risk-high';
+        default: return 'risk-unknown';
+    }
+}
+
+function getAccuracyClass(accuracyLevel) {
+    switch(accuracyLevel?.toLowerCase()) {
+        case 'high': return 'accuracy-high';
+        case 'medium': return 'accuracy-medium';
+        case 'low': return 'accuracy-low';
+        default: return 'accuracy-unknown';
+    }
+}
+
+function scanAnotherBarcode() {
+    // Reset the form
+    document.getElementById('barcodeInput').value = '';
+    hideElement('barcodeResult');
+    
+    // Switch to manual tab for easy re-entry
+    switchTab('manual');
+    document.getElementById('barcodeInput').focus();
+}
@@ -0,0 +1,965 @@
+// Image upload and analysis for FoodGuard (loaded on demand by main.js)
+//
+// Requires the barcode bundle, whose result view shows products found by
+// a barcode in the photo.
+
+// Client-side compression and resumable upload settings (see frontend/views.py)
+const uploadConfig = JSON.parse(document.getElementById('uploadConfig')?.textContent || '{}');
+const UPLOAD_MAX_SIDE = uploadConfig.maxSide || 1600;
+const UPLOAD_JPEG_QUALITY = uploadConfig.quality || 0.85;
+const UPLOAD_MAX_RETRIES = 5;
+let imageWorker = null;
+let imageWorkerRequests = 0;
+let imageUploadReady = false;
+
+// Image Upload Setup (run each time the modal opens; listeners are added once)
+function setupImageUpload() {
+    if (imageUploadReady) {
+        return;
+    }
+    imageUploadReady = true;
+    
+    const uploadArea = document.getElementById('uploadArea');
+    const imageInput = document.getElementById('imageInput');
+    
+    // Click to upload
+    uploadArea.addEventListener('click', () => {
+        imageInput.click();
+    });
+    
+    // File input change
+    imageInput.addEventListener('change', handleImageSelect);
+    
+    // Drag and drop
+    uploadArea.addEventListener('dragover', (e) => {
+        e.preventDefault();
+        uploadArea.style.borderColor = '#667eea';
+        uploadArea.style.backgroundColor = '#edf2f7';
+    });
+    
+    uploadArea.addEventListener('dragleave', (e) => {
+        e.preventDefault();
+        uploadArea.style.borderColor = '#cbd5e0';
+        uploadArea.style.backgroundColor = '#f7fafc';
+    });
+    
+    uploadArea.addEventListener('drop', (e) => {
+        e.preventDefault();
+        uploadArea.style.borderColor = '#cbd5e0';
+        uploadArea.style.backgroundColor = '#f7fafc';
+        
+        const files = e.dataTransfer.files;
+        if (files.length > 0) {
+            handleImageFile(files[0]);
+        }
+    });
+}
+
+// Handle image selection
+function handleImageSelect(e) {
+    const file = e.target.files[0];
+    if (file) {
+        handleImageFile(file);
+    }
+}
+
+// Handle image file
+function handleImageFile(file) {
+    if (!file.type.startsWith('image/')) {
+        showToast('Please select a valid image file', 'error');
+        return;
+    }
+    
+    if (file.size > 10 * 1024 * 1024) { // 10MB limit
+        showToast('Image size should be less than 10MB', 'error');
+        return;
+    }
+    
+    currentImageFile = file;
+    
+    // Show preview
+    const reader = new FileReader();
+    reader.onload = function(e) {
+        document.getElementById('previewImage').src = e.target.result;
+        showElement('imagePreview');
+    };
+    reader.readAsDataURL(file);
+}
+
+// Image compression worker (OffscreenCanvas), created on first use
+function getImageWorker() {
+    if (!imageWorker && window.Worker && 'OffscreenCanvas' in window && uploadConfig.workerUrl) {
+        imageWorker = new Worker(uploadConfig.workerUrl);
+    }
+    return imageWorker;
+}
+
+function compressInWorker(file) {
+    const worker = getImageWorker();
+    if (!worker) {
+        return Promise.reject(new Error('OffscreenCanvas workers are not supported'));
+    }
+    
+    const id = ++imageWorkerRequests;
+    return new Promise((resolve, reject) => {
+        const cleanup = () => {
+            worker.removeEventListener('message', onMessage);
+            worker.removeEventListener('error', onError);
+        };
+        const onMessage = (event) => {
+            if (event.data.id !== id) return;
+            cleanup();
+            event.data.error ? reject(new Error(event.data.error)) : resolve(event.data.blob);
+        };
+        const onError = (event) => {
+            cleanup();
+            imageWorker = null;
+            reject(new Error(event.message || 'Image worker failed'));
+        };
+        worker.addEventListener('message', onMessage);
+        worker.addEventListener('error', onError);
+        worker.postMessage({ id, file, maxSide: UPLOAD_MAX_SIDE, quality: UPLOAD_JPEG_QUALITY });
+    });
+}
+
+// Same resize on a regular canvas, for browsers without OffscreenCanvas
+async function compressOnMainThread(file) {
+    const url = URL.createObjectURL(file);
+    try {
+        const img = new Image();
+        img.src = url;
+        await img.decode();
+        
+        const scale = Math.min(1, UPLOAD_MAX_SIDE / Math.max(img.naturalWidth, img.naturalHeight));
+        const canvas = document.createElement('canvas');
+        canvas.width = Math.round(img.naturalWidth * scale);
+        canvas.height = Math.round(img.naturalHeight * scale);
+        canvas.getContext('2d').drawImage(img, 0, 0, canvas.width, canvas.height);
+        
+        return await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', UPLOAD_JPEG_QUALITY));
+    } finally {
+        URL.revokeObjectURL(url);
+    }
+}
+
+// Downscale and re-encode a photo to the server's working size before upload
+async function compressImage(file) {
+    try {
+        let blob;
+        try {
+            blob = await compressInWorker(file);
+        } catch (workerError) {
+            console.warn('Worker compression unavailable, using main thread:', workerError.message);
+            blob = await compressOnMainThread(file);
+        }
+        
+        // Small images can come out larger after re-encoding
+        if (blob && blob.size < file.size) {
+            const name = file.name.replace(/\.[^.]+$/, '') + '.jpg';
+            return new File([blob], name, { type: 'image/jpeg' });
+        }
+    } catch (error) {
+        // The server downscales anyway; uploading the original still works
+        console.warn('Image compression failed, uploading the original:', error);
+    }
+    return file;
+}
+
+function sendUploadChunk(uploadId, chunk, offset, onProgress) {
+    // XHR rather than fetch: only XHR reports upload progress
+    return new Promise((resolve, reject) => {
+        const xhr = new XMLHttpRequest();
+        xhr.open('PATCH', `/api/v1/uploads/${uploadId}/`);
+        xhr.setRequestHeader('Content-Type', 'application/offset+octet-stream');
+        xhr.setRequestHeader('Upload-Offset', String(offset));
+        xhr.setRequestHeader('X-CSRFToken', getCSRFToken());
+        xhr.responseType = 'json';
+        xhr.timeout = 30000;
+        xhr.upload.onprogress = (e) => {
+            if (e.lengthComputable) onProgress(e.loaded);
+        };
+        xhr.onload = () => resolve({ status: xhr.status, data: xhr.response || {} });
+        xhr.onerror = () => reject(new Error('Network error while uploading'));
+        xhr.ontimeout = () => reject(new Error('Upload timed out'));
+        xhr.send(chunk);
+    });
+}
+
+function uploadSessionLost(message) {
+    const error = new Error(message || 'Upload not found or expired');
+    error.uploadSessionLost = true;
+    return error;
+}
+
+// Ask the server how much of an interrupted upload it already has
+async function fetchUploadOffset(uploadId, knownOffset) {
+    let response;
+    try {
+        response = await fetch(`/api/v1/uploads/${uploadId}/`);
+    } catch (error) {
+        // Still offline; the next chunk answers with 409 if we are wrong
+        return knownOffset;
+    }
+    if (response.status === 404) {
+        throw uploadSessionLost();
+    }
+    if (!response.ok) {
+        return knownOffset;
+    }
+    return (await response.json()).offset;
+}
+
+// Upload a file in chunks, resuming from the server's offset after a drop
+async function uploadImageResumable(file, onProgress) {
+    const start = await fetch('/api/v1/uploads/', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCSRFToken()
+        },
+        body: JSON.stringify({ size: file.size, filename: file.name, content_type: file.type })
+    });
+    const session = await start.json().catch(() => ({}));
+    if (start.status === 404 || !session.upload_id) {
+        throw uploadSessionLost(session.error || `Could not start upload (status ${start.status})`);
+    }
+    
+    const uploadId = session.upload_id;
+    const chunkSize = session.chunk_size;
+    let offset = 0;
+    let failures = 0;
+    
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + chunkSize);
+        const chunkOffset = offset;
+        let response = null;
+        try {
+            response = await sendUploadChunk(uploadId, chunk, chunkOffset, loaded => {
+                onProgress((chunkOffset + loaded) / file.size);
+            });
+        } catch (error) {
+            console.warn(`Chunk at ${chunkOffset} failed:`, error.message);
+        }
+        
+        // 409 means the server has a different offset than we thought
+        // (a "failed" chunk actually arrived); continue from its offset
+        if (response && (response.status === 200 || response.status === 409)) {
+            offset = response.data.offset;
+            if (response.status === 200) failures = 0;
+            onProgress(offset / file.size);
+            continue;
+        }
+        if (response && response.status === 404) {
+            throw uploadSessionLost(response.data.error);
+        }
+        if (response && response.status < 500) {
+            throw new Error(response.data.error || `Upload failed (status ${response.status})`);
+        }
+        
+        failures += 1;
+        if (failures > UPLOAD_MAX_RETRIES) {
+            throw new Error('Upload interrupted. Please check your connection and try again.');
+        }
+        setImageLoadingText(`Connection lost, retrying upload (${failures}/${UPLOAD_MAX_RETRIES})...`);
+        await new Promise(resolve => setTimeout(resolve, Math.min(1000 * 2 ** (failures - 1), 8000)));
+        offset = await fetchUploadOffset(uploadId, offset);
+        setImageLoadingText('Uploading image...');
+    }
+    return uploadId;
+}
+
+function setImageLoadingText(text) {
+    document.getElementById('imageLoadingText').textContent = text;
+}
+
+function updateUploadProgress(fraction) {
+    const progress = document.getElementById('imageUploadProgress');
+    progress.value = Math.round(Math.min(1, fraction) * 100);
+}
+
+// Analyze Image
+async function analyzeImage() {
+    if (!currentImageFile) {
+        showToast('Please select an image first', 'error');
+        return;
+    }
+    
+    showElement('imageResult');
+    showElement('imageLoading');
+    hideElement('imageData');
+    
+    setImageLoadingText('Compressing image...');
+    const file = await compressImage(currentImageFile);
+    
+    const formData = new FormData();
+    setImageLoadingText('Uploading image...');
+    updateUploadProgress(0);
+    showElement('imageUploadProgress');
+    try {
+        const uploadId = await uploadImageResumable(file, updateUploadProgress);
+        formData.append('upload_id', uploadId);
+    } catch (error) {
+        if (!error.uploadSessionLost) {
+            hideElement('imageUploadProgress');
+            showImageRequestError(error);
+            return;
+        }
+        // e.g. the chunks reached an instance that did not start the upload;
+        // send the whole (compressed) file in one request instead
+        console.warn('Resumable upload unavailable, sending the file directly:', error.message);
+        formData.append('image', file);
+    }
+    hideElement('imageUploadProgress');
+    setImageLoadingText('Analyzing image...');
+    
+    fetch('/api/v1/image/', {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCSRFToken()
+        },
+        body: formData
+    })
+    .then(async response => {
+        console.log('Response status:', response.status);
+        console.log('Response headers:', response.headers);
+
+        let data;
+        try {
+            data = await response.json();
+        } catch (e) {
+            data = { error: `Non-JSON response (status ${response.status})` };
+        }
+
+        if (!response.ok) {
+            // Surface server error details instead of throwing a generic network error
+            hideElement('imageLoading');
+            showElement('imageData');
+            showToast(`Error: ${data.error || 'Image analysis failed'}`, 'error');
+            displayImageResults(data);
+            // Add scroll indicator after a short delay
+            setTimeout(() => { addScrollIndicator(); }, 500);
+            return; // Stop normal success flow
+        }
+
+        return data;
+    })
+    .then(data => {
+        console.log('API Response received:', data);
+        hideElement('imageLoading');
+        showElement('imageData');
+        
+        if (data.error) {
+            showToast('Error: ' + data.error, 'error');
+            console.error('API Error:', data.error);
+        } else {
+            showToast('Image analyzed successfully!', 'success');
+        }
+        
+        // Always display results, even if there's an error
+        displayImageResults(data);
+        
+        // Add scroll indicator after a short delay
+        setTimeout(() => {
+            addScrollIndicator();
+        }, 500);
+    })
+    .catch(error => {
+        showImageRequestError(error);
+    });
+}
+
+function showImageRequestError(error) {
+    hideElement('imageLoading');
+    showElement('imageData');
+    console.error('Fetch Error:', error);
+    showToast(`Network error: ${error.message}`, 'error');
+    
+    // Display error information
+    document.getElementById('imageData').innerHTML = `
+        <div class="analysis-container">
+            <div class="analysis-header">
+                <i class="fas fa-exclamation-triangle"></i>
+                <h4>Request Error</h4>
+            </div>
+            
+            <div class="analysis-section">
+                <h5><i class="fas fa-wifi"></i> Connection Error</h5>
+                <div class="error-details">
+                    <p><strong>Error:</strong> ${error.message}</p>
+                    <p><strong>Details:</strong> Unable to connect to the analysis server. Please check your internet connection and try again.</p>
+                </div>
+            </div>
+            
+            <div class="analysis-section">
+                <h5><i class="fas fa-home"></i> Manual Inspection</h5>
+                <div class="home-tests">
+                    <div class="test-card">
+                        <h6><i class="fas fa-eye"></i> Visual Inspection</h6>
+                        <div class="test-details">
+                            <div class="test-materials">
+                                <strong>Materials Needed:</strong>
+                                <ul>
+                                    <li>Good lighting</li>
+                                    <li>Magnifying glass (optional)</li>
+                                </ul>
+                            </div>
+                            <div class="test-procedure">
+                                <strong>Procedure:</strong>
+                                <p>Examine the food product carefully for unusual colors, textures, or foreign particles.</p>
+                            </div>
+                            <div class="safety-notes">
+                                <strong><i class="fas fa-shield-alt"></i> Safety Notes:</strong>
+                                <p>When in doubt, do not consume the product.</p>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+            
+            <div class="action-buttons">
+                <button class="btn btn-primary" onclick="analyzeAnotherImage()">
+                    <i class="fas fa-redo"></i>
+                    Try Again
+                </button>
+            </div>
+        </div>
+    `;
+}
+
+// Simple extraction helpers to structure plain-text AI output
+function extractRiskLevel(text) {
+    const match = text.match(/\b(risk\s*level|overall\s*risk)\s*[:\-]?\s*(low|medium|high)\b/i);
+    return match ? match[2].charAt(0).toUpperCase() + match[2].slice(1).toLowerCase() : null;
+}
+
+function extractBullets(text) {
+    const lines = text.split(/\n+/);
+    const bullets = [];
+    lines.forEach(line => {
+        const trimmed = line.trim();
+        if (/^([\-•\*]|\d+\.)\s+/.test(trimmed)) {
+            bullets.push(trimmed.replace(/^([\-•\*]|\d+\.)\s+/, ''));
+        }
+    });
+    return bullets;
+}
+
+function extractRecommendations(text) {
+    const sentences = text.split(/(?<=[.!?])\s+/);
+    return sentences.filter(s => /(recommend|should|avoid|consider|suggest)/i.test(s));
+}
+
+function extractHomeTests(text) {
+    const sentences = text.split(/(?<=[.!?])\s+/);
+    return sentences.filter(s => /(home\s*test|perform|procedure|mix|drop|add|observe)/i.test(s));
+}
+
+function extractIndicators(text) {
+    const sentences = text.split(/(?<=[.!?])\s+/);
+    return sentences.filter(s => /(color|texture|smell|odor|packaging|sediment|foam|contaminant|impurity)/i.test(s));
+}
+
+// Render helper for plain-text AI analysis into structured sections
+function parseAiAnalysis(text) {
+    const raw = (text || '').trim();
+    const lines = raw.split(/\n+/).map(l => l.trim()).filter(Boolean);
+
+    const sectionTitles = [
+        'summary', 'key findings', 'findings', 'indicators', 'adulteration indicators',
+        'recommendations', 'home tests', 'tests', 'risk', 'risk level', 'overall risk'
+    ];
+
+    const sections = {
+        summary: [],
+        keyPoints: [],
+        indicators: [],
+        recommendations: [],
+        homeTests: [],
+        riskLevel: null
+    };
+
+    let current = 'summary';
+    const isHeading = (s) => sectionTitles.some(t => new RegExp(`^${t}[:\-]?$`, 'i').test(s));
+    const bulletRegex = /^([\-•\*]|\d+\.)\s+/;
+
+    for (const line of lines) {
+        if (isHeading(line.replace(/\s+/g, ' ').toLowerCase())) {
+            const key = line.toLowerCase().replace(/[:\-]\s*$/, '');
+            if (/risk/.test(key)) current = 'risk';
+            else if (/home\s*tests|tests/.test(key)) current = 'homeTests';
+            else if (/recommend/.test(key)) current = 'recommendations';
+            else if (/indicator|adulteration/.test(key)) current = 'indicators';
+            else if (/finding/.test(key)) current = 'keyPoints';
+            else current = 'summary';
+            continue;
+        }
+
+        if (current === 'risk') {
+            const m = line.match(/\b(low|medium|high)\b/i);
+            if (m && !sections.riskLevel) sections.riskLevel = m[1][0].toUpperCase() + m[1].slice(1).toLowerCase();
+            continue;
+        }
+
+        if (bulletRegex.test(line)) {
+            const item = line.replace(bulletRegex, '').trim();
+            if (current === 'homeTests') sections.homeTests.push(item);
+            else if (current === 'recommendations') sections.recommendations.push(item);
+            else if (current === 'indicators') sections.indicators.push(item);
+            else if (current === 'keyPoints') sections.keyPoints.push(item);
+            else sections.keyPoints.push(item);
+        } else {
+            // Non-bullet sentence; classify heuristically
+            if (/test|procedure|mix|drop|observe/i.test(line)) sections.homeTests.push(line);
+            else if (/recommend|should|avoid|consider|suggest/i.test(line)) sections.recommendations.push(line);
+            else if (/color|texture|odor|smell|packaging|sediment|foam|contaminant|impurity/i.test(line)) sections.indicators.push(line);
+            else sections.summary.push(line);
+        }
+    }
+
+    // Collapse summary paragraphs
+    const summaryText = sections.summary.join(' ');
+    return {
+        summary: summaryText,
+        keyPoints: sections.keyPoints,
+        indicators: sections.indicators,
+        recommendations: sections.recommendations,
+        homeTests: sections.homeTests,
+        riskLevel: sections.riskLevel
+    };
+}
+
+function renderTextAnalysisSections(summaryText, meta = {}) {
+    const resultContainer = document.getElementById('imageData');
+    const parsed = parseAiAnalysis(summaryText);
+    const summary = parsed.summary || '';
+    const bullets = parsed.keyPoints || [];
+    const indicators = parsed.indicators || [];
+    const riskLevel = parsed.riskLevel || null;
+    const recommendations = parsed.recommendations || [];
+    const homeTests = parsed.homeTests || [];
+ 
+    resultContainer.innerHTML = `
+        <div class="analysis-container">
+            <div class="analysis-header">
+                <i class="fas fa-microscope"></i>
+                <h4>AI-Powered Food Analysis</h4>
+            </div>
+ 
+            ${summary ? `
+            <div class="analysis-section">
+                <h5><i class="fas fa-quote-left"></i> Summary</h5>
+                <div class="success-message" style="background:#f0f5ff;color:#1a237e;border-left:4px solid #3b82f6">
+                    <p>${summary.replace(/\n{2,}/g, '<br><br>').replace(/\n/g, '<br>')}</p>
+                </div>
+            </div>` : ''}
+ 
+            ${riskLevel ? `
+            <div class="analysis-section">
+                <h5><i class="fas fa-chart-line"></i> Risk Assessment</h5>
+                <div class="risk-assessment">
+                    <div class="risk-level">
+                        <strong>Risk Level:</strong>
+                        <span class="risk-badge ${getRiskClass ? getRiskClass(riskLevel) : ''}">${riskLevel}</span>
+                    </div>
+                </div>
+            </div>` : ''}
+ 
+            ${indicators.length ? `
+            <div class="analysis-section">
+                <h5><i class="fas fa-exclamation-triangle"></i> Adulteration Indicators</h5>
+                <ul style="margin-left:1.25rem;line-height:1.6">
+                    ${indicators.map(i => `<li>${i}</li>`).join('')}
+                </ul>
+            </div>` : ''}
+ 
+            ${bullets.length ? `
+            <div class="analysis-section">
+                <h5><i class="fas fa-list-ul"></i> Key Findings</h5>
+                <ul style="margin-left:1.25rem;line-height:1.6">
+                    ${bullets.map(point => `<li>${point}</li>`).join('')}
+                </ul>
+            </div>` : ''}
+ 
+            ${recommendations.length ? `
+            <div class="analysis-section">
+                <h5><i class="fas fa-lightbulb"></i> Recommendations</h5>
+                <ul style="margin-left:1.25rem;line-height:1.6">
+                    ${recommendations.map(r => `<li>${r}</li>`).join('')}
+                </ul>
+            </div>` : ''}
+ 
+            ${homeTests.length ? `
+            <div class="analysis-section">
+                <h5><i class="fas fa-home"></i> Home Tests</h5>
+                <ul style="margin-left:1.25rem;line-height:1.6">
+                    ${homeTests.map(t => `<li>${t}</li>`).join('')}
+                </ul>
+            </div>` : ''}
+ 
+            <div class="analysis-section">
+                <h5><i class="fas fa-file-alt"></i> Image Details</h5>
+                <div class="info-grid">
+                    <div class="info-item"><strong>Filename:</strong> ${meta.filename || '—'}</div>
+                    <div class="info-item"><strong>Size:</strong> ${meta.file_size ? (Math.round(meta.file_size/1024)) + ' KB' : '—'}</div>
+                    <div class="info-item"><strong>Type:</strong> ${meta.content_type || '—'}</div>
+                </div>
+            </div>
+ 
+            <div class="action-buttons">
+                <button class="btn btn-primary" onclick="analyzeAnotherImage()">
+                    <i class="fas fa-plus"></i>
+                    Analyze Another Image
+                </button>
+            </div>
+        </div>
+    `;
+}
+
+function displayImageResults(data) {
+    const resultContainer = document.getElementById('imageData');
+    
+    // Debug: Log the data structure
+    console.log('Full API Response:', data);
+    
+    // A barcode was read from the photo: show the product analysis instead
+    if (data.source === 'barcode' && data.barcode_analysis) {
+        displayBarcodeResults({ status: 'success', analysis: data.barcode_analysis }, data.barcode, 'imageData');
+        return;
+    }
+    
+    // Handle different response structures
+    let analysis = null;
+    let status = 'error';
+    
+    if (data.analysis) {
+        // If analysis exists, use it
+        if (data.analysis.status === 'success' && data.analysis.analysis) {
+            analysis = data.analysis.analysis;
+            status = 'success';
+        } else if (data.analysis.status === 'success') {
+            // Sometimes the analysis is directly in data.analysis
+            analysis = data.analysis;
+            status = 'success';
+        }
+    } else if (data.status === 'success') {
+        // Direct structure
+        analysis = data;
+        status = 'success';
+    }
+    
+    console.log('Processed Analysis:', analysis);
+    console.log('Status:', status);
+    
+    // If computed analysis is a plain string, render structured sections
+    if (typeof analysis === 'string') {
+        renderTextAnalysisSections(analysis, data);
+        return;
+    }
+
+    // If analysis is plain text, render a structured, professional layout
+    if (typeof data.analysis === 'string') {
+        const summary = data.analysis.trim();
+        const bullets = extractBullets(summary);
+        const indicators = extractIndicators(summary);
+        const riskLevel = extractRiskLevel(summary);
+        const recommendations = extractRecommendations(summary);
+        const homeTests = extractHomeTests(summary);
+
+        resultContainer.innerHTML = `
+            <div class="analysis-container">
+                <div class="analysis-header">
+                    <i class="fas fa-microscope"></i>
+                    <h4>AI-Powered Food Analysis</h4>
+                </div>
+
+                <div class="analysis-section">
+                    <h5><i class="fas fa-quote-left"></i> Summary</h5>
+                    <div class="success-message" style="background:#f0f5ff;color:#1a237e;border-left:4px solid #3b82f6">
+                        <p>${summary.replace(/\n{2,}/g, '<br><br>').replace(/\n/g, '<br>')}</p>
+                    </div>
+                </div>
+
+                ${riskLevel ? `
+                <div class="analysis-section">
+                    <h5><i class="fas fa-chart-line"></i> Risk Assessment</h5>
+                    <div class="risk-assessment">
+                        <div class="risk-level">
+                            <strong>Risk Level:</strong>
+                            <span class="risk-badge ${getRiskClass(riskLevel)}">${riskLevel}</span>
+                        </div>
+                    </div>
+                </div>` : ''}
+
+                ${indicators.length ? `
+                <div class="analysis-section">
+                    <h5><i class="fas fa-exclamation-triangle"></i> Adulteration Indicators</h5>
+                    <ul style="margin-left:1.25rem;line-height:1.6">
+                        ${indicators.map(i => `<li>${i}</li>`).join('')}
+                    </ul>
+                </div>` : ''}
+
+                ${bullets.length ? `
+                <div class="analysis-section">
+                    <h5><i class="fas fa-list-ul"></i> Key Points</h5>
+                    <ul style="margin-left:1.25rem;line-height:1.6">
+                        ${bullets.map(point => `<li>${point}</li>`).join('')}
+                    </ul>
+                </div>` : ''}
+
+                ${recommendations.length ? `
+                <div class="analysis-section">
+                    <h5><i class="fas fa-lightbulb"></i> Recommendations</h5>
+                    <ul style="margin-left:1.25rem;line-height:1.6">
+                        ${recommendations.map(r => `<li>${r}</li>`).join('')}
+                    </ul>
+                </div>` : ''}
+
+                ${homeTests.length ? `
+                <div class="analysis-section">
+                    <h5><i class="fas fa-home"></i> Home Tests</h5>
+                    <ul style="margin-left:1.25rem;line-height:1.6">
+                        ${homeTests.map(t => `<li>${t}</li>`).join('')}
+                    </ul>
+                </div>` : ''}
+
+                <div class="analysis-section">
+                    <h5><i class="fas fa-file-alt"></i> Image Details</h5>
+                    <div class="info-grid">
+                        <div class="info-item"><strong>Filename:</strong> ${data.filename || '—'}</div>
+                        <div class="info-item"><strong>Size:</strong> ${data.file_size ? (Math.round(data.file_size/1024)) + ' KB' : '—'}</div>
+                        <div class="info-item"><strong>Type:</strong> ${data.content_type || '—'}</div>
+                    </div>
+                </div>
+
+                <div class="action-buttons">
+                    <button class="btn btn-primary" onclick="analyzeAnotherImage()">
+                        <i class="fas fa-plus"></i>
+                        Analyze Another Image
+                    </button>
+                </div>
+            </div>
+        `;
+        return;
+    }
+
+    if (status === 'success' && analysis) {
+        
+        resultContainer.innerHTML = `
+            <div class="analysis-container">
+                <div class="analysis-header">
+                    <i class="fas fa-microscope"></i>
+                    <h4>AI-Powered Food Analysis</h4>
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-tag"></i> Product Identification</h5>
+                    <div class="info-grid">
+                        <div class="info-item">
+                            <strong>Food Type:</strong> ${analysis.product_identification?.food_type || 'Not identified'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Brand:</strong> ${analysis.product_identification?.brand_visible || 'Not visible'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Packaging:</strong> ${analysis.product_identification?.packaging_type || 'Not specified'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Expiry Date:</strong> ${analysis.product_identification?.expiry_visible || 'Not visible'}
+                        </div>
+                        <div class="info-item full-width">
+                            <strong>Appearance Assessment:</strong> ${analysis.product_identification?.appearance_assessment || 'Not assessed'}
+                        </div>
+                    </div>
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-exclamation-triangle"></i> Adulteration Indicators</h5>
+                    <div class="info-grid">
+                        <div class="info-item">
+                            <strong>Color Issues:</strong> ${analysis.adulteration_indicators?.color_anomalies || 'None detected'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Texture Issues:</strong> ${analysis.adulteration_indicators?.texture_issues || 'None detected'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Packaging:</strong> ${analysis.adulteration_indicators?.packaging_concerns || 'No concerns'}
+                        </div>
+                        <div class="info-item">
+                            <strong>Authenticity:</strong> ${analysis.adulteration_indicators?.authenticity_signs || 'Not assessed'}
+                        </div>
+                        <div class="info-item full-width">
+                            <strong>Overall Quality:</strong> ${analysis.adulteration_indicators?.overall_quality || 'Not assessed'}
+                        </div>
+                    </div>
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-vial"></i> Potential Adulterants</h5>
+                    <div class="adulterants-list">
+                        ${analysis.potential_adulterants ? 
+                            analysis.potential_adulterants.map(adulterant => 
+                                `<span class="adulterant-tag">${adulterant}</span>`
+                            ).join('') : 
+                            '<span class="no-adulterants">No specific adulterants detected</span>'
+                        }
+                    </div>
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-home"></i> Home Tests You Can Perform</h5>
+                    <div class="home-tests">
+                        ${analysis.home_tests ? 
+                            analysis.home_tests.map(test => `
+                                <div class="test-card">
+                                    <h6><i class="fas fa-flask"></i> ${test.test_name}</h6>
+                                    <div class="test-details">
+                                        <div class="test-materials">
+                                            <strong>Materials Needed:</strong>
+                                            <ul>
+                                                ${test.materials_needed.map(material => `<li>${material}</li>`).join('')}
+                                            </ul>
+                                        </div>
+                                        <div class="test-procedure">
+                                            <strong>Procedure:</strong>
+                                            <p>${test.procedure}</p>
+                                        </div>
+                                        <div class="test-results">
+                                            <div class="expected-result">
+                                                <strong>Expected Result:</strong>
+                                                <p>${test.expected_result}</p>
+                                            </div>
+                                            <div class="adulteration-indicator">
+                                                <strong>Adulteration Indicator:</strong>
+                                                <p>${test.adulteration_indicator}</p>
+                                            </div>
+                                        </div>
+                                        <div class="safety-notes">
+                                            <strong><i class="fas fa-shield-alt"></i> Safety Notes:</strong>
+                                            <p>${test.safety_notes}</p>
+                                        </div>
+                                        ${test.accuracy_level ? `
+                                            <div class="accuracy-level">
+                                                <strong><i class="fas fa-chart-line"></i> Accuracy Level:</strong>
+                                                <span class="accuracy-badge ${getAccuracyClass(test.accuracy_level)}">${test.accuracy_level}</span>
+                                            </div>
+                                        ` : ''}
+                                    </div>
+                                </div>
+                            `).join('') : 
+                            '<p>No specific home tests available for this product.</p>'
+                        }
+                    </div>
+                </div>
+                
+                <div class="analysis-section">
+                    <h5><i class="fas fa-chart-line"></i> Risk Assessment</h5>
+                    <div class="risk-assessment">
+                        <div class="risk-level">
+                            <strong>Risk Level:</strong>
+                            <span class="risk-badge ${getRiskClass(analysis.risk_assessment?.risk_level)}">
+                                ${analysis.risk_assessment?.risk_level || 'Unknown'}
+                            </span>
+                            ${analysis.risk_assessment?.confidence_score ? `
+                                <span class="confidence-score">
+                                    <strong>Confidence:</strong> ${analysis.risk_assessment.confidence_score}/10
+                                </span>
+                            ` : ''}
+                        </div>
+                        <div class="recommendations">
+                            <strong>Recommendations:</strong>
+                            <p>${analysis.risk_assessment?.recommendations || 'No specific recommendations available.'}</p>
+                        </div>
+                        ${analysis.risk_assessment?.immediate_actions ? `
+                            <div class="immediate-actions">
+                                <strong><i class="fas fa-exclamation-circle"></i> Immediate Actions:</strong>
+                                <p>${analysis.risk_assessment.immediate_actions}</p>
+                            </div>
+                        ` : ''}
+                    </div>
+                </div>
+                
+                ${analysis.additional_notes ? `
+                    <div class="analysis-section">
+                        <h5><i class="fas fa-sticky-note"></i> Additional Notes</h5>
+                        <p>${analysis.additional_notes}</p>
+                    </div>
+                ` : ''}
+                
+                ${analysis.ai_analysis_metadata ? `
+                    <div class="analysis-section">
+                        <h5><i class="fas fa-robot"></i> AI Analysis Details</h5>
+                        <div class="info-grid">
+                            <div class="info-item">
+                                <strong>Model Version:</strong> ${analysis.ai_analysis_metadata.model_version || 'Unknown'}
+                            </div>
+                            <div class="info-item">
+                                <strong>Analysis Time:</strong> ${analysis.ai_analysis_metadata.analysis_timestamp || 'Unknown'}
+                            </div>
+                            <div class="info-item">
+                                <strong>Image Quality:</strong> ${analysis.ai_analysis_metadata.image_quality_assessment || 'Not assessed'}
+                            </div>
+                        </div>
+                    </div>
+                ` : ''}
+                
+                <div class="action-buttons">
+                    <button class="btn btn-primary" onclick="analyzeAnotherImage()">
+                        <i class="fas fa-plus"></i>
+                        Analyze Another Image
+                    </button>
+                </div>
+            </div>
+        `;
+    } else {
+        // Graceful fallback: parse any available text into sections, no raw JSON
+        const summaryText = typeof data.analysis === 'string' ? data.analysis : (typeof data.error === 'string' ? data.error : 'Analysis unavailable. Please try again.');
+        renderTextAnalysisSections(summaryText, data);
+    }
+}
+
+function analyzeAnotherImage() {
+    // Reset the form
+    hideElement('imagePreview');
+    hideElement('imageResult');
+    currentImageFile = null;
+    
+    // Reset file input
+    document.getElementById('imageInput').value = '';
+    
+    // Focus on upload area
+    document.getElementById('uploadArea').scrollIntoView({ behavior: 'smooth' });
+}
+
+// Test API Connection
+function testAPI() {
+    showToast('Testing API connection...', 'success');
+    
+    // Test with a simple GET request first
+    fetch('/api/v1/image/', {
+        method: 'GET',
+        headers: {
+            'X-CSRFToken': getCSRFToken()
+        }
+    })
+    .then(response => {
+        console.log('API Test Response Status:', response.status);
+        console.log('API Test Response Headers:', response.headers);
+        
+        if (response.status === 405) {
+            showToast('API endpoint exists (Method Not Allowed is expected for GET)', 'success');
+        } else if (response.ok) {
+            showToast('API connection successful!', 'success');
+        } else {
+            showToast(`API responded with status: ${response.status}`, 'error');
+        }
+        
+        return response.text();
+    })
+    .then(text => {
+        console.log('API Test Response:', text);
+    })
+    .catch(error => {
+        console.error('API Test Error:', error);
+        showToast('API connection failed: ' + error.message, 'error');
+    });
+}
@@ -0,0 +1,192 @@
+// Continuous scanning for FoodGuard (loaded on demand by main.js)
+//
+// Requires the barcode bundle. In continuous mode the camera keeps running
+// after each hit and one WebSocket to /ws/v1/scan/ carries every scan: a
+// barcode goes out as a single small text frame and its result comes back
+// when ready, so lookups overlap instead of queueing behind each other.
+// Results can arrive out of order and are matched by barcode. Where there is
+// no socket (serverless hosting, a dropped connection) scans fall back to
+// the HTTP lookup.
+
+const SCAN_SESSION_PATH = '/ws/v1/scan/';
+const SCAN_SESSION_MAX_RETRY_MS = 30000;
+
+class ScanSession {
+    constructor(onResult) {
+        this.onResult = onResult;
+        this.socket = null;
+        this.active = false;
+        this.retryMs = 1000;
+        this.retryTimer = null;
+    }
+
+    open() {
+        this.active = true;
+        this.connect();
+    }
+
+    connect() {
+        const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${scheme}://${location.host}${SCAN_SESSION_PATH}`);
+        socket.onopen = () => {
+            this.retryMs = 1000;
+        };
+        socket.onmessage = (event) => {
+            let data;
+            try {
+                data = JSON.parse(event.data);
+            } catch (error) {
+                console.warn('Unreadable scan session message:', event.data);
+                return;
+            }
+            this.onResult(data);
+        };
+        socket.onclose = () => {
+            if (this.socket === socket) {
+                this.socket = null;
+            }
+            // Keep trying in the background; scans use HTTP meanwhile
+            if (this.active) {
+                this.retryTimer = setTimeout(() => this.connect(), this.retryMs);
+                this.retryMs = Math.min(this.retryMs * 2, SCAN_SESSION_MAX_RETRY_MS);
+            }
+        };
+        this.socket = socket;
+    }
+
+    // Send a barcode; false when the session is not connected
+    send(barcode) {
+        if (!this.socket || this.socket.readyState !== WebSocket.OPEN) {
+            return false;
+        }
+        this.socket.send(barcode);
+        return true;
+    }
+
+    close() {
+        this.active = false;
+        clearTimeout(this.retryTimer);
+        if (this.socket) {
+            this.socket.close();
+            this.socket = null;
+        }
+    }
+}
+
+let scanSession = null;
+// Scan results by normalized barcode, for the session list
+const sessionResults = new Map();
+
+function isContinuousScan() {
+    return localStorage.getItem('continuousScan') === 'true';
+}
+
+function setContinuousScan(enabled) {
+    localStorage.setItem('continuousScan', enabled ? 'true' : 'false');
+}
+
+function startScanSession() {
+    if (!scanSession) {
+        scanSession = new ScanSession(handleSessionResult);
+    }
+    scanSession.open();
+}
+
+function stopScanSession() {
+    if (scanSession) {
+        scanSession.close();
+    }
+}
+
+// Called for each barcode the scanner accepts while in continuous mode
+async function processContinuousBarcode(barcode) {
+    const key = ScanCache.normalizeBarcode(barcode);
+    renderSessionItem(key, barcode, null);
+
+    const cached = await ScanCache.get(barcode).catch(() => null);
+    if (cached && ScanCache.isFresh(cached)) {
+        renderSessionItem(key, barcode, cached.data);
+        return;
+    }
+
+    if (scanSession && scanSession.send(barcode)) {
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/v1/barcode/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCSRFToken()
+            },
+            body: JSON.stringify({ Barcode: barcode })
+        });
+        // Throttled and failed responses may not name the barcode
+        handleSessionResult({ barcode, ...(await response.json()) });
+    } catch (error) {
+        console.error('Error:', error);
+        if (cached) {
+            renderSessionItem(key, barcode, cached.data);
+        } else {
+            renderSessionItem(key, barcode, { status: 'error', error: 'Network error' });
+        }
+    }
+}
+
+function handleSessionResult(data) {
+    if (!data.barcode) {
+        return;
+    }
+    if (data.status === 'success' && data.analysis) {
+        ScanCache.put(data.barcode, data).catch(error => console.warn('Could not cache result:', error));
+    }
+    renderSessionItem(ScanCache.normalizeBarcode(data.barcode), data.barcode, data);
+}
+
+// One line per scanned item, newest first; data is null while it is looked up
+function renderSessionItem(key, barcode, data) {
+    const list = document.getElementById('scanSessionList');
+    showElement(list);
+
+    let item = list.querySelector(`[data-barcode="${key}"]`);
+    if (!item) {
+        item = document.createElement('li');
+        item.dataset.barcode = key;
+        item.innerHTML = '<span class="scan-session-name"></span><span class="risk-badge"></span>';
+        item.addEventListener('click', () => showSessionResult(key));
+    }
+    list.prepend(item);
+
+    const name = item.querySelector('.scan-session-name');
+    const badge = item.querySelector('.risk-badge');
+    const analysis = data && data.analysis;
+    sessionResults.set(key, { barcode, data });
+
+    if (!data) {
+        name.textContent = `${barcode}: analyzing...`;
+        badge.className = 'risk-badge risk-unknown';
+        badge.textContent = '...';
+    } else if (analysis && analysis.status === 'success') {
+        const riskLevel = analysis.risk_assessment?.overall_risk;
+        name.textContent = analysis.product_info?.product_name || barcode;
+        badge.className = `risk-badge ${getRiskClass(riskLevel)}`;
+        badge.textContent = riskLevel || 'Unknown';
+    } else {
+        name.textContent = `${barcode}: ${data.error || data.detail || (analysis && analysis.message) || 'not found'}`;
+        badge.className = 'risk-badge risk-unknown';
+        badge.textContent = data.retry_after ? `retry in ${data.retry_after}s` : 'n/a';
+    }
+}
+
+function showSessionResult(key) {
+    const entry = sessionResults.get(key);
+    if (!entry || !entry.data) {
+        return;
+    }
+    showElement('barcodeResult');
+    hideElement('barcodeLoading');
+    showElement('barcodeData');
+    displayBarcodeResults(entry.data, entry.barcode);
+    document.getElementById('barcodeResult').scrollIntoView({ behavior: 'smooth', block: 'start' });
+}
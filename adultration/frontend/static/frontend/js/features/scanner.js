@@ -0,0 +1,276 @@
+// Camera barcode scanner for FoodGuard (loaded on demand by main.js)
+//
+// Requires the Quagga library and the barcode and scanSession bundles.
+
+let currentStream = null;
+let isScanning = false;
+let scanConsensus = null;
+
+// In continuous mode an item left in view is not scanned again until
+// another code is accepted or it has been out of view this long
+const CONTINUOUS_REPEAT_MS = 3000;
+let lastContinuousRead = null;
+
+// Quagga's single-frame reads are often wrong, so a code is accepted only
+// once several recent frames agree on it. Presets trade speed for accuracy:
+//   requiredReads  matching decodes needed within windowMs
+//   maxError       worst acceptable mean bar-width error of a decode
+//   minAgreement   share of the window's reads that must be this code
+const SCAN_PRESETS = {
+    fast: { requiredReads: 2, windowMs: 1500, maxError: 0.25, minAgreement: 0.5 },
+    balanced: { requiredReads: 3, windowMs: 2000, maxError: 0.15, minAgreement: 0.6 },
+    accurate: { requiredReads: 5, windowMs: 3000, maxError: 0.1, minAgreement: 0.75 },
+};
+const DEFAULT_SCAN_PRESET = 'balanced';
+
+class BarcodeConsensus {
+    constructor(options = {}) {
+        Object.assign(this, SCAN_PRESETS[DEFAULT_SCAN_PRESET], options);
+        this.reads = [];
+    }
+    
+    // Record one frame's decode. Returns null when the read is discarded
+    // (bad check digit or too noisy), else the code, its confidence in
+    // [0, 1] and whether it is now accepted.
+    add(code, error, now = performance.now()) {
+        this.reads = this.reads.filter(read => now - read.time <= this.windowMs);
+        if (!isValidGtin(code) || error > this.maxError) {
+            return null;
+        }
+        
+        const key = ScanCache.normalizeBarcode(code);
+        this.reads.push({ key, time: now });
+        const matching = this.reads.filter(read => read.key === key).length;
+        const agreement = matching / this.reads.length;
+        return {
+            code,
+            confidence: Math.min(1, matching / this.requiredReads) * agreement,
+            accepted: matching >= this.requiredReads && agreement >= this.minAgreement,
+        };
+    }
+}
+
+// Mean per-character error Quagga reports for a decode (lower is better)
+function decodeError(codeResult) {
+    const errors = (codeResult.decodedCodes || [])
+        .map(decoded => decoded.error)
+        .filter(error => typeof error === 'number');
+    return errors.length ? errors.reduce((sum, error) => sum + error, 0) / errors.length : 0;
+}
+
+function getScanPreset() {
+    const preset = localStorage.getItem('scanPreset');
+    return SCAN_PRESETS[preset] ? preset : DEFAULT_SCAN_PRESET;
+}
+
+function setScanPreset(preset) {
+    if (!SCAN_PRESETS[preset]) return;
+    localStorage.setItem('scanPreset', preset);
+    if (scanConsensus) {
+        scanConsensus = new BarcodeConsensus(SCAN_PRESETS[preset]);
+    }
+}
+
+function updateScanConfidence(confidence, code = '') {
+    const meter = document.getElementById('scanConfidence');
+    if (confidence === null) {
+        hideElement(meter);
+        return;
+    }
+    showElement(meter);
+    document.getElementById('scanConfidenceFill').style.width = `${Math.round(confidence * 100)}%`;
+    document.getElementById('scanConfidenceText').textContent = code
+        ? `Reading ${code}: ${Math.round(confidence * 100)}% confidence`
+        : 'Looking for a barcode...';
+}
+
+// Camera functionality
+async function startCamera() {
+    try {
+        const constraints = {
+            video: {
+                facingMode: 'environment', // Use back camera on mobile
+                width: { ideal: 640 },
+                height: { ideal: 480 }
+            }
+        };
+        
+        currentStream = await navigator.mediaDevices.getUserMedia(constraints);
+        const video = document.createElement('video');
+        video.srcObject = currentStream;
+        video.autoplay = true;
+        video.playsInline = true;
+        
+        const cameraPreview = document.getElementById('cameraPreview');
+        cameraPreview.innerHTML = '';
+        cameraPreview.appendChild(video);
+        
+        // Add scanner overlay
+        const overlay = document.createElement('div');
+        overlay.className = 'scanner-overlay';
+        cameraPreview.appendChild(overlay);
+        
+        // Update button states
+        document.getElementById('startCameraBtn').style.display = 'none';
+        document.getElementById('stopCameraBtn').style.display = 'inline-flex';
+        
+        // Start barcode scanning
+        startBarcodeScanning();
+        
+        showToast('Camera started! Position barcode within the frame.', 'success');
+        
+    } catch (error) {
+        console.error('Error accessing camera:', error);
+        showToast('Unable to access camera. Please check permissions.', 'error');
+    }
+}
+
+function stopCamera() {
+    if (currentStream) {
+        currentStream.getTracks().forEach(track => track.stop());
+        currentStream = null;
+    }
+    
+    // Reset camera preview
+    const cameraPreview = document.getElementById('cameraPreview');
+    cameraPreview.innerHTML = `
+        <div class="camera-placeholder">
+            <i class="fas fa-camera"></i>
+            <p>Camera will appear here</p>
+        </div>
+    `;
+    
+    // Update button states
+    document.getElementById('startCameraBtn').style.display = 'inline-flex';
+    document.getElementById('stopCameraBtn').style.display = 'none';
+    
+    // Stop barcode scanning
+    stopBarcodeScanning();
+}
+
+function startBarcodeScanning() {
+    if (typeof Quagga === 'undefined') {
+        console.error('Quagga library not loaded');
+        return;
+    }
+    
+    isScanning = true;
+    scanConsensus = new BarcodeConsensus(SCAN_PRESETS[getScanPreset()]);
+    updateScanConfidence(0);
+    if (isContinuousScan()) {
+        startScanSession();
+    }
+    
+    Quagga.init({
+        inputStream: {
+            name: "Live",
+            type: "LiveStream",
+            target: document.querySelector('#cameraPreview'),
+            constraints: {
+                width: 640,
+                height: 480,
+                facingMode: "environment"
+            }
+        },
+        decoder: {
+            // Only symbologies that carry a GTIN OpenFoodFacts can look up;
+            // fewer readers also means fewer spurious decodes per frame
+            readers: [
+                "ean_reader",
+                "ean_8_reader",
+                "upc_reader"
+            ]
+        },
+        locate: true,
+        locator: {
+            patchSize: "medium",
+            halfSample: true
+        }
+    }, function(err) {
+        if (err) {
+            console.error('Quagga initialization error:', err);
+            showToast('Barcode scanner initialization failed', 'error');
+            return;
+        }
+        
+        Quagga.start();
+        console.log("Barcode scanner started");
+    });
+    
+    Quagga.onDetected(handleDetectedFrame);
+}
+
+function handleDetectedFrame(data) {
+    if (!isScanning) {
+        return;
+    }
+    
+    const code = data.codeResult.code;
+    const read = scanConsensus.add(code, decodeError(data.codeResult));
+    if (!read) {
+        return;
+    }
+    updateScanConfidence(read.confidence, read.code);
+    
+    if (read.accepted && isContinuousScan()) {
+        acceptContinuousRead(read);
+    } else if (read.accepted) {
+        // Stop scanning to prevent multiple detections
+        stopBarcodeScanning();
+        
+        // Process the detected barcode
+        processDetectedBarcode(read.code, read.confidence);
+    }
+}
+
+// Continuous mode: hand the code to the scan session and keep scanning
+function acceptContinuousRead(read) {
+    const now = performance.now();
+    const key = ScanCache.normalizeBarcode(read.code);
+    // Start the next item from a clean slate
+    scanConsensus = new BarcodeConsensus(SCAN_PRESETS[getScanPreset()]);
+    
+    const repeated = lastContinuousRead && lastContinuousRead.key === key
+        && now - lastContinuousRead.time < CONTINUOUS_REPEAT_MS;
+    lastContinuousRead = { key, time: now };
+    if (repeated) {
+        return;
+    }
+    
+    showToast(`Barcode detected: ${read.code}`, 'success');
+    processContinuousBarcode(read.code);
+}
+
+function stopBarcodeScanning() {
+    stopScanSession();
+    lastContinuousRead = null;
+    if (isScanning && typeof Quagga !== 'undefined') {
+        Quagga.offDetected(handleDetectedFrame);
+        Quagga.stop();
+        isScanning = false;
+        updateScanConfidence(null);
+        console.log("Barcode scanner stopped");
+    }
+}
+
+// Scan mode picker in the camera tab
+const scanModeSelect = document.getElementById('scanMode');
+if (scanModeSelect) {
+    scanModeSelect.value = getScanPreset();
+    scanModeSelect.addEventListener('change', () => setScanPreset(scanModeSelect.value));
+}
+
+// Continuous scanning toggle in the camera tab
+const continuousScanCheckbox = document.getElementById('continuousScan');
+if (continuousScanCheckbox) {
+    continuousScanCheckbox.checked = isContinuousScan();
+    continuousScanCheckbox.addEventListener('change', () => {
+        setContinuousScan(continuousScanCheckbox.checked);
+        if (!isScanning) return;
+        if (continuousScanCheckbox.checked) {
+            startScanSession();
+        } else {
+            stopScanSession();
+        }
+    });
+}
@@ -0,0 +1,29 @@
+// Image compression worker for FoodGuard
+//
+// Downscales a photo so its longest side fits maxSide and re-encodes it as
+// JPEG, off the main thread. Mirrors the server's own preprocessing
+// (IMAGE_TARGET_MAX_SIDE / IMAGE_JPEG_QUALITY), so the server has nothing
+// left to shrink and the upload carries only what will be analysed.
+
+self.addEventListener('message', async (event) => {
+    const { id, file, maxSide, quality } = event.data;
+    
+    try {
+        // Honour EXIF orientation, as ImageOps.exif_transpose does server-side
+        const bitmap = await createImageBitmap(file, { imageOrientation: 'from-image' });
+        const scale = Math.min(1, maxSide / Math.max(bitmap.width, bitmap.height));
+        const width = Math.round(bitmap.width * scale);
+        const height = Math.round(bitmap.height * scale);
+        
+        const canvas = new OffscreenCanvas(width, height);
+        const context = canvas.getContext('2d');
+        context.imageSmoothingQuality = 'high';
+        context.drawImage(bitmap, 0, 0, width, height);
+        bitmap.close();
+        
+        const blob = await canvas.convertToBlob({ type: 'image/jpeg', quality });
+        self.postMessage({ id, blob, width, height });
+    } catch (error) {
+        self.postMessage({ id, error: error.message || String(error) });
+    }
+});
@@ -0,0 +1,182 @@
+// Scan result cache and offline queue for FoodGuard
+//
+// Shared by the page (main.js) and the service worker (sw.js): both read and
+// write the same IndexedDB database. Results are keyed by normalized barcode,
+// so "0123456789012" and "123456789012" are one entry.
+//
+// Freshness follows the product's revision (OpenFoodFacts last_modified_t),
+// in the spirit of HTTP heuristic freshness: a result stays fresh for 10% of
+// the time since the product was last edited, within [MIN_TTL, MAX_TTL].
+// Recently edited products are rechecked often; long-stable ones rarely.
+// Expired entries are still kept for STALE_LIMIT, to be shown instantly while
+// they revalidate and to answer scans made offline.
+
+self.ScanCache = (() => {
+    const DB_NAME = 'foodguard';
+    const DB_VERSION = 1;
+    const RESULTS = 'results';
+    const QUEUE = 'queue';
+
+    // Bump when the shape of the analysis response changes
+    const SCHEMA = 1;
+
+    const MINUTE = 60 * 1000;
+    const HOUR = 60 * MINUTE;
+    const MIN_TTL = 15 * MINUTE;
+    const MAX_TTL = 24 * HOUR;
+    const DEFAULT_TTL = HOUR;
+    // Same as the server's OPENFOODFACTS_NOT_FOUND_CACHE_TIMEOUT
+    const NOT_FOUND_TTL = 10 * MINUTE;
+    const STALE_LIMIT = 7 * 24 * HOUR;
+    const MAX_ENTRIES = 200;
+
+    let dbPromise = null;
+
+    function openDatabase() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const request = indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    const results = db.createObjectStore(RESULTS, { keyPath: 'barcode' });
+                    results.createIndex('cachedAt', 'cachedAt');
+                    db.createObjectStore(QUEUE, { keyPath: 'barcode' });
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => {
+                    dbPromise = null;
+                    reject(request.error);
+                };
+            });
+        }
+        return dbPromise;
+    }
+
+    // Run fn against one object store and resolve with its request's result
+    async function withStore(storeName, mode, fn) {
+        const db = await openDatabase();
+        return new Promise((resolve, reject) => {
+            const transaction = db.transaction(storeName, mode);
+            const request = fn(transaction.objectStore(storeName));
+            transaction.oncomplete = () => resolve(request ? request.result : undefined);
+            transaction.onerror = () => reject(transaction.error);
+            transaction.onabort = () => reject(transaction.error);
+        });
+    }
+
+    // Canonical GTIN form: digits only, UPC-A and GTIN-14 folded into GTIN-13
+    function normalizeBarcode(code) {
+        let digits = String(code || '').replace(/\D/g, '');
+        if (digits.length === 14 && digits.startsWith('0')) {
+            digits = digits.slice(1);
+        }
+        if (digits.length > 8 && digits.length < 13) {
+            digits = digits.padStart(13, '0');
+        }
+        return digits;
+    }
+
+    function revisionOf(data) {
+        const revision = data && data.analysis && data.analysis.product_info
+            ? data.analysis.product_info.last_modified_t
+            : null;
+        return typeof revision === 'number' ? revision : null;
+    }
+
+    function timeToLive(data, now) {
+        if (!data.analysis || data.analysis.status !== 'success') {
+            return NOT_FOUND_TTL;
+        }
+        const revision = revisionOf(data);
+        if (revision === null) {
+            return DEFAULT_TTL;
+        }
+        const sinceModified = Math.max(0, now - revision * 1000);
+        return Math.min(MAX_TTL, Math.max(MIN_TTL, sinceModified / 10));
+    }
+
+    async function get(barcode) {
+        const entry = await withStore(RESULTS, 'readonly', store => store.get(normalizeBarcode(barcode)));
+        if (!entry || entry.schema !== SCHEMA || Date.now() - entry.cachedAt > STALE_LIMIT) {
+            return null;
+        }
+        return entry;
+    }
+
+    function isFresh(entry) {
+        return Date.now() < entry.expiresAt;
+    }
+
+    async function put(barcode, data) {
+        const now = Date.now();
+        await withStore(RESULTS, 'readwrite', store => store.put({
+            barcode: normalizeBarcode(barcode),
+            schema: SCHEMA,
+            data,
+            revision: revisionOf(data),
+            cachedAt: now,
+            expiresAt: now + timeToLive(data, now),
+        }));
+        await prune();
+    }
+
+    // Keep the newest MAX_ENTRIES results
+    async function prune() {
+        const count = await withStore(RESULTS, 'readonly', store => store.count());
+        let excess = count - MAX_ENTRIES;
+        if (excess <= 0) return;
+
+        await withStore(RESULTS, 'readwrite', store => {
+            const cursorRequest = store.index('cachedAt').openCursor();
+            cursorRequest.onsuccess = () => {
+                const cursor = cursorRequest.result;
+                if (cursor && excess-- > 0) {
+                    cursor.delete();
+                    cursor.continue();
+                }
+            };
+            return null;
+        });
+    }
+
+    // Scans made offline; one entry per barcode, replayed oldest first
+    async function enqueue(barcode, csrfToken = '') {
+        await withStore(QUEUE, 'readwrite', store => store.put({
+            barcode: normalizeBarcode(barcode),
+            original: String(barcode),
+            csrfToken,
+            queuedAt: Date.now(),
+        }));
+    }
+
+    async function queued() {
+        const entries = await withStore(QUEUE, 'readonly', store => store.getAll());
+        return entries.sort((a, b) => a.queuedAt - b.queuedAt);
+    }
+
+    // Replay queued scans through send(entry) -> {status, data}. Stops at the
+    // first network failure (still offline) and leaves the rest queued.
+    // Resolves with [{barcode, data}] for the scans that went through.
+    async function flushQueue(send) {
+        const completed = [];
+        for (const entry of await queued()) {
+            let response;
+            try {
+                response = await send(entry);
+            } catch (error) {
+                break;
+            }
+            // Server errors stay queued for the next attempt
+            if (response.status >= 500) break;
+
+            if (!response.data.error) {
+                await put(entry.original, response.data);
+            }
+            await withStore(QUEUE, 'readwrite', store => store.delete(entry.barcode));
+            completed.push({ barcode: entry.original, data: response.data });
+        }
+        return completed;
+    }
+
+    return { normalizeBarcode, revisionOf, get, isFresh, put, enqueue, queued, flushQueue };
+})();
@@ -0,0 +1,53 @@
+import os
+
+import rcssmin
+import rjsmin
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+MINIFIERS = {
+    ".js": rjsmin.jsmin,
+    ".css": rcssmin.cssmin,
+}
+
+
+class MinifiedManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """WhiteNoise's manifest storage, minifying the frontend's own JS and CSS first.
+
+    collectstatic has already copied every file into STATIC_ROOT when
+    post_process runs. Those copies are minified in place and the parent is
+    pointed at them instead of the source files, so the fingerprints describe
+    the minified bytes and the gzip/brotli variants are built from them.
+    Fingerprinted names are what let WhiteNoise serve them with far-future
+    cache headers.
+
+    Only files under frontend/ are touched, and vendored or already
+    minified files (vendor/, *.min.js) are left as shipped.
+    """
+
+    minify_prefix = "frontend/"
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for name in paths:
+                if self.should_minify(name):
+                    self.minify(name)
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+
+    def should_minify(self, name):
+        root, ext = os.path.splitext(name)
+        return (
+            ext in MINIFIERS
+            and name.startswith(self.minify_prefix)
+            and "/vendor/" not in name
+            and not root.endswith(".min")
+        )
+
+    def minify(self, name):
+        minifier = MINIFIERS[os.path.splitext(name)[1]]
+        path = self.path(name)
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(minifier(source))
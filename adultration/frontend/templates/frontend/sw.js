@@ -0,0 +1,155 @@
+// Service worker for FoodGuard
+//
+// Served from /sw.js (frontend.views.service_worker) so its scope covers the
+// whole site. It keeps the app shell available offline, answers barcode
+// lookups from the scan cache when the network is gone, and queues scans it
+// cannot answer until connectivity returns.
+
+importScripts({{ scan_cache_url|safe }});
+
+const SHELL_CACHE = {{ shell_cache|safe }};
+const SHELL_URLS = {{ shell_urls|safe }};
+const CDN_URLS = {{ cdn_urls|safe }};
+const BARCODE_PATHS = ['/api/v1/barcode/', '/api/v2/barcode/', '/barcode/'];
+const SYNC_TAG = 'foodguard-scan-queue';
+
+self.addEventListener('install', (event) => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(SHELL_CACHE);
+        await cache.addAll(SHELL_URLS);
+        // Third-party assets are best effort; the page works without icons.
+        // Scripts checked for integrity are requested with CORS, so they need
+        // a CORS response; an opaque one is kept only where CORS fails.
+        await Promise.all(CDN_URLS.map(url =>
+            fetch(url, { mode: 'cors' })
+                .catch(() => fetch(url, { mode: 'no-cors' }))
+                .then(response => cache.put(url, response))
+                .catch(() => {})
+        ));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter(name => name.startsWith('foodguard-shell-') && name !== SHELL_CACHE)
+            .map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (request.method === 'POST' && url.origin === location.origin && BARCODE_PATHS.includes(url.pathname)) {
+        event.respondWith(handleBarcodeRequest(request));
+        return;
+    }
+    if (request.method !== 'GET') {
+        return;
+    }
+    if (request.mode === 'navigate') {
+        event.respondWith(networkFirst(request));
+    } else if (SHELL_URLS.includes(url.pathname) || CDN_URLS.includes(request.url)) {
+        event.respondWith(staleWhileRevalidate(request));
+    }
+});
+
+// Pages: always try for the latest, fall back to the cached shell
+async function networkFirst(request) {
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            const cache = await caches.open(SHELL_CACHE);
+            cache.put('/', response.clone());
+        }
+        return response;
+    } catch (error) {
+        return (await caches.match('/')) || Response.error();
+    }
+}
+
+// Static assets: answer from the cache, refresh it in the background
+async function staleWhileRevalidate(request) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(request);
+    const refresh = fetch(request)
+        .then(response => {
+            if (response.ok || response.type === 'opaque') {
+                cache.put(request, response.clone());
+            }
+            return response;
+        })
+        .catch(() => cached || Response.error());
+    return cached || refresh;
+}
+
+function jsonResponse(data, status, headers = {}) {
+    return new Response(JSON.stringify(data), {
+        status,
+        headers: { 'Content-Type': 'application/json', ...headers },
+    });
+}
+
+async function handleBarcodeRequest(request) {
+    const body = await request.clone().json().catch(() => ({}));
+
+    try {
+        return await fetch(request);
+    } catch (error) {
+        if (!body.Barcode) {
+            throw error;
+        }
+
+        // Offline: any cached result, however old, beats none
+        const entry = await ScanCache.get(body.Barcode).catch(() => null);
+        if (entry) {
+            return jsonResponse(entry.data, 200, { 'X-FoodGuard-Cache': 'offline' });
+        }
+
+        await ScanCache.enqueue(body.Barcode, request.headers.get('X-CSRFToken') || '');
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG).catch(() => {});
+        }
+        return jsonResponse({
+            status: 'queued',
+            barcode: body.Barcode,
+            message: 'You are offline. This scan will be analyzed when you are back online.'
+        }, 202);
+    }
+}
+
+async function replayQueue() {
+    const completed = await ScanCache.flushQueue(async (entry) => {
+        const response = await fetch('/api/v1/barcode/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': entry.csrfToken
+            },
+            body: JSON.stringify({ Barcode: entry.original })
+        });
+        return { status: response.status, data: await response.json().catch(() => ({})) };
+    });
+
+    const pages = await self.clients.matchAll({ type: 'window' });
+    for (const { barcode, data } of completed) {
+        pages.forEach(page => page.postMessage({ type: 'scan-synced', barcode, data }));
+    }
+}
+
+// Background Sync where supported; elsewhere the page asks on 'online'
+self.addEventListener('sync', (event) => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(replayQueue());
+    }
+});
+
+self.addEventListener('message', (event) => {
+    if (event.data && event.data.type === 'flush-queue') {
+        event.waitUntil(replayQueue());
+    }
+});
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='frontend_index'),
+    path('sw.js', views.service_worker, name='frontend_service_worker'),
     path('barcode/', views.FrontendBarcodeView.as_view(), name='frontend_barcode'),
     path('image/', views.FrontendImageView.as_view(), name='frontend_image'),
 ]
@@ -0,0 +1,48 @@
+"""
+Third-party browser libraries served from our own static files.
+
+Each asset is pinned to an exact release and to the Subresource Integrity
+hash of its file. ``manage.py vendor_assets`` fetches it into
+frontend/static/ and refuses a download that does not match the pin; commit
+the result so it goes through collectstatic and is fingerprinted like
+everything else. Until an asset has been vendored the page falls back to
+its CDN URL, loaded with the same integrity hash.
+"""
+
+import base64
+import hashlib
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+VENDOR_ASSETS = {
+    "quagga": {
+        "url": "https://unpkg.com/quagga@0.12.1/dist/quagga.min.js",
+        "path": "frontend/vendor/quagga/quagga.min.js",
+        # sha384 of the file at url; vendor_assets prints it for an unpinned asset
+        "integrity": None,
+    },
+}
+
+
+def integrity(data):
+    """Subresource Integrity value (sha384) of a file's bytes"""
+    return "sha384-" + base64.b64encode(hashlib.sha384(data).digest()).decode()
+
+
+@lru_cache(maxsize=None)
+def vendored(name):
+    """Whether the asset's local copy exists"""
+    return finders.find(VENDOR_ASSETS[name]["path"]) is not None
+
+
+def vendor_url(name):
+    """URL the page should load the asset from"""
+    asset = VENDOR_ASSETS[name]
+    return static(asset["path"]) if vendored(name) else asset["url"]
+
+
+def vendor_integrity(name):
+    """Integrity the page checks the asset against, when it comes from the CDN"""
+    return None if vendored(name) else VENDOR_ASSETS[name]["integrity"]
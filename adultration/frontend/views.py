@@ -1,21 +1,101 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.templatetags.static import static
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
+from api.ratelimit import check_rate_limit, client_ident
+from api.serializers import ImageSerializer
+from api.services import product_service, image_service
+from api.uploads import UPLOAD_CHUNK_SIZE, UploadRejected, image_upload_handlers
+from .vendor import vendor_integrity, vendor_url
+import hashlib
 import json
 
+# Third-party assets the page loads; the service worker caches them for offline use
+CDN_ASSETS = [
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+]
+
+# Bundles main.js loads on first use
+FEATURE_MODULES = {
+    'barcode': 'frontend/js/features/barcode.js',
+    'scanner': 'frontend/js/features/scanner.js',
+    'scanSession': 'frontend/js/features/scan-session.js',
+    'image': 'frontend/js/features/image.js',
+    'scanCache': 'frontend/js/scan-cache.js',
+}
+
+
+def feature_module_urls():
+    urls = {name: static(path) for name, path in FEATURE_MODULES.items()}
+    urls['quagga'] = vendor_url('quagga')
+    return urls
+
+def feature_module_integrity():
+    """Integrity hashes of the bundles loaded from a CDN"""
+    hashes = {'quagga': vendor_integrity('quagga')}
+    return {name: value for name, value in hashes.items() if value}
+
 # Create your views here.
 
 def index(request):
     """Main frontend page"""
-    return render(request, 'frontend/index.html')
+    # The browser compresses photos to the same target as the server pipeline
+    upload_config = {
+        'maxSide': settings.IMAGE_TARGET_MAX_SIDE,
+        'quality': settings.IMAGE_JPEG_QUALITY / 100,
+        'chunkSize': UPLOAD_CHUNK_SIZE,
+        'workerUrl': static('frontend/js/image-worker.js'),
+    }
+    return render(request, 'frontend/index.html', {
+        'upload_config': upload_config,
+        'feature_modules': feature_module_urls(),
+        'feature_integrity': feature_module_integrity(),
+    })
+
+def service_worker(request):
+    """Service worker script, served from the site root so its scope covers every page"""
+    shell_urls = [
+        '/',
+        static('frontend/css/style.css'),
+        static('frontend/js/main.js'),
+        static('frontend/js/image-worker.js'),
+    ]
+    # The feature bundles too, so scanning works offline before they were ever opened
+    cdn_urls = list(CDN_ASSETS)
+    for url in feature_module_urls().values():
+        (cdn_urls if url.startswith('https://') else shell_urls).append(url)
+    # Static URLs carry content hashes in production, so a deploy that
+    # changes any asset also renames the cache and retires the old one
+    version = hashlib.sha256(''.join(shell_urls + cdn_urls).encode()).hexdigest()[:12]
+    response = render(request, 'frontend/sw.js', {
+        'scan_cache_url': json.dumps(static('frontend/js/scan-cache.js')),
+        'shell_cache': json.dumps(f'foodguard-shell-{version}'),
+        'shell_urls': json.dumps(shell_urls),
+        'cdn_urls': json.dumps(cdn_urls),
+    }, content_type='application/javascript')
+    # Browsers must always see the current worker
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+def rate_limit(request, scope):
+    """Apply the API's per-IP limits for scope; returns a 429 response if exceeded"""
+    request.rate_limit = check_rate_limit(scope, None, client_ident(request))
+    if not request.rate_limit.allowed:
+        return JsonResponse({'error': 'Too many requests, please try again shortly'}, status=429)
+    return None
 
 @method_decorator(csrf_exempt, name='dispatch')
 class FrontendBarcodeView(View):
     """Frontend wrapper for barcode API"""
     
     def post(self, request):
+        throttled = rate_limit(request, 'barcode')
+        if throttled:
+            return throttled
+        
         try:
             data = json.loads(request.body)
             barcode = data.get('Barcode')
@@ -23,12 +103,12 @@ class FrontendBarcodeView(View):
             if not barcode:
                 return JsonResponse({'error': 'Barcode is required'}, status=400)
             
-            # Here you would typically call your existing API logic
-            # For now, we'll return a success response
+            # Same in-process pipeline (and cache) as /api/v1/barcode/
+            analysis = product_service.analyze_product_by_barcode(barcode)
             return JsonResponse({
-                'message': 'Barcode processed successfully',
+                'status': 'success',
                 'barcode': barcode,
-                'status': 'success'
+                'analysis': analysis
             })
             
         except json.JSONDecodeError:
@@ -41,23 +121,36 @@ class FrontendImageView(View):
     """Frontend wrapper for image API"""
     
     def post(self, request):
+        throttled = rate_limit(request, 'image')
+        if throttled:
+            return throttled
+        
+        # Size and type checks must be installed before anything reads the body
+        request.upload_handlers = image_upload_handlers(request)
+        
         try:
             if 'image' not in request.FILES:
                 return JsonResponse({'error': 'No image file provided'}, status=400)
             
-            image = request.FILES['image']
+            serializer = ImageSerializer(data={
+                'image': request.FILES['image'],
+                'use_ai': request.POST.get('use_ai', False)
+            })
+            if not serializer.is_valid():
+                return JsonResponse({'error': 'Invalid image data', 'details': serializer.errors}, status=400)
             
-            if not image.content_type.startswith('image/'):
-                return JsonResponse({'error': 'Only image files are allowed'}, status=400)
+            image = serializer.validated_data['image']
             
-            # Here you would typically call your existing API logic
-            # For now, we'll return a success response
+            # Same in-process pipeline as /api/v1/image/
+            analysis = image_service.analyze_image(image, use_ai=serializer.validated_data['use_ai'])
             return JsonResponse({
-                'message': 'Image processed successfully',
+                'status': 'success',
                 'filename': image.name,
                 'size': image.size,
-                'status': 'success'
+                **analysis
             })
             
+        except UploadRejected as e:
+            return JsonResponse({'error': str(e.detail)}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the product analysis functions.
+
+Times every analysis stage, and the full
+analyze_product_health_and_adulteration call, for each product of a corpus
+(see corpus.py). Results are written as JSON so two commits can be compared:
+
+    python benchmarks/bench_analysis.py --corpus corpus.jsonl.gz --output before.json
+    git checkout <other commit>
+    python benchmarks/bench_analysis.py --corpus corpus.jsonl.gz --output after.json
+    python benchmarks/bench_analysis.py --compare before.json after.json
+
+Without --corpus a 5000-product synthetic corpus is generated in memory.
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from time import perf_counter_ns
+
+from corpus import ROOT, generate, load_corpus, setup_django
+
+# Ratio above which --compare flags a stage as a regression
+REGRESSION_THRESHOLD = 1.10
+
+
+def stage_inputs(analyzer, corpus):
+    """Map stage name -> (callable, argument tuple for each product)
+
+    Stages that consume earlier results get them precomputed, so only the
+    stage itself is inside the timer.
+    """
+    health = [analyzer.analyze_health_factors(product) for product in corpus]
+    adulteration = [analyzer.analyze_adulteration_risks(product) for product in corpus]
+    products = [(product,) for product in corpus]
+    analyses = list(zip(health, adulteration))
+
+    return {
+        "analyze_health_factors": (analyzer.analyze_health_factors, products),
+        "analyze_nutrition": (analyzer.analyze_nutrition, products),
+        "analyze_adulteration_risks": (analyzer.analyze_adulteration_risks, products),
+        "assess_overall_risk": (analyzer.assess_overall_risk, analyses),
+        "generate_recommendations": (analyzer.generate_recommendations, analyses),
+        "generate_home_tests": (analyzer.generate_home_tests, list(zip(corpus, adulteration))),
+        "analyze_product_health_and_adulteration": (analyzer.analyze_product_health_and_adulteration, products),
+    }
+
+
+def time_stage(stage, inputs, rounds):
+    """Best-of-rounds nanoseconds per input"""
+    best = [None] * len(inputs)
+    for _ in range(rounds):
+        for index, args in enumerate(inputs):
+            start = perf_counter_ns()
+            stage(*args)
+            elapsed = perf_counter_ns() - start
+            if best[index] is None or elapsed < best[index]:
+                best[index] = elapsed
+    return best
+
+
+def summarize(samples_ns):
+    ordered = sorted(samples_ns)
+    to_us = lambda ns: round(ns / 1000, 3)
+    return {
+        "products": len(ordered),
+        "total_ms": round(sum(ordered) / 1e6, 3),
+        "mean_us": to_us(statistics.fmean(ordered)),
+        "median_us": to_us(ordered[len(ordered) // 2]),
+        "p95_us": to_us(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]),
+        "max_us": to_us(ordered[-1]),
+    }
+
+
+def run(corpus, rounds, warmup):
+    setup_django()
+    from api.services import product_service
+
+    results = {}
+    for name, (stage, inputs) in stage_inputs(product_service, corpus).items():
+        time_stage(stage, inputs[:warmup], 1)
+        results[name] = summarize(time_stage(stage, inputs, rounds))
+        print(f"{name:<42}{results[name]['median_us']:>10} us median{results[name]['p95_us']:>10} us p95")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    if before["corpus"]["sha256"] != after["corpus"]["sha256"]:
+        print("warning: the two runs used different corpora", file=sys.stderr)
+
+    regressed = False
+    print(f"{'stage':<42}{'before us':>12}{'after us':>12}{'ratio':>8}")
+    for name, result in after["stages"].items():
+        if name not in before["stages"]:
+            continue
+        old, new = before["stages"][name]["median_us"], result["median_us"]
+        ratio = new / old if old else float("inf")
+        flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        regressed |= bool(flag)
+        print(f"{name:<42}{old:>12}{new:>12}{ratio:>8.2f}{flag}")
+    return 1 if regressed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="gzipped JSON-lines corpus (default: generated)")
+    parser.add_argument("--size", type=int, default=5000, help="size of the generated corpus")
+    parser.add_argument("--rounds", type=int, default=5, help="timed passes over the corpus per stage")
+    parser.add_argument("--warmup", type=int, default=500, help="products run once before timing")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare))
+
+    corpus = load_corpus(args.corpus) if args.corpus else list(generate(args.size, seed=42))
+    digest = hashlib.sha256()
+    for product in corpus:
+        digest.update(json.dumps(product, sort_keys=True).encode())
+
+    stages = run(corpus, args.rounds, args.warmup)
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "rounds": args.rounds,
+        "corpus": {"path": args.corpus or "generated", "products": len(corpus), "sha256": digest.hexdigest()},
+        "stages": stages,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Product payload corpus for the analysis benchmarks.
+
+A corpus is a gzipped JSON-lines file with one OpenFoodFacts product payload
+per line, shaped like the response of product_service.fetch_openfoodfacts_data.
+
+    # Record real payloads from OpenFoodFacts (needs network access)
+    python benchmarks/corpus.py record --per-category 1000 --output corpus.jsonl.gz
+
+    # Generate a deterministic offline corpus with the same shape
+    python benchmarks/corpus.py generate --size 5000 --output corpus.jsonl.gz
+
+Recorded corpora are preferred; the generated one exists so the benchmark
+can run anywhere and stays comparable between commits.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "adultration"))
+
+# OFF category tags recorded for each product family
+FAMILIES = {
+    "dairy": ["en:milks", "en:yogurts", "en:cheeses", "en:butters"],
+    "honey": ["en:honeys"],
+    "spices": ["en:spices", "en:turmeric-powders", "en:chili-powders", "en:spice-mixes"],
+    "ultra_processed": ["en:instant-noodles", "en:biscuits", "en:sodas", "en:chips-and-fries"],
+}
+
+FAMILY_TRAITS = {
+    "dairy": {
+        "categories": ["Dairies, Milks, Whole milks", "Dairies, Fermented milk products, Yogurts", "Dairies, Cheeses"],
+        "ingredients": ["milk", "skimmed milk powder", "cream", "lactic ferments", "milk solids", "stabiliser", "modified starch"],
+        "additives": ["en:e407", "en:e440", "en:e1422", "en:e202", "en:e160a"],
+        "nova": (1, 4),
+    },
+    "honey": {
+        "categories": ["Spreads, Sweet spreads, Bee products, Honeys", "Spreads, Sweet spreads, Honeys, Multifloral honeys"],
+        "ingredients": ["honey", "invert sugar syrup", "rice syrup", "high fructose corn syrup", "glucose syrup"],
+        "additives": ["en:e150a", "en:e330"],
+        "nova": (1, 3),
+    },
+    "spices": {
+        "categories": ["Condiments, Spices, Turmeric powder", "Condiments, Spices, Chili powder", "Condiments, Spice mixes, Garam masala"],
+        "ingredients": ["turmeric", "chili", "coriander", "cumin", "salt", "starch", "artificial colour", "anti-caking agent"],
+        "additives": ["en:e102", "en:e110", "en:e124", "en:e551", "en:e160c"],
+        "nova": (1, 3),
+    },
+    "ultra_processed": {
+        "categories": ["Meals, Instant noodles", "Snacks, Sweet snacks, Biscuits", "Beverages, Sodas, Colas", "Snacks, Salty snacks, Chips"],
+        "ingredients": [
+            "wheat flour", "palm oil", "sugar", "salt", "hydrogenated vegetable fat", "artificial flavouring",
+            "high fructose corn syrup", "modified starch", "flavour enhancer", "synthetic colour", "water",
+        ],
+        "additives": [
+            "en:e150d", "en:e211", "en:e250", "en:e322", "en:e330", "en:e338", "en:e412",
+            "en:e471", "en:e500", "en:e621", "en:e627", "en:e631", "en:e951", "en:e955",
+        ],
+        "nova": (4, 4),
+    },
+}
+
+
+def generate_product(rng, family, barcode):
+    traits = FAMILY_TRAITS[family]
+    additive_count = rng.randint(0, len(traits["additives"]))
+    product = {
+        "code": barcode,
+        "product_name": f"{family.replace('_', ' ').title()} product {barcode[-5:]}",
+        "brands": rng.choice(["Amul", "Dabur", "MDH", "Nestle", "PepsiCo", "Britannia", "Store brand"]),
+        "categories": rng.choice(traits["categories"]),
+        "categories_tags": rng.sample(FAMILIES[family], 1),
+        "ingredients_text": ", ".join(rng.sample(traits["ingredients"], rng.randint(1, len(traits["ingredients"])))),
+        "nutriscore_grade": rng.choice("abcde"),
+        "nova_group": rng.randint(*traits["nova"]),
+        "additives_tags": sorted(rng.sample(traits["additives"], additive_count)),
+        "allergens_tags": rng.sample(["en:milk", "en:gluten", "en:nuts", "en:soybeans", "en:mustard"], rng.randint(0, 2)),
+        "labels_tags": rng.sample(["en:organic", "en:vegetarian", "en:no-preservatives", "en:fssai"], rng.randint(0, 2)),
+        "packaging_tags": rng.sample(["en:plastic", "en:glass", "en:cardboard", "en:metal"], rng.randint(0, 2)),
+        "manufacturing_places_tags": rng.sample(["india", "maharashtra", "gujarat", "france"], rng.randint(0, 1)),
+        "countries_tags": rng.sample(["en:india", "en:france", "en:united-states"], rng.randint(1, 2)),
+        "quantity": rng.choice(["100 g", "250 g", "500 ml", "1 l"]),
+        "sugars_100g": round(rng.uniform(0, 80 if family == "honey" else 40), 1),
+        "salt_100g": round(rng.uniform(0, 3), 2),
+        "fat_100g": round(rng.uniform(0, 35), 1),
+        "saturated_fat_100g": round(rng.uniform(0, 20), 1),
+        "fiber_100g": round(rng.uniform(0, 10), 1),
+        "proteins_100g": round(rng.uniform(0, 30), 1),
+        "last_modified_t": 1600000000 + rng.randint(0, 10 ** 8),
+    }
+    # Real payloads frequently omit fields; keep that in the mix
+    for field in ("nutriscore_grade", "nova_group", "manufacturing_places_tags", "ingredients_text"):
+        if rng.random() < 0.15:
+            del product[field]
+    return product
+
+
+def generate(size, seed):
+    rng = random.Random(seed)
+    families = sorted(FAMILIES)
+    for index in range(size):
+        barcode = f"890{index:09d}"
+        yield generate_product(rng, families[index % len(families)], barcode)
+
+
+def setup_django():
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "adultration_main.settings")
+    django.setup()
+
+
+def record(per_category, page_size=100):
+    """Page through the OpenFoodFacts search API for every benchmark category"""
+    import requests
+
+    setup_django()
+    from api.services import OPENFOODFACTS_FIELDS
+
+    session = requests.Session()
+    session.headers["User-Agent"] = "FoodGuard benchmark corpus recorder"
+    fields = ",".join(OPENFOODFACTS_FIELDS + ["code", "categories_tags"])
+    for tags in FAMILIES.values():
+        quota = per_category // len(tags)
+        for tag in tags:
+            fetched = 0
+            page = 1
+            while fetched < quota:
+                response = session.get(
+                    "https://world.openfoodfacts.org/api/v2/search",
+                    params={"categories_tags": tag, "fields": fields, "page_size": page_size, "page": page},
+                    timeout=30,
+                )
+                response.raise_for_status()
+                products = response.json().get("products", [])
+                if not products:
+                    break
+                for product in products[:quota - fetched]:
+                    yield product
+                fetched += len(products)
+                page += 1
+                time.sleep(1)  # stay well within the OFF rate limits
+
+
+def write_corpus(products, path):
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for product in products:
+            f.write(json.dumps(product, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def load_corpus(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subcommands.add_parser("generate", help="build a deterministic synthetic corpus")
+    generate_parser.add_argument("--size", type=int, default=5000)
+    generate_parser.add_argument("--seed", type=int, default=42)
+    generate_parser.add_argument("--output", required=True)
+
+    record_parser = subcommands.add_parser("record", help="record real payloads from OpenFoodFacts")
+    record_parser.add_argument("--per-category", type=int, default=1000)
+    record_parser.add_argument("--output", required=True)
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        count = write_corpus(generate(args.size, args.seed), args.output)
+    else:
+        count = write_corpus(record(args.per_category), args.output)
+    print(f"Wrote {count} products to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration shared by the Procfile and Dockerfile.
+
+Both pass it explicitly (--config gunicorn.conf.py --chdir adultration):
+gunicorn only finds it on its own in the working directory, and the app is
+imported from adultration/. It prepares a per-node directory for
+Prometheus multi-process metrics so /metrics reports totals across every
+worker, not just the one scraped, and makes each worker write out its
+buffered scan events before it exits.
+
+It also works with --preload: the shared cache file (api/cache.py) is then
+read once in the master, so workers start with it in the page cache.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Set before anything imports prometheus_client; with --preload the app (and
+# so prometheus_client) is loaded before the hooks below run
+METRICS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "foodguard-metrics"),
+)
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be merged into the new one
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    # Django is already set up in the master; workers reopen their own
+    # connections after the fork
+    from django.core.cache import caches
+
+    for alias in caches:
+        warm = getattr(caches[alias], "warm", None)
+        if warm:
+            warm()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    # Runs in the worker after it stops serving; atexit would also catch
+    # this, but only if the worker reaches interpreter shutdown cleanly
+    from api.scan_log import scan_events
+
+    scan_events.flush()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the FoodGuard API.
+
+Starts the OpenFoodFacts and Gemini stand-ins from stubs.py, boots the real
+app under gunicorn (using the repository's gunicorn.conf.py), then drives
+/api/v1/barcode/ and /api/v1/image/ at a fixed concurrency and reports
+throughput and p50/p95/p99 latency.
+
+Examples:
+    python loadtest/run.py --concurrency 20 --duration 30
+    python loadtest/run.py --worker-class gthread --threads 4 --image-ratio 0.2
+    python loadtest/run.py --server asgi --off-profile degraded --output asgi.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+from PIL import Image, ImageDraw
+
+from stubs import GEMINI_PROFILES, OFF_PROFILES, start_gemini, start_openfoodfacts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {
+    "wsgi": "adultration_main.wsgi:application",
+    "asgi": "adultration_main.asgi:application",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10, help="simultaneous in-flight requests")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before the run")
+    parser.add_argument("--image-ratio", type=float, default=0.1, help="fraction of requests sent to /image/")
+    parser.add_argument("--image-barcode-ratio", type=float, default=0.5, help="fraction of photos showing a barcode")
+    parser.add_argument("--barcodes", type=int, default=500, help="distinct products in the barcode pool")
+    parser.add_argument("--server", choices=sorted(APPS), default="wsgi")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--worker-class", default=None, help="gunicorn worker class (default: sync, or UvicornWorker for asgi)")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--off-profile", choices=sorted(OFF_PROFILES), default="realistic")
+    parser.add_argument("--gemini-profile", choices=sorted(GEMINI_PROFILES), default="realistic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args()
+
+
+def make_gtin(rng):
+    body = [rng.randint(0, 9) for _ in range(12)]
+    total = sum(d * (3 if i % 2 else 1) for i, d in enumerate(body))
+    return "".join(map(str, body)) + str((10 - total % 10) % 10)
+
+
+def make_photo(barcode=None):
+    """A 12 MP camera-sized JPEG, optionally with a barcode printed on it"""
+    image = Image.new("RGB", (4000, 3000), (196, 160, 96))
+    draw = ImageDraw.Draw(image)
+    for y in range(0, 3000, 40):
+        draw.line([(0, y), (4000, y + 300)], fill=(180, 140, 80), width=12)
+
+    if barcode:
+        import zxingcpp
+
+        symbol = zxingcpp.create_barcode(barcode, zxingcpp.BarcodeFormat.EAN13).to_image(scale=8)
+        view = memoryview(symbol)
+        label = Image.frombytes("L", (view.shape[1], view.shape[0]), bytes(view))
+        draw.rectangle([(1400, 1100), (1600 + label.width, 1300 + label.height)], fill="white")
+        image.paste(label.convert("RGB"), (1500, 1200))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, off_url, gemini_url):
+    port = free_port()
+    worker_class = args.worker_class or ("uvicorn_worker.UvicornWorker" if args.server == "asgi" else "sync")
+    env = dict(
+        os.environ,
+        DEBUG="False",
+        ALLOWED_HOSTS="127.0.0.1,localhost",
+        OPENFOODFACTS_BASE_URL=off_url,
+        GEMINI_API_ENDPOINT=gemini_url,
+        GEMINI_API_KEY="loadtest",
+        METRICS_TOKEN="loadtest",
+        # Every simulated client is anonymous and shares 127.0.0.1: lift the
+        # per-IP limits so the run measures the app, not the throttle
+        ANONYMOUS_BARCODE_RATE="1000000",
+        ANONYMOUS_IMAGE_RATE="1000000",
+        ANONYMOUS_IMAGE_DAILY_QUOTA="1000000",
+        UPLOAD_CHUNK_RATE_LIMIT="1000000",
+        RATE_LIMIT_STORE=os.path.join(tempfile.mkdtemp(prefix="foodguard-loadtest-ratelimit-"), "ratelimit.sqlite3"),
+        PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp(prefix="foodguard-loadtest-metrics-"),
+    )
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "--config", os.path.join(ROOT, "gunicorn.conf.py"),
+        "--chdir", os.path.join(ROOT, "adultration"),
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(args.workers),
+        "--worker-class", worker_class,
+        "--threads", str(args.threads),
+        "--timeout", "120",
+        "--log-level", "warning",
+        APPS[args.server],
+    ]
+    process = subprocess.Popen(command, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {process.returncode}")
+        try:
+            ready = httpx.get(f"{base_url}/metrics", headers={"Authorization": "Bearer loadtest"}, timeout=1)
+            if ready.status_code == 200:
+                return process, base_url, worker_class
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise SystemExit("gunicorn did not become ready within 60s")
+
+
+async def drive(args, base_url, barcodes, photos):
+    rng = random.Random(args.seed)
+    # Popular products are scanned far more often than the long tail
+    weights = [1.0 / (rank + 1) for rank in range(len(barcodes))]
+    samples = {"barcode": [], "image": []}
+    statuses = {"barcode": Counter(), "image": Counter()}
+
+    start = time.monotonic()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def user(client):
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                return
+            if rng.random() < args.image_ratio:
+                endpoint = "image"
+                photo = photos["barcode"] if rng.random() < args.image_barcode_ratio else photos["plain"]
+                request = client.post("/api/v1/image/", files={"image": ("photo.jpg", photo, "image/jpeg")})
+            else:
+                endpoint = "barcode"
+                barcode = rng.choices(barcodes, weights)[0]
+                request = client.post("/api/v1/barcode/", json={"Barcode": barcode})
+
+            sent = time.monotonic()
+            try:
+                status = (await request).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            finished = time.monotonic()
+
+            if sent >= measure_from and finished <= stop_at:
+                samples[endpoint].append(finished - sent)
+                statuses[endpoint][str(status)] += 1
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await asyncio.gather(*(user(client) for _ in range(args.concurrency)))
+
+    return samples, statuses
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, status_counts, duration):
+    latencies = sorted(latencies)
+    errors = sum(count for status, count in status_counts.items() if not status.startswith("2"))
+    to_ms = lambda value: None if value is None else round(value * 1000, 2)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "latency_ms": {
+            "p50": to_ms(percentile(latencies, 0.50)),
+            "p95": to_ms(percentile(latencies, 0.95)),
+            "p99": to_ms(percentile(latencies, 0.99)),
+            "max": to_ms(latencies[-1] if latencies else None),
+        },
+        "status_codes": dict(status_counts),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    barcodes = [make_gtin(rng) for _ in range(args.barcodes)]
+    photos = {"plain": make_photo(), "barcode": make_photo(barcodes[0])}
+
+    off = start_openfoodfacts(OFF_PROFILES[args.off_profile], seed=args.seed)
+    gemini = start_gemini(GEMINI_PROFILES[args.gemini_profile], seed=args.seed)
+    server, base_url, worker_class = start_server(args, off.url, gemini.url)
+    try:
+        samples, statuses = asyncio.run(drive(args, base_url, barcodes, photos))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        off.stop()
+        gemini.stop()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": dict(vars(args), worker_class=worker_class),
+        "endpoints": {
+            endpoint: summarize(samples[endpoint], statuses[endpoint], args.duration)
+            for endpoint in samples
+        },
+        "overall": summarize(
+            samples["barcode"] + samples["image"],
+            statuses["barcode"] + statuses["image"],
+            args.duration,
+        ),
+    }
+
+    print(f"{'endpoint':<10}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, result in list(report["endpoints"].items()) + [("overall", report["overall"])]:
+        latency = result["latency_ms"]
+        print(
+            f"{name:<10}{result['requests']:>8}{result['errors']:>6}{result['throughput_rps']:>9}"
+            f"{latency['p50'] or '-':>10}{latency['p95'] or '-':>10}{latency['p99'] or '-':>10}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
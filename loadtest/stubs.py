@@ -0,0 +1,196 @@
+"""
+Local stand-ins for the OpenFoodFacts v2 product API and the Gemini API.
+
+Each stand-in runs a ThreadingHTTPServer on an ephemeral port so the load
+test never leaves the machine. Behaviour is controlled by a profile:
+
+    latency_ms      median response latency
+    jitter          log-normal sigma applied to the latency (0 = constant)
+    error_rate      fraction of requests answered with a 503
+    payload         OFF: "minimal" | "typical" | "heavy"
+                    Gemini: "json" | "text"
+    not_found_rate  OFF only: fraction of barcodes reported as unknown
+
+Products are derived from the barcode with a seeded RNG, so the same
+barcode always yields the same payload across runs.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OFF_PROFILES = {
+    "fast": {"latency_ms": 40, "jitter": 0.3, "error_rate": 0.0, "payload": "typical", "not_found_rate": 0.05},
+    "realistic": {"latency_ms": 350, "jitter": 0.6, "error_rate": 0.01, "payload": "typical", "not_found_rate": 0.1},
+    "degraded": {"latency_ms": 1500, "jitter": 0.8, "error_rate": 0.15, "payload": "heavy", "not_found_rate": 0.1},
+}
+
+GEMINI_PROFILES = {
+    "fast": {"latency_ms": 200, "jitter": 0.3, "error_rate": 0.0, "payload": "json"},
+    "realistic": {"latency_ms": 3500, "jitter": 0.4, "error_rate": 0.02, "payload": "json"},
+    "degraded": {"latency_ms": 9000, "jitter": 0.5, "error_rate": 0.2, "payload": "text"},
+}
+
+CATEGORIES = [
+    "Dairies, Milks, Whole milks",
+    "Spreads, Sweet spreads, Honeys",
+    "Condiments, Spices, Turmeric powder",
+    "Snacks, Sweet snacks, Biscuits",
+    "Beverages, Sodas, Colas",
+    "Meals, Instant noodles",
+]
+ADDITIVES = [
+    "en:e100", "en:e150d", "en:e202", "en:e211", "en:e250", "en:e322",
+    "en:e330", "en:e407", "en:e471", "en:e621", "en:e951", "en:e1422",
+]
+INGREDIENTS = [
+    "sugar", "palm oil", "hazelnuts", "skimmed milk powder", "cocoa",
+    "hydrogenated vegetable fat", "artificial flavouring", "salt",
+    "modified starch", "high fructose corn syrup", "wheat flour", "water",
+]
+
+
+def build_product(barcode, payload):
+    """Deterministic OFF-shaped product for a barcode"""
+    rng = random.Random(barcode)
+    additive_count = {"minimal": 0, "typical": rng.randint(0, 6), "heavy": rng.randint(8, 12)}[payload]
+    ingredient_count = {"minimal": 2, "typical": 8, "heavy": 40}[payload]
+
+    product = {
+        "product_name": f"Load test product {barcode}",
+        "brands": rng.choice(["Acme", "FoodCo", "Daily Farms"]),
+        "categories": rng.choice(CATEGORIES),
+        "ingredients_text": ", ".join(rng.choice(INGREDIENTS) for _ in range(ingredient_count)),
+        "nutriscore_grade": rng.choice("abcde"),
+        "nova_group": rng.randint(1, 4),
+        "additives_tags": rng.sample(ADDITIVES, additive_count),
+        "allergens_tags": rng.sample(["en:milk", "en:nuts", "en:gluten", "en:soybeans"], rng.randint(0, 2)),
+        "packaging_tags": rng.sample(["en:plastic", "en:glass", "en:cardboard"], 1),
+        "manufacturing_places_tags": rng.sample(["india", "france", "germany"], rng.randint(0, 1)),
+        "countries_tags": ["en:india"],
+        "sugars_100g": round(rng.uniform(0, 60), 1),
+        "salt_100g": round(rng.uniform(0, 3), 2),
+        "fat_100g": round(rng.uniform(0, 40), 1),
+        "saturated_fat_100g": round(rng.uniform(0, 15), 1),
+        "fiber_100g": round(rng.uniform(0, 8), 1),
+        "proteins_100g": round(rng.uniform(0, 25), 1),
+        "last_modified_t": 1700000000 + rng.randint(0, 10 ** 7),
+    }
+    if payload == "heavy":
+        product["ingredients_text"] += " " + "lorem ipsum " * 400
+    return product
+
+
+def gemini_text(payload):
+    report = {
+        "summary": "The product appears consistent with its label; no obvious signs of adulteration.",
+        "riskLevel": "Low",
+        "keyFindings": ["Uniform colour", "No foreign particles visible"],
+        "indicators": ["None observed"],
+        "recommendations": ["Store in a cool, dry place"],
+        "homeTests": ["Water test", "Visual inspection"],
+    }
+    if payload == "json":
+        return json.dumps(report)
+    return "Summary:\n{summary}\n\nRisk Level: {riskLevel}\n".format(**report)
+
+
+class StubServer:
+    """A stand-in HTTP service running on a background thread"""
+
+    def __init__(self, handler_class, profile, seed=0):
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        handler = type(handler_class.__name__, (handler_class,), {"stub": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def roll(self):
+        """Sleep for a sampled latency; return True if this request should fail"""
+        with self.rng_lock:
+            jitter = self.rng.lognormvariate(0, self.profile["jitter"]) if self.profile["jitter"] else 1.0
+            failed = self.rng.random() < self.profile["error_rate"]
+            not_found = self.rng.random() < self.profile.get("not_found_rate", 0.0)
+        time.sleep(self.profile["latency_ms"] / 1000.0 * jitter)
+        return failed, not_found
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class OpenFoodFactsHandler(StubHandler):
+    PRODUCT_PATH = re.compile(r"^/api/v2/product/(\d+)")
+
+    def do_GET(self):
+        match = self.PRODUCT_PATH.match(self.path)
+        if not match:
+            self.send_json(404, {"status": 0, "status_verbose": "unknown route"})
+            return
+
+        failed, not_found = self.stub.roll()
+        barcode = match.group(1)
+        if failed:
+            self.send_json(503, {"status": 0, "status_verbose": "service unavailable"})
+        elif not_found:
+            self.send_json(404, {"code": barcode, "status": 0, "status_verbose": "product not found"})
+        else:
+            product = build_product(barcode, self.stub.profile["payload"])
+            self.send_json(200, {"code": barcode, "status": 1, "product": product})
+
+
+class GeminiHandler(StubHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        failed, _ = self.stub.roll()
+        if failed:
+            self.send_json(503, {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}})
+            return
+
+        self.send_json(200, {
+            "candidates": [{
+                "content": {"parts": [{"text": gemini_text(self.stub.profile["payload"])}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": 1290, "candidatesTokenCount": 120, "totalTokenCount": 1410},
+        })
+
+
+def start_openfoodfacts(profile, seed=0):
+    return StubServer(OpenFoodFactsHandler, profile, seed).start()
+
+
+def start_gemini(profile, seed=0):
+    return StubServer(GeminiHandler, profile, seed).start()